@@ -8,27 +8,67 @@ UI layer responsibilities:
 
 from __future__ import annotations
 
-import json
+import logging
+import time
+from collections.abc import Sequence
 from datetime import datetime
 from pathlib import Path
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import RerunException, StopException
 
-from database import SessionLocal, init_db
+from config import SHOW_QUERY_STATS
+from core.review_engine import quality_for_answer, schedule_review
+from core.streak_engine import rollover_streak
+from database import current_unit_of_work, init_db, session_scope, unit_of_work
 from models import Exercise, Lesson, Module, User
+from services.adaptive_service import select_next_exercise
+from services.code_runner_service import CodeRunnerBusy, start_code_runner
+from services.content_cache_service import bump_content_version
 from services.gamification_service import complete_lesson, process_correct_answer, process_wrong_answer
-from services.lesson_service import get_exercises, get_lessons, get_modules, validate_answer
-from services.leaderboard_service import get_top_users
+from services.hearts_service import refresh_user_hearts
+from services.lesson_service import (
+    get_exercises,
+    get_lesson_bundle,
+    get_lessons,
+    get_modules,
+    prefetch_lesson,
+    validate_answer,
+)
+from services.leaderboard_service import get_top_users, get_user_rank, rebuild_leaderboard, record_user
+from services.progress_service import (
+    get_lesson_progress,
+    get_module_progress,
+    new_run_id,
+    record_answer,
+    record_lesson_complete,
+)
+from services.review_service import DueReview, build_review_queue, get_due_reviews
+from services.write_behind_service import load_user_with_pending
+from ui.assets import get_asset_registry
 from ui.character import render_character
 from ui.character_state_manager import CharacterStateManager
 from ui.layout import render_layout
 from ui.theme import inject_global_styles
 
 
+logger = logging.getLogger(__name__)
+
 BASE_DIR = Path(__file__).resolve().parent
 CHARACTER_ASSETS_DIR = BASE_DIR / "assets" / "characters"
 
-init_db()
+
+@st.cache_resource(show_spinner=False)
+def _bootstrap() -> None:
+    """Migrate schema, build static assets, warm the leaderboard and sandbox pool once per process."""
+
+    init_db()
+    get_asset_registry()
+    rebuild_leaderboard()
+    start_code_runner()
+
+
+_bootstrap()
 
 
 def _get_character_manager() -> CharacterStateManager:
@@ -47,13 +87,14 @@ def _xp_pop_animation(xp_value: int) -> None:
 
 
 def _get_or_create_user(email: str) -> User:
-    with SessionLocal() as db:
+    with session_scope() as db:
         user = db.query(User).filter(User.email == email).first()
         if user is None:
             user = User(
                 email=email,
                 password_hash="mvp-placeholder-hash",
                 xp=0,
+                total_xp=0,
                 level=1,
                 streak=0,
                 hearts=5,
@@ -63,19 +104,46 @@ def _get_or_create_user(email: str) -> User:
             db.add(user)
             db.commit()
             db.refresh(user)
+            record_user(user)
+        return user
+
+
+def _load_user(user_id: int) -> User | None:
+    with session_scope() as db:
+        user = db.get(User, user_id)
+        if user is not None:
+            # Detached on purpose: gamification changes made in memory are
+            # persisted by the write-behind queue, never by this session.
+            db.expunge(user)
         return user
 
 
 def _get_current_user() -> User | None:
+    """Return current user, loaded at most once per rerun."""
+
     user_id = st.session_state.get("user_id")
     if not user_id:
         return None
-    with SessionLocal() as db:
-        return db.query(User).filter(User.id == user_id).first()
+
+    def _load() -> User | None:
+        user = load_user_with_pending(lambda: _load_user(user_id))
+        if user is not None:
+            # Usually just a timestamp comparison; writes only when a heart is due.
+            refresh_user_hearts(user)
+            # Show the streak the nightly rollover would store.
+            rollover_streak(user)
+        return user
+
+    uow = current_unit_of_work()
+    if uow is None:
+        return _load()
+    return uow.get(("user", user_id), _load)
 
 
 def _seed_demo_content() -> None:
-    with SessionLocal() as db:
+    if get_modules():
+        return
+    with session_scope() as db:
         if db.query(Module.id).first():
             return
         module = Module(title="Python Basics", order=1)
@@ -106,6 +174,7 @@ def _seed_demo_content() -> None:
                 ),
             ]
         )
+        bump_content_version(db)
         db.commit()
 
 
@@ -133,6 +202,19 @@ def _render_home_page(user: User) -> None:
     c1.metric("Level", user.level)
     c2.metric("XP", user.xp)
     c3.metric("Hearts", user.hearts)
+    rank = get_user_rank(user.id)
+    if rank is not None:
+        st.caption(f"Your leaderboard rank: #{rank}")
+
+    due_reviews = get_due_reviews(user.id)
+    if due_reviews and st.button(f"🔁 Review ({len(due_reviews)} due)", key="start_review"):
+        st.session_state.review_queue = build_review_queue(due_reviews)
+        st.session_state.review_items = {review.exercise_id: review for review in due_reviews}
+        st.session_state.review_run_id = new_run_id()
+        st.session_state.pop("review_current", None)
+        st.session_state.pop("review_result", None)
+        st.session_state.page = "review"
+        st.rerun()
 
     modules = get_modules()
     if not modules:
@@ -140,20 +222,20 @@ def _render_home_page(user: User) -> None:
         return
 
     st.subheader("Modules")
-    for index, module in enumerate(modules):
-        is_unlocked = index == 0
+    for module, progress in zip(modules, get_module_progress(user.id, [module.id for module in modules])):
+        is_unlocked = progress.unlocked
         card_class = "ui-card" if is_unlocked else "ui-card ui-card-locked"
+        status = f"{progress.completed_lessons}/{progress.total_lessons} lessons" if is_unlocked else "Locked"
         st.markdown(
             (
                 f'<div class="{card_class}">'
                 f'<p class="ui-title">{module.title}</p>'
-                f'<p class="ui-muted">{"Unlocked" if is_unlocked else "Locked"}</p>'
+                f'<p class="ui-muted">{status}</p>'
                 "</div>"
             ),
             unsafe_allow_html=True,
         )
-        progress_value = 100 if is_unlocked else 0
-        st.progress(progress_value)
+        st.progress(progress.percent)
         if st.button(
             "Open module" if is_unlocked else "Locked",
             key=f"open_module_{module.id}",
@@ -171,7 +253,7 @@ def _render_home_page(user: User) -> None:
                 {
                     "Rank": idx + 1,
                     "Email": row.email,
-                    "XP": row.xp,
+                    "XP": row.total_xp,
                     "Level": row.level,
                     "Streak": row.streak,
                 }
@@ -202,15 +284,26 @@ def _render_lesson_page(user: User) -> None:
         st.info("У цьому модулі поки немає уроків.")
         return
 
+    progress = get_lesson_progress(user.id, [lesson.id for lesson in lessons])
     for lesson in lessons:
         with st.container(border=True):
             st.write(f"**{lesson.title}**")
             st.caption(f"Difficulty: {lesson.difficulty}")
+            lesson_progress = progress.get(lesson.id)
+            if lesson_progress is not None and lesson_progress.completed:
+                st.caption(f"✅ Completed · best score {lesson_progress.score}%")
             if st.button("Start lesson", key=f"start_lesson_{lesson.id}"):
+                bundle = get_lesson_bundle(lesson)
+                prefetch_lesson(bundle.next_lesson_id)
                 st.session_state.selected_lesson_id = lesson.id
+                st.session_state.lesson_bundle = bundle
                 st.session_state.exercise_index = 0
                 st.session_state.lesson_correct = 0
                 st.session_state.lesson_total = 0
+                st.session_state.lesson_order = []
+                st.session_state.lesson_recent = []
+                st.session_state.lesson_run_id = new_run_id()
+                st.session_state.pop("lesson_result", None)
                 _get_character_manager().set_loading()
                 st.session_state.page = "exercise"
                 st.rerun()
@@ -220,19 +313,35 @@ def _render_lesson_page(user: User) -> None:
         st.rerun()
 
 
-def _save_user_updates(user: User) -> User:
-    with SessionLocal() as db:
-        db_user = db.query(User).filter(User.id == user.id).first()
-        if db_user is None:
-            return user
-        db_user.xp = user.xp
-        db_user.level = user.level
-        db_user.hearts = user.hearts
-        db_user.streak = user.streak
-        db_user.last_activity_date = user.last_activity_date
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+def _render_answer_input(exercise: Exercise, key: str) -> str:
+    if exercise.type == "MULTIPLE_CHOICE":
+        return st.radio("Виберіть відповідь", options=exercise.options, key=key, label_visibility="collapsed")
+    if exercise.type == "RUN_CODE":
+        return st.text_area("Ваш код", key=key, height=160)
+    return st.text_input("Ваша відповідь", key=key)
+
+
+def _render_answer_feedback(exercise: Exercise, is_correct: bool) -> None:
+    if is_correct:
+        st.markdown('<div class="ui-answer-correct">✅ Correct answer!</div>', unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="ui-answer-incorrect">❌ Невірно. Спробуємо наступне завдання.</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="ui-explanation"><b>Explanation:</b><br>{exercise.explanation}</div>', unsafe_allow_html=True)
+
+
+def _lesson_exercise_at(lesson_id: int, exercises: Sequence[Exercise], idx: int) -> Exercise:
+    """Return the run's exercise at `idx`, choosing it adaptively on first visit."""
+
+    order = st.session_state.setdefault("lesson_order", [])
+    by_id = {exercise.id: exercise for exercise in exercises}
+    while len(order) <= idx:
+        seen = set(order)
+        next_id = select_next_exercise(lesson_id, st.session_state.get("lesson_recent", []), seen)
+        if next_id not in by_id or next_id in seen:
+            # Content changed under the cached index: fall back to id order.
+            next_id = next(exercise.id for exercise in exercises if exercise.id not in seen)
+        order.append(next_id)
+    return by_id.get(order[idx]) or exercises[idx]
 
 
 def _render_exercise_page(user: User) -> None:
@@ -247,7 +356,11 @@ def _render_exercise_page(user: User) -> None:
             st.rerun()
         return
 
-    exercises = get_exercises(lesson_id)
+    bundle = st.session_state.get("lesson_bundle")
+    if bundle is not None and bundle.lesson.id == lesson_id:
+        exercises = bundle.exercises
+    else:
+        exercises = get_exercises(lesson_id)
     if not exercises:
         st.info("Для цього уроку немає вправ.")
         return
@@ -259,10 +372,18 @@ def _render_exercise_page(user: User) -> None:
         lesson_score = int((correct / total) * 100)
         updated_user = _get_current_user()
         if updated_user is not None:
-            prev_level = updated_user.level
-            lesson_result = complete_lesson(updated_user, lesson_score)
-            _save_user_updates(updated_user)
-            if lesson_result["new_level"] > prev_level:
+            run_id = st.session_state.get("lesson_run_id") or new_run_id()
+            # Reruns of the result screen must not complete the run again.
+            stored_result = st.session_state.get("lesson_result")
+            if stored_result is not None and stored_result["run_id"] == run_id:
+                lesson_result = stored_result
+            else:
+                prev_level = updated_user.level
+                lesson_result = {**complete_lesson(updated_user, lesson_score), "run_id": run_id}
+                lesson_result["leveled_up"] = lesson_result["new_level"] > prev_level
+                st.session_state.lesson_result = lesson_result
+                record_lesson_complete(updated_user.id, lesson_id, run_id, lesson_score)
+            if lesson_result["leveled_up"]:
                 _get_character_manager().set_level_up()
             else:
                 _get_character_manager().set_lesson_completed()
@@ -279,35 +400,36 @@ def _render_exercise_page(user: User) -> None:
         return
 
     _get_character_manager().set_loading()
-    exercise = exercises[idx]
+    exercise = _lesson_exercise_at(lesson_id, exercises, idx)
     result_state_key = f"exercise_result_{idx}"
     answer_state_key = f"answer_{idx}"
+    shown_state_key = f"exercise_shown_{idx}"
     st.subheader(f"Exercise {idx + 1}/{len(exercises)}")
     st.markdown(f'<div class="ui-question">{exercise.question}</div>', unsafe_allow_html=True)
 
     previous_result = st.session_state.get(result_state_key)
     if previous_result:
-        if previous_result["is_correct"]:
-            st.markdown('<div class="ui-answer-correct">✅ Correct answer!</div>', unsafe_allow_html=True)
-        else:
-            st.markdown('<div class="ui-answer-incorrect">❌ Невірно. Спробуємо наступне завдання.</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="ui-explanation"><b>Explanation:</b><br>{exercise.explanation}</div>', unsafe_allow_html=True)
+        _render_answer_feedback(exercise, previous_result["is_correct"])
         if st.button("Next", key=f"next_{idx}"):
             st.session_state.exercise_index = idx + 1
             st.session_state.pop(result_state_key, None)
             st.session_state.pop(answer_state_key, None)
+            st.session_state.pop(shown_state_key, None)
             st.rerun()
         return
 
-    if exercise.type == "MULTIPLE_CHOICE":
-        options = json.loads(exercise.options_json or "[]")
-        user_answer = st.radio("Виберіть відповідь", options=options, key=answer_state_key, label_visibility="collapsed")
-    else:
-        user_answer = st.text_input("Ваша відповідь", key=answer_state_key)
+    shown_at = st.session_state.setdefault(shown_state_key, time.monotonic())
+    user_answer = _render_answer_input(exercise, answer_state_key)
 
     if st.button("Submit answer", key=f"submit_{idx}"):
-        is_correct = validate_answer(exercise, user_answer)
+        try:
+            is_correct = validate_answer(exercise, user_answer, user_id=st.session_state.get("user_id"))
+        except CodeRunnerBusy as exc:
+            st.warning(f"Перевірка коду зараз недоступна: {exc}")
+            return
+        duration_ms = int((time.monotonic() - shown_at) * 1000)
         st.session_state.lesson_total = st.session_state.get("lesson_total", 0) + 1
+        st.session_state.setdefault("lesson_recent", []).append(is_correct)
 
         live_user = _get_current_user()
         if live_user is None:
@@ -315,6 +437,10 @@ def _render_exercise_page(user: User) -> None:
             st.session_state.page = "login"
             st.rerun()
 
+        if not st.session_state.get("lesson_run_id"):
+            st.session_state.lesson_run_id = new_run_id()
+        record_answer(live_user.id, lesson_id, exercise.id, st.session_state.lesson_run_id, is_correct, duration_ms)
+
         if is_correct:
             result = process_correct_answer(live_user, exercise.difficulty)
             st.session_state.lesson_correct = st.session_state.get("lesson_correct", 0) + 1
@@ -327,7 +453,6 @@ def _render_exercise_page(user: User) -> None:
             st.error("❌ Невірно")
             st.caption(f"Hearts left: {result['hearts']}")
 
-        _save_user_updates(live_user)
         _render_character()
 
         if not result["can_continue"]:
@@ -350,9 +475,124 @@ def _render_exercise_page(user: User) -> None:
         st.rerun()
 
 
+def _render_review_page(user: User) -> None:
+    st.title("🔁 Review")
+    _render_character()
+
+    queue = st.session_state.get("review_queue")
+    reviews = st.session_state.get("review_items", {})
+    exercise_id = st.session_state.get("review_current")
+    if exercise_id is None and queue is not None:
+        exercise_id = queue.pop_due(datetime.utcnow())
+        st.session_state.review_current = exercise_id
+
+    if exercise_id is None:
+        _get_character_manager().set_lesson_completed()
+        st.success("Усі повторення на зараз виконано!")
+        next_due_at = queue.next_due_at() if queue is not None else None
+        if next_due_at is not None:
+            st.caption(f"{len(queue)} more due from {next_due_at:%H:%M} UTC")
+        if st.button("Back to Home", key="review_back_home"):
+            _get_character_manager().set_idle()
+            st.session_state.page = "home"
+            st.rerun()
+        return
+
+    review = reviews[exercise_id]
+    exercise = next((item for item in get_exercises(review.lesson_id) if item.id == exercise_id), None)
+    if exercise is None:
+        # The exercise was removed since it was scheduled.
+        st.session_state.pop("review_current", None)
+        st.rerun()
+
+    _get_character_manager().set_loading()
+    answer_state_key = f"review_answer_{exercise_id}"
+    shown_state_key = f"review_shown_{exercise_id}"
+    st.subheader(f"{len(queue) + 1} left")
+    st.markdown(f'<div class="ui-question">{exercise.question}</div>', unsafe_allow_html=True)
+
+    previous_result = st.session_state.get("review_result")
+    if previous_result and previous_result["exercise_id"] == exercise_id:
+        _render_answer_feedback(exercise, previous_result["is_correct"])
+        if st.button("Next", key=f"review_next_{exercise_id}"):
+            st.session_state.pop("review_current", None)
+            st.session_state.pop("review_result", None)
+            st.session_state.pop(answer_state_key, None)
+            st.session_state.pop(shown_state_key, None)
+            st.rerun()
+        return
+
+    shown_at = st.session_state.setdefault(shown_state_key, time.monotonic())
+    user_answer = _render_answer_input(exercise, answer_state_key)
+
+    if st.button("Submit answer", key=f"review_submit_{exercise_id}"):
+        try:
+            is_correct = validate_answer(exercise, user_answer, user_id=st.session_state.get("user_id"))
+        except CodeRunnerBusy as exc:
+            st.warning(f"Перевірка коду зараз недоступна: {exc}")
+            return
+        duration_ms = int((time.monotonic() - shown_at) * 1000)
+
+        live_user = _get_current_user()
+        if live_user is None:
+            st.error("Користувач не знайдений. Залогіньтесь знову.")
+            st.session_state.page = "login"
+            st.rerun()
+
+        # The attempt log folds this answer into review_items; the local copy
+        # of the schedule only decides whether it returns in this session.
+        record_answer(
+            live_user.id, review.lesson_id, exercise_id, st.session_state.review_run_id, is_correct, duration_ms
+        )
+        state = schedule_review(review.state, quality_for_answer(is_correct), datetime.utcnow())
+        reviews[exercise_id] = DueReview(exercise_id, review.lesson_id, state)
+        if not is_correct:
+            queue.push(exercise_id, state.due_at)
+
+        if is_correct:
+            result = process_correct_answer(live_user, exercise.difficulty)
+            _get_character_manager().set_correct_answer()
+            _xp_pop_animation(result["xp_gained"])
+        else:
+            result = process_wrong_answer(live_user)
+            _get_character_manager().set_error()
+            st.caption(f"Hearts left: {result['hearts']}")
+
+        if not result["can_continue"]:
+            _render_character()
+            st.warning("У вас закінчилися hearts. Спробуйте пізніше.")
+            if st.button("Back to Home", key="review_hearts_back_home"):
+                _get_character_manager().set_idle()
+                st.session_state.page = "home"
+                st.rerun()
+            return
+
+        st.session_state.review_result = {"exercise_id": exercise_id, "is_correct": is_correct}
+        st.rerun()
+
+    if st.button("Back to Home", key="review_leave"):
+        _get_character_manager().set_idle()
+        st.session_state.page = "home"
+        st.rerun()
+
+
 def main() -> None:
     st.set_page_config(page_title="Python Learning MVP", page_icon="🐍", layout="centered")
     inject_global_styles()
+
+    # One session per rerun: services share it and its identity map. st.rerun()
+    # and st.stop() end the rerun early but successfully, so they still commit.
+    with unit_of_work(commit_on=(RerunException, StopException)) as uow:
+        try:
+            _render_app()
+        finally:
+            logger.info("page=%s db_queries=%d", st.session_state.get("page"), uow.query_count)
+
+    if SHOW_QUERY_STATS:
+        st.caption(f"DB queries this rerun: {uow.query_count}")
+
+
+def _render_app() -> None:
     _seed_demo_content()
 
     if "page" not in st.session_state:
@@ -371,6 +611,8 @@ def main() -> None:
             _render_lesson_page(user)
         elif st.session_state.page == "exercise" and user:
             _render_exercise_page(user)
+        elif st.session_state.page == "review" and user:
+            _render_review_page(user)
 
     render_layout(_render_page_content)
 
@@ -1,9 +1,95 @@
 """Application configuration module.
 
-This file will contain global settings for the MVP, such as database path,
-environment flags, and feature toggles.
+This file contains global settings for the MVP, such as cache sizes,
+environment flags, and feature toggles. Every value can be overridden with an
+environment variable of the same name.
 """
 
-# TODO: Define environment-specific settings.
-# TODO: Add constants for app-level configuration.
+from __future__ import annotations
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# SQLite storage profile: "dev", "single-node-prod" or "read-heavy"
+# (see database.STORAGE_PROFILES).
+STORAGE_PROFILE = os.getenv("STORAGE_PROFILE", "dev")
+
+# Content cache (modules, lessons, exercises).
+CONTENT_CACHE_MAX_ENTRIES = _env_int("CONTENT_CACHE_MAX_ENTRIES", 1024)
+# How often a process re-reads the DB content version to detect edits made by
+# other processes. Between checks cached content may be this many seconds stale.
+CONTENT_VERSION_CHECK_SECONDS = _env_float("CONTENT_VERSION_CHECK_SECONDS", 5.0)
+
+# AI exercise generation (OpenAI-compatible API).
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Optional override, e.g. a local stub server used in tests.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+AI_REQUEST_TIMEOUT_SECONDS = _env_float("AI_REQUEST_TIMEOUT_SECONDS", 30.0)
+AI_MAX_RETRIES = _env_int("AI_MAX_RETRIES", 3)
+AI_RETRY_BACKOFF_SECONDS = _env_float("AI_RETRY_BACKOFF_SECONDS", 0.5)
+AI_BATCH_MAX_WORKERS = _env_int("AI_BATCH_MAX_WORKERS", 4)
+
+# Persistent cache of generated exercises keyed by normalized request.
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "1") == "1"
+AI_CACHE_TTL_SECONDS = _env_int("AI_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+AI_CACHE_MAX_ENTRIES = _env_int("AI_CACHE_MAX_ENTRIES", 10_000)
+
+# Background stock of pre-generated exercises per (topic, difficulty).
+AI_STOCK_LOW_WATER = _env_int("AI_STOCK_LOW_WATER", 3)
+AI_STOCK_HIGH_WATER = _env_int("AI_STOCK_HIGH_WATER", 10)
+AI_STOCK_REFILL_WORKERS = _env_int("AI_STOCK_REFILL_WORKERS", 2)
+
+# Write-behind queue for per-answer user updates (XP, hearts, streak).
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+WRITE_BEHIND_MAX_BATCH = _env_int("WRITE_BEHIND_MAX_BATCH", 200)
+WRITE_BEHIND_FLUSH_SECONDS = _env_float("WRITE_BEHIND_FLUSH_SECONDS", 1.0)
+
+# Show per-rerun DB query count under each page (debug aid).
+SHOW_QUERY_STATS = os.getenv("SHOW_QUERY_STATS", "0") == "1"
+
+# Course pack import: records written per transaction (one executemany
+# upsert per table per chunk).
+CONTENT_IMPORT_CHUNK_SIZE = _env_int("CONTENT_IMPORT_CHUNK_SIZE", 5000)
+
+# Sandboxed grading of RUN_CODE exercises (services/code_runner_service.py).
+CODE_RUNNER_WORKERS = _env_int("CODE_RUNNER_WORKERS", 4)
+# Submissions allowed to wait for a worker before new ones are rejected.
+CODE_RUNNER_QUEUE_LIMIT = _env_int("CODE_RUNNER_QUEUE_LIMIT", 32)
+CODE_RUNNER_PER_USER_LIMIT = _env_int("CODE_RUNNER_PER_USER_LIMIT", 1)
+CODE_RUNNER_TIMEOUT_SECONDS = _env_float("CODE_RUNNER_TIMEOUT_SECONDS", 2.0)
+CODE_RUNNER_CPU_SECONDS = _env_int("CODE_RUNNER_CPU_SECONDS", 1)
+# Extra address space a submission may map on top of the warm worker's.
+CODE_RUNNER_MEMORY_MB = _env_int("CODE_RUNNER_MEMORY_MB", 128)
+CODE_RUNNER_MAX_OUTPUT_CHARS = _env_int("CODE_RUNNER_MAX_OUTPUT_CHARS", 2000)
+# Grading normally requires a private network namespace per run; set to 1
+# only on hosts that cannot create one (network isolation then rests on the
+# seccomp filter, which refuses new sockets).
+CODE_RUNNER_ALLOW_SHARED_NETWORK = os.getenv("CODE_RUNNER_ALLOW_SHARED_NETWORK", "0") == "1"
+
+# Nightly streak rollover: users zeroed per transaction.
+STREAK_ROLLOVER_CHUNK_SIZE = _env_int("STREAK_ROLLOVER_CHUNK_SIZE", 5000)
+
+# Answer attempt log: buffered inserts, folded into user_progress after each
+# flush in chunks of PROGRESS_AGGREGATE_BATCH_SIZE events.
+ATTEMPT_LOG_MAX_BATCH = _env_int("ATTEMPT_LOG_MAX_BATCH", 500)
+ATTEMPT_LOG_FLUSH_SECONDS = _env_float("ATTEMPT_LOG_FLUSH_SECONDS", 1.0)
+PROGRESS_AGGREGATE_BATCH_SIZE = _env_int("PROGRESS_AGGREGATE_BATCH_SIZE", 5000)
+
+# Spaced repetition: reviews loaded per session, and the daily cap applied by
+# `python -m jobs.spread_reviews` to overdue backlogs.
+REVIEW_SESSION_SIZE = _env_int("REVIEW_SESSION_SIZE", 20)
+REVIEW_MAX_PER_DAY = _env_int("REVIEW_MAX_PER_DAY", 50)
+
+# Adaptive exercise order: seconds a lesson's candidate index (built from
+# exercise_stats) is served before it is rebuilt.
+ADAPTIVE_INDEX_TTL_SECONDS = _env_float("ADAPTIVE_INDEX_TTL_SECONDS", 60.0)
+
 # TODO: Prepare placeholders for secrets loading strategy.
@@ -0,0 +1,148 @@
+"""Adaptive engine: choose the next exercise from observed difficulty.
+
+MVP rules:
+- Exercises fall into easy / medium / hard bands. With enough attempts the
+  band comes from the observed success rate (>= 80% easy, >= 50% medium,
+  otherwise hard); before that from the exercise's difficulty label
+- The learner's target band comes from their last answers in the run:
+  >= 80% correct -> hard, >= 50% -> medium, otherwise (or no answers yet) easy
+- The next exercise is the first unseen one in the target band, then in the
+  nearest other bands. Within a band, exercises solved more often and
+  faster come first
+
+Per-exercise statistics are running aggregates: each attempt updates the
+counts and an approximate median answer time in O(1) (a frugal streaming
+median that steps towards every new sample).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Collection, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+
+
+BANDS = ("easy", "medium", "hard")
+DEFAULT_BAND = "medium"
+MIN_STATS_ATTEMPTS = 5
+EASY_SUCCESS_RATE = 0.8
+MEDIUM_SUCCESS_RATE = 0.5
+RECENT_WINDOW = 5
+# Median step: a fraction of the current estimate, but at least this many ms.
+MEDIAN_STEP_RATIO = 0.05
+MEDIAN_MIN_STEP_MS = 50.0
+
+
+@dataclass(frozen=True)
+class ExerciseStats:
+    """Running answer statistics of one exercise."""
+
+    exercise_id: int
+    attempts: int = 0
+    correct: int = 0
+    median_ms: float | None = None
+
+    @property
+    def success_rate(self) -> float | None:
+        if self.attempts <= 0:
+            return None
+        return self.correct / self.attempts
+
+
+def update_running_median(median: float | None, sample: float) -> float:
+    """Move a streaming median estimate one step towards `sample`."""
+
+    if median is None:
+        return float(sample)
+    step = max(median * MEDIAN_STEP_RATIO, MEDIAN_MIN_STEP_MS)
+    if sample > median:
+        return min(median + step, float(sample))
+    if sample < median:
+        return max(median - step, float(sample))
+    return median
+
+
+def record_attempt(stats: ExerciseStats, is_correct: bool, duration_ms: int | None = None) -> ExerciseStats:
+    """Return statistics after one more attempt."""
+
+    return ExerciseStats(
+        exercise_id=stats.exercise_id,
+        attempts=stats.attempts + 1,
+        correct=stats.correct + (1 if is_correct else 0),
+        median_ms=stats.median_ms if duration_ms is None else update_running_median(stats.median_ms, duration_ms),
+    )
+
+
+def exercise_band(difficulty: str, stats: ExerciseStats | None = None) -> str:
+    """Return the band of an exercise from its statistics or label."""
+
+    if stats is not None and stats.attempts >= MIN_STATS_ATTEMPTS:
+        rate = stats.success_rate or 0.0
+        if rate >= EASY_SUCCESS_RATE:
+            return "easy"
+        if rate >= MEDIUM_SUCCESS_RATE:
+            return "medium"
+        return "hard"
+    normalized = (difficulty or "").strip().lower()
+    return normalized if normalized in BANDS else DEFAULT_BAND
+
+
+def target_band(recent_results: Sequence[bool]) -> str:
+    """Return the band to serve next from the learner's latest answers."""
+
+    window = list(recent_results)[-RECENT_WINDOW:]
+    if not window:
+        return "easy"
+    accuracy = sum(1 for result in window if result) / len(window)
+    if accuracy >= EASY_SUCCESS_RATE:
+        return "hard"
+    if accuracy >= MEDIUM_SUCCESS_RATE:
+        return "medium"
+    return "easy"
+
+
+def _band_search_order(band: str) -> tuple[str, ...]:
+    position = BANDS.index(band)
+    return tuple(sorted(BANDS, key=lambda other: (abs(BANDS.index(other) - position), BANDS.index(other))))
+
+
+class CandidateIndex:
+    """Exercise ids of one lesson grouped by band, in serving order."""
+
+    def __init__(self, bands: Mapping[str, Sequence[int]]) -> None:
+        self._bands = {band: tuple(bands.get(band, ())) for band in BANDS}
+        self._search_order = {band: _band_search_order(band) for band in BANDS}
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._bands.values())
+
+    def band(self, band: str) -> tuple[int, ...]:
+        return self._bands[band]
+
+    def select(self, band: str, seen: Collection[int] = ()) -> int | None:
+        """Return the first unseen exercise in `band` or the nearest band."""
+
+        for candidate_band in self._search_order[band]:
+            for exercise_id in self._bands[candidate_band]:
+                if exercise_id not in seen:
+                    return exercise_id
+        return None
+
+
+def build_candidate_index(
+    exercises: Iterable[tuple[int, str]],
+    stats: Mapping[int, ExerciseStats],
+) -> CandidateIndex:
+    """Group `(exercise_id, difficulty)` pairs into bands ordered for serving."""
+
+    bands: dict[str, list[tuple[float, float, int]]] = {band: [] for band in BANDS}
+    for exercise_id, difficulty in exercises:
+        exercise_stats = stats.get(exercise_id)
+        rate = exercise_stats.success_rate if exercise_stats else None
+        median_ms = exercise_stats.median_ms if exercise_stats else None
+        sort_key = (
+            -(rate if rate is not None else 0.0),
+            median_ms if median_ms is not None else float("inf"),
+            exercise_id,
+        )
+        bands[exercise_band(difficulty, exercise_stats)].append(sort_key)
+    return CandidateIndex({band: [key[-1] for key in sorted(keys)] for band, keys in bands.items()})
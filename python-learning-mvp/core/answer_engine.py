@@ -0,0 +1,128 @@
+"""Answer engine: compiled per-exercise answer validators.
+
+Rules:
+- MULTIPLE_CHOICE -> exact match to correct_answer
+- FILL_CODE -> exact match, or same Python AST as correct_answer
+- WRITE_LINE -> normalized text match, or same Python AST as correct_answer
+- RUN_CODE -> answer is executed, correct_answer holds the test assertions
+  (graded by services.code_runner_service, not here)
+
+A validator is compiled once per exercise with the canonical answer forms
+precomputed, so checking a submission only has to canonicalize the answer.
+AST comparison accepts semantically identical code (`x=10`, `x = (10)`) and
+falls back to text comparison when either side is not valid Python.
+Learner answers longer than `MAX_CODE_ANSWER_CHARS`, or too deeply nested
+for the parser, are not parsed at all and only get the text comparison.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+
+_WHITESPACE = re.compile(r"\s+")
+# Exercise answers are a line or a short snippet; anything longer is not
+# worth an AST parse.
+MAX_CODE_ANSWER_CHARS = 4000
+
+
+class ExerciseLike(Protocol):
+    """Minimal exercise contract required to compile a validator."""
+
+    type: str
+    correct_answer: str
+
+
+def normalize_text(value: Any) -> str:
+    """Normalize free-text/code-line answer for tolerant comparison."""
+
+    return _WHITESPACE.sub(" ", str(value or "").strip().lower())
+
+
+def canonical_code(value: Any, max_chars: int | None = MAX_CODE_ANSWER_CHARS) -> str | None:
+    """Return normalized AST dump of a code snippet, or None if it does not parse.
+
+    Formatting, redundant parentheses and quote style do not affect the dump.
+    Sources longer than `max_chars` (None: no limit) are not parsed, and
+    neither are ones that exhaust the parser (`'-' * 10000 + '1'`).
+    """
+
+    source = str(value or "").strip()
+    if not source or (max_chars is not None and len(source) > max_chars):
+        return None
+    try:
+        tree = ast.parse(source)
+        return ast.dump(tree, annotate_fields=False, include_attributes=False)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+
+
+@dataclass(frozen=True)
+class ExactValidator:
+    """Accepts the answer string exactly as stored."""
+
+    expected: str
+
+    def check(self, answer: Any) -> bool:
+        return str(answer) == self.expected
+
+
+@dataclass(frozen=True)
+class NormalizedTextValidator:
+    """Accepts answers equal after whitespace/case normalization."""
+
+    expected: str
+
+    def check(self, answer: Any) -> bool:
+        return normalize_text(answer) == self.expected
+
+
+@dataclass(frozen=True)
+class CodeValidator:
+    """Accepts a text match or an answer with the same AST as the solution."""
+
+    text: NormalizedTextValidator | ExactValidator
+    expected_ast: str | None
+
+    def check(self, answer: Any) -> bool:
+        if self.text.check(answer):
+            return True
+        return self.expected_ast is not None and canonical_code(answer) == self.expected_ast
+
+
+@dataclass(frozen=True)
+class ExecutionValidator:
+    """Holds tests for answers graded by running them; has no local check."""
+
+    tests: str
+
+
+AnswerValidator = ExactValidator | NormalizedTextValidator | CodeValidator | ExecutionValidator
+
+
+def compile_validator(exercise: ExerciseLike) -> AnswerValidator:
+    """Build validator for an exercise with the canonical answer precomputed."""
+
+    exercise_type = (exercise.type or "").strip().upper()
+    correct_answer = exercise.correct_answer or ""
+
+    if exercise_type == "MULTIPLE_CHOICE":
+        return ExactValidator(str(correct_answer))
+
+    if exercise_type == "FILL_CODE":
+        return CodeValidator(ExactValidator(str(correct_answer)), canonical_code(correct_answer, max_chars=None))
+
+    if exercise_type == "WRITE_LINE":
+        return CodeValidator(
+            NormalizedTextValidator(normalize_text(correct_answer)), canonical_code(correct_answer, max_chars=None)
+        )
+
+    if exercise_type == "RUN_CODE":
+        if canonical_code(correct_answer, max_chars=None) is None:
+            raise ValueError("RUN_CODE correct_answer must be Python test code.")
+        return ExecutionValidator(str(correct_answer).strip())
+
+    raise ValueError(f"Unsupported exercise type: {exercise.type}")
@@ -5,6 +5,10 @@ MVP rules:
 - Non-premium users lose 1 heart on mistake
 - Hearts regenerate by 1 every 4 hours
 - Premium users effectively have unlimited hearts
+
+The regeneration anchor is kept as `next_heart_at` (persisted on
+`models.User`): the moment the next heart comes back, or None while hearts
+are full. Checking whether anything is due is a single timestamp comparison.
 """
 
 from __future__ import annotations
@@ -22,41 +26,40 @@ class HeartsUserLike(Protocol):
 
     hearts: int
     premium: bool
+    next_heart_at: datetime | None
 
 
 def _now() -> datetime:
     return datetime.utcnow()
 
 
-def _get_regen_anchor(user: HeartsUserLike) -> datetime | None:
-    """Read regen anchor timestamp from user if available."""
-
-    return getattr(user, "hearts_regen_at", None)
-
+def is_heart_due(user: HeartsUserLike, now: datetime | None = None) -> bool:
+    """Return whether regeneration would change the user's hearts right now."""
 
-def _set_regen_anchor(user: HeartsUserLike, value: datetime) -> None:
-    """Persist regen anchor timestamp on user object."""
+    if user.premium or user.hearts >= MAX_HEARTS:
+        return False
+    next_heart_at = user.next_heart_at
+    return next_heart_at is not None and (now or _now()) >= next_heart_at
 
-    setattr(user, "hearts_regen_at", value)
 
-
-def remove_heart(user: HeartsUserLike) -> int:
+def remove_heart(user: HeartsUserLike, now: datetime | None = None) -> int:
     """Remove one heart for non-premium users and return current hearts."""
 
     if user.premium:
         return MAX_HEARTS
 
-    regenerate_hearts(user)
+    now = now or _now()
+    regenerate_hearts(user, now)
 
     if user.hearts > 0:
         user.hearts -= 1
-        if user.hearts < MAX_HEARTS and _get_regen_anchor(user) is None:
-            _set_regen_anchor(user, _now())
+        if user.hearts < MAX_HEARTS and user.next_heart_at is None:
+            user.next_heart_at = now + REGEN_INTERVAL
 
     return user.hearts
 
 
-def regenerate_hearts(user: HeartsUserLike) -> int:
+def regenerate_hearts(user: HeartsUserLike, now: datetime | None = None) -> int:
     """Regenerate hearts based on 4-hour intervals and return current hearts."""
 
     if user.premium:
@@ -64,36 +67,35 @@ def regenerate_hearts(user: HeartsUserLike) -> int:
 
     if user.hearts >= MAX_HEARTS:
         user.hearts = MAX_HEARTS
+        user.next_heart_at = None
         return user.hearts
 
-    anchor = _get_regen_anchor(user)
-    now = _now()
+    now = now or _now()
+    next_heart_at = user.next_heart_at
 
-    if anchor is None:
-        _set_regen_anchor(user, now)
+    if next_heart_at is None:
+        user.next_heart_at = now + REGEN_INTERVAL
         return user.hearts
 
-    elapsed = now - anchor
-    hearts_to_regen = int(elapsed.total_seconds() // REGEN_INTERVAL.total_seconds())
-
-    if hearts_to_regen <= 0:
+    if now < next_heart_at:
         return user.hearts
 
+    hearts_to_regen = 1 + int((now - next_heart_at) // REGEN_INTERVAL)
     user.hearts = min(MAX_HEARTS, user.hearts + hearts_to_regen)
 
     if user.hearts >= MAX_HEARTS:
-        _set_regen_anchor(user, now)
+        user.next_heart_at = None
     else:
-        _set_regen_anchor(user, anchor + (REGEN_INTERVAL * hearts_to_regen))
+        user.next_heart_at = next_heart_at + REGEN_INTERVAL * hearts_to_regen
 
     return user.hearts
 
 
-def can_start_lesson(user: HeartsUserLike) -> bool:
+def can_start_lesson(user: HeartsUserLike, now: datetime | None = None) -> bool:
     """Return whether the user can start a lesson right now."""
 
     if user.premium:
         return True
 
-    regenerate_hearts(user)
+    regenerate_hearts(user, now)
     return user.hearts > 0
@@ -0,0 +1,120 @@
+"""Leaderboard engine with an ordered in-memory ranking index.
+
+Ranking rules (same ordering as the leaderboard SQL query):
+- Higher lifetime XP (total_xp) ranks first
+- Ties are broken by earlier registration (created_at), then by user id
+
+The index keeps entries sorted by ranking key, so top-N reads and
+"rank of user X" lookups cost O(log n) instead of a full sort.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Protocol
+
+from sortedcontainers import SortedKeyList
+
+
+class LeaderboardUserLike(Protocol):
+    """Minimal user contract required to build a leaderboard entry."""
+
+    id: int
+    email: str
+    total_xp: int
+    level: int
+    streak: int
+    created_at: datetime
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    """Lightweight, immutable leaderboard row."""
+
+    user_id: int
+    email: str
+    total_xp: int
+    level: int
+    streak: int
+    created_at: datetime
+
+
+def ranking_key(entry: LeaderboardEntry) -> tuple[int, datetime, int]:
+    """Return sort key matching `ORDER BY total_xp DESC, created_at ASC, id ASC`."""
+
+    return (-entry.total_xp, entry.created_at, entry.user_id)
+
+
+def entry_from_user(user: LeaderboardUserLike) -> LeaderboardEntry:
+    """Build a leaderboard entry snapshot from a user-like object."""
+
+    return LeaderboardEntry(
+        user_id=user.id,
+        email=user.email,
+        total_xp=user.total_xp,
+        level=user.level,
+        streak=user.streak,
+        created_at=user.created_at,
+    )
+
+
+class LeaderboardIndex:
+    """Thread-safe ordered index of leaderboard entries."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ranked: SortedKeyList = SortedKeyList(key=ranking_key)
+        self._by_user: dict[int, LeaderboardEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_user)
+
+    def rebuild(self, entries: Iterable[LeaderboardEntry]) -> int:
+        """Replace index contents and return number of indexed entries."""
+
+        by_user = {entry.user_id: entry for entry in entries}
+        ranked = SortedKeyList(by_user.values(), key=ranking_key)
+        with self._lock:
+            self._by_user = by_user
+            self._ranked = ranked
+        return len(by_user)
+
+    def upsert(self, entry: LeaderboardEntry) -> None:
+        """Insert or replace entry for its user in O(log n)."""
+
+        with self._lock:
+            previous = self._by_user.get(entry.user_id)
+            if previous == entry:
+                return
+            if previous is not None:
+                self._ranked.remove(previous)
+            self._ranked.add(entry)
+            self._by_user[entry.user_id] = entry
+
+    def remove(self, user_id: int) -> None:
+        """Drop user from the index if present."""
+
+        with self._lock:
+            previous = self._by_user.pop(user_id, None)
+            if previous is not None:
+                self._ranked.remove(previous)
+
+    def top(self, limit: int) -> list[LeaderboardEntry]:
+        """Return top-N entries in ranking order."""
+
+        if limit <= 0:
+            return []
+        with self._lock:
+            return list(self._ranked.islice(0, limit))
+
+    def rank_of(self, user_id: int) -> int | None:
+        """Return 1-based rank of user, or None when user is not indexed."""
+
+        with self._lock:
+            entry = self._by_user.get(user_id)
+            if entry is None:
+                return None
+            return self._ranked.bisect_key_left(ranking_key(entry)) + 1
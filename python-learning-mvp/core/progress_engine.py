@@ -0,0 +1,55 @@
+"""Progress engine for module completion and unlocking.
+
+MVP rules:
+- The first module is always unlocked
+- A module unlocks once every lesson of the previous unlocked module is
+  completed (modules without lessons count as completed)
+- Module progress is completed lessons / lessons in the module
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ModuleProgress:
+    """Completion and unlock state of one module for one user."""
+
+    module_id: int
+    completed_lessons: int
+    total_lessons: int
+    unlocked: bool
+
+    @property
+    def completed(self) -> bool:
+        return self.completed_lessons >= self.total_lessons
+
+    @property
+    def percent(self) -> int:
+        if self.total_lessons <= 0:
+            return 100
+        return min(100, self.completed_lessons * 100 // self.total_lessons)
+
+
+def build_module_progress(
+    module_ids: Sequence[int],
+    lesson_counts: Mapping[int, int],
+    completed_counts: Mapping[int, int],
+) -> list[ModuleProgress]:
+    """Return progress per module in display order.
+
+    `lesson_counts` maps module id -> lessons in the module, and
+    `completed_counts` maps module id -> lessons the user completed there.
+    """
+
+    progress = []
+    unlocked = True
+    for module_id in module_ids:
+        total = lesson_counts.get(module_id, 0)
+        completed = min(completed_counts.get(module_id, 0), total)
+        item = ModuleProgress(module_id, completed, total, unlocked)
+        progress.append(item)
+        unlocked = unlocked and item.completed
+    return progress
@@ -0,0 +1,119 @@
+"""Review engine: SM-2 style spaced repetition for graded exercises.
+
+MVP rules:
+- Every graded (user, exercise) pair gets a review schedule
+- Correct answer (quality 4): next review after 1 day, then 6 days, then the
+  previous interval times the ease factor
+- Wrong answer (quality 1): repetitions restart and the exercise comes back
+  after a short relearning delay
+- Ease starts at 2.5, moves by the SM-2 formula and never drops below 1.3
+
+`ReviewQueue` is the in-memory mode for an active review session: a min-heap
+of due times, so the next due exercise is popped in O(log n) and a missed
+exercise can be pushed back without reloading the queue.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+PASSING_QUALITY = 3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+RELEARN_DELAY = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class ReviewState:
+    """Schedule of one (user, exercise) pair."""
+
+    repetitions: int
+    interval_days: int
+    ease: float
+    due_at: datetime
+    lapses: int = 0
+
+
+def quality_for_answer(is_correct: bool) -> int:
+    """Map a graded answer to an SM-2 quality score (0-5)."""
+
+    return CORRECT_QUALITY if is_correct else WRONG_QUALITY
+
+
+def _next_ease(ease: float, quality: int) -> float:
+    miss = 5 - quality
+    return max(MIN_EASE, ease + 0.1 - miss * (0.08 + miss * 0.02))
+
+
+def schedule_review(state: ReviewState | None, quality: int, now: datetime) -> ReviewState:
+    """Return the schedule after a review of `quality` at `now`."""
+
+    if not 0 <= quality <= 5:
+        raise ValueError("quality must be between 0 and 5")
+
+    repetitions = state.repetitions if state else 0
+    interval_days = state.interval_days if state else 0
+    ease = _next_ease(state.ease if state else DEFAULT_EASE, quality)
+    lapses = state.lapses if state else 0
+
+    if quality < PASSING_QUALITY:
+        return ReviewState(0, 0, ease, now + RELEARN_DELAY, lapses + 1)
+
+    if repetitions == 0:
+        interval_days = FIRST_INTERVAL_DAYS
+    elif repetitions == 1:
+        interval_days = SECOND_INTERVAL_DAYS
+    else:
+        interval_days = round(interval_days * ease)
+    return ReviewState(repetitions + 1, interval_days, ease, now + timedelta(days=interval_days), lapses)
+
+
+class ReviewQueue:
+    """Min-heap of exercises ordered by due time for one review session.
+
+    Pushing an exercise again replaces its earlier entry (stale heap entries
+    are skipped lazily on pop).
+    """
+
+    def __init__(self, items: Iterable[tuple[int, datetime]] = ()) -> None:
+        self._due: dict[int, datetime] = dict(items)
+        self._heap: list[tuple[datetime, int]] = [(due_at, exercise_id) for exercise_id, due_at in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def push(self, exercise_id: int, due_at: datetime) -> None:
+        self._due[exercise_id] = due_at
+        heapq.heappush(self._heap, (due_at, exercise_id))
+
+    def _drop_stale(self) -> None:
+        while self._heap:
+            due_at, exercise_id = self._heap[0]
+            if self._due.get(exercise_id) == due_at:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due_at(self) -> datetime | None:
+        """Return when the earliest queued exercise is due."""
+
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> int | None:
+        """Remove and return the earliest exercise due at `now`, if any."""
+
+        self._drop_stale()
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        _, exercise_id = heapq.heappop(self._heap)
+        del self._due[exercise_id]
+        return exercise_id
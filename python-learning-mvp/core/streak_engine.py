@@ -10,7 +10,7 @@ MVP rules from PRODUCT MASTER DOCUMENT:
 
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, timedelta
 from typing import Protocol
 
 
@@ -29,22 +29,32 @@ def _today() -> date:
     return date.today()
 
 
+def streak_cutoff(today: date) -> date:
+    """Return the oldest last activity date that still continues a streak today."""
+
+    return today - timedelta(days=1)
+
+
+def is_streak_broken(last_activity_date: date | None, today: date | None = None) -> bool:
+    """Return whether recorded activity is too old to continue a streak today."""
+
+    if last_activity_date is None:
+        return False
+    return last_activity_date < streak_cutoff(today or _today())
+
+
 def update_streak(user: StreakUserLike) -> int:
     """Update streak for today's lesson completion and return streak value."""
 
     today = _today()
     last_activity = user.last_activity_date
 
-    if last_activity is None:
-        user.streak = 1
+    if last_activity == today:
+        return user.streak
+    if last_activity == streak_cutoff(today):
+        user.streak += 1
     else:
-        days_diff = (today - last_activity).days
-        if days_diff == 0:
-            return user.streak
-        if days_diff == 1:
-            user.streak += 1
-        else:
-            user.streak = 1
+        user.streak = 1
 
     user.last_activity_date = today
     return user.streak
@@ -57,6 +67,17 @@ def reset_streak(user: StreakUserLike) -> int:
     return user.streak
 
 
+def rollover_streak(user: StreakUserLike, today: date | None = None) -> int:
+    """Zero a streak that was broken by a missed day and return streak value.
+
+    Same rule as the nightly `services.streak_service.rollover_streaks` job.
+    """
+
+    if user.streak > 0 and is_streak_broken(user.last_activity_date, today):
+        reset_streak(user)
+    return user.streak
+
+
 def check_streak_milestones(user: StreakUserLike) -> dict[str, object]:
     """Check streak milestones and return reward metadata.
 
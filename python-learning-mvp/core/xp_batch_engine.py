@@ -0,0 +1,90 @@
+"""Vectorized XP engine for bulk recalculation with NumPy.
+
+Array counterparts of `core.xp_engine` for economy rebalancing and bulk level
+recomputation over millions of users. Results are bit-identical to the scalar
+functions: levels are solved with the same closed form, and the floating-point
+square root is corrected to the exact integer square root.
+
+All inputs are converted to int64. Lifetime XP must stay below
+`MAX_TOTAL_XP` so that every intermediate value fits in int64.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from core.xp_engine import XP_PER_LEVEL
+
+
+IntArray = NDArray[np.int64]
+
+# Keeps 4 * (2 * total_xp // XP_PER_LEVEL) + 1 and its square root checks
+# well inside int64.
+MAX_TOTAL_XP = 2**53
+
+
+def _as_int64(values: ArrayLike, name: str) -> IntArray:
+    array = np.asarray(values)
+    if array.dtype.kind not in "iu":
+        raise ValueError(f"{name} must be an integer array.")
+    return array.astype(np.int64, copy=False)
+
+
+def _exact_isqrt(values: IntArray) -> IntArray:
+    """Integer square root of non-negative int64 values (same as math.isqrt)."""
+
+    root = np.floor(np.sqrt(values.astype(np.float64))).astype(np.int64)
+    # float64 rounding can be off by one either way for large values.
+    root -= root * root > values
+    root += (root + 1) * (root + 1) <= values
+    return root
+
+
+def get_total_xp_batch(level: ArrayLike, current_xp: ArrayLike) -> IntArray:
+    """Array version of `xp_engine.get_total_xp`."""
+
+    level = _as_int64(level, "level")
+    current_xp = _as_int64(current_xp, "current_xp")
+    if np.any(level < 1):
+        raise ValueError("Level must be >= 1.")
+    return XP_PER_LEVEL * level * (level - 1) // 2 + current_xp
+
+
+def get_level_for_total_xp_batch(total_xp: ArrayLike) -> Tuple[IntArray, IntArray]:
+    """Array version of `xp_engine.get_level_for_total_xp`: (levels, carry-over)."""
+
+    total_xp = _as_int64(total_xp, "total_xp")
+    if np.any(total_xp < 0):
+        raise ValueError("total_xp must be >= 0.")
+    if np.any(total_xp >= MAX_TOTAL_XP):
+        raise ValueError(f"total_xp must be < {MAX_TOTAL_XP}.")
+
+    pairs = 2 * total_xp // XP_PER_LEVEL
+    level = (_exact_isqrt(4 * pairs + 1) + 1) // 2
+    return level, total_xp - XP_PER_LEVEL * level * (level - 1) // 2
+
+
+def apply_xp_batch(
+    current_xp: ArrayLike,
+    current_level: ArrayLike,
+    xp_delta: ArrayLike,
+) -> Tuple[IntArray, IntArray, NDArray[np.bool_]]:
+    """Apply XP deltas to many users at once.
+
+    Equivalent to `xp_engine.check_level_up(xp + delta, level)` per element;
+    returns (new_level, remaining_xp, leveled_up) arrays.
+    """
+
+    current_xp = _as_int64(current_xp, "current_xp")
+    current_level = _as_int64(current_level, "current_level")
+    raw_xp = current_xp + _as_int64(xp_delta, "xp_delta")
+    if np.any(raw_xp < 0):
+        raise ValueError("current_xp must be >= 0.")
+    if np.any(current_level < 1):
+        raise ValueError("current_level must be >= 1.")
+
+    new_level, remaining_xp = get_level_for_total_xp_batch(get_total_xp_batch(current_level, raw_xp))
+    return new_level, remaining_xp, new_level > current_level
@@ -5,8 +5,14 @@ Implements MVP rules from the PRODUCT MASTER DOCUMENT:
 - Perfect lesson bonus: +15 XP
 - XP required per level: 100 * current_level
 - XP carries over across levels
+
+Passing levels 1 .. L - 1 costs 100 * L * (L - 1) / 2 XP in total, so the level
+for a lifetime XP amount is solved in closed form with an integer square root
+instead of looping level by level (see `core/xp_batch_engine.py` for the
+vectorized equivalent).
 """
 
+from math import isqrt
 from typing import Tuple
 
 
@@ -16,6 +22,7 @@ DIFFICULTY_XP = {
     "hard": 30,
 }
 PERFECT_LESSON_BONUS = 15
+XP_PER_LEVEL = 100
 
 
 def calculate_xp(difficulty: str, perfect_bonus: bool = False) -> int:
@@ -48,7 +55,34 @@ def get_xp_required(level: int) -> int:
 
     if level < 1:
         raise ValueError("Level must be >= 1.")
-    return 100 * level
+    return XP_PER_LEVEL * level
+
+
+def get_total_xp(level: int, current_xp: int) -> int:
+    """Return lifetime XP for a user at `level` holding `current_xp` carry-over.
+
+    Lifetime XP is the sum of XP required for every passed level
+    (100 * 1 + ... + 100 * (level - 1)) plus the carry-over XP.
+    """
+
+    if level < 1:
+        raise ValueError("Level must be >= 1.")
+    return XP_PER_LEVEL * level * (level - 1) // 2 + current_xp
+
+
+def get_level_for_total_xp(total_xp: int) -> Tuple[int, int]:
+    """Return (level, carry-over XP) reached with `total_xp` lifetime XP.
+
+    The level is the largest L with 100 * L * (L - 1) / 2 <= total_xp, i.e.
+    L * (L - 1) <= m for m = 2 * total_xp // 100, which gives
+    L = (isqrt(4 * m + 1) + 1) // 2.
+    """
+
+    if total_xp < 0:
+        raise ValueError("total_xp must be >= 0.")
+    pairs = 2 * total_xp // XP_PER_LEVEL
+    level = (isqrt(4 * pairs + 1) + 1) // 2
+    return level, total_xp - XP_PER_LEVEL * level * (level - 1) // 2
 
 
 def check_level_up(current_xp: int, current_level: int) -> Tuple[int, int, bool]:
@@ -67,11 +101,8 @@ def check_level_up(current_xp: int, current_level: int) -> Tuple[int, int, bool]
     if current_level < 1:
         raise ValueError("current_level must be >= 1.")
 
-    new_level = current_level
-    remaining_xp = current_xp
-
-    while remaining_xp >= get_xp_required(new_level):
-        remaining_xp -= get_xp_required(new_level)
-        new_level += 1
+    if current_xp < get_xp_required(current_level):
+        return current_level, current_xp, False
 
+    new_level, remaining_xp = get_level_for_total_xp(get_total_xp(current_level, current_xp))
     return new_level, remaining_xp, new_level > current_level
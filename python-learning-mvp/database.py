@@ -2,12 +2,31 @@
 
 This module configures SQLite + SQLAlchemy primitives used by the rest of the
 application. Models are intentionally not defined here.
+
+Services open sessions through `session_scope()`. Inside an active
+`unit_of_work()` (one per Streamlit rerun) every call shares the same session,
+so rows already loaded during the rerun come from its identity map, and the
+number of SQL statements issued is counted.
+
+Connection settings come from a named storage profile (`STORAGE_PROFILE` in
+`config.py`). Profiles with `separate_read_pool` route read-only service calls
+(`read_session_scope()`) to a second, query-only connection pool so that, in
+WAL mode, readers never wait on the writer.
 """
 
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Hashable, TypeVar
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from config import STORAGE_PROFILE
 
 
 # SQLite database file for local MVP development.
@@ -16,10 +35,127 @@ DATABASE_PATH = BASE_DIR / "app.db"
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
 
-# SQLAlchemy engine configuration.
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
+@dataclass(frozen=True)
+class StorageProfile:
+    """SQLite pragmas and pool sizing applied to every connection."""
+
+    journal_mode: str
+    synchronous: str
+    cache_size_kib: int
+    mmap_size_bytes: int
+    busy_timeout_ms: int
+    temp_store: str
+    pool_size: int
+    max_overflow: int
+    separate_read_pool: bool = False
+    read_pool_size: int = 0
+    read_max_overflow: int = 0
+
+
+STORAGE_PROFILES = {
+    # SQLite defaults plus a busy timeout; one pool for everything.
+    "dev": StorageProfile(
+        journal_mode="DELETE",
+        synchronous="FULL",
+        cache_size_kib=2_000,
+        mmap_size_bytes=0,
+        busy_timeout_ms=5_000,
+        temp_store="DEFAULT",
+        pool_size=5,
+        max_overflow=10,
+    ),
+    # WAL with NORMAL sync (durable at checkpoints), larger page cache and
+    # mmap, and a separate query-only pool for readers.
+    "single-node-prod": StorageProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size_kib=64_000,
+        mmap_size_bytes=256 * 1024 * 1024,
+        busy_timeout_ms=5_000,
+        temp_store="MEMORY",
+        pool_size=4,
+        max_overflow=4,
+        separate_read_pool=True,
+        read_pool_size=8,
+        read_max_overflow=8,
+    ),
+    # Same durability as single-node-prod, sized for many concurrent readers.
+    "read-heavy": StorageProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size_kib=128_000,
+        mmap_size_bytes=1024 * 1024 * 1024,
+        busy_timeout_ms=10_000,
+        temp_store="MEMORY",
+        pool_size=2,
+        max_overflow=2,
+        separate_read_pool=True,
+        read_pool_size=16,
+        read_max_overflow=16,
+    ),
+}
+
+
+def get_storage_profile(name: str = STORAGE_PROFILE) -> StorageProfile:
+    """Return storage profile by name."""
+
+    try:
+        return STORAGE_PROFILES[name]
+    except KeyError:
+        allowed = ", ".join(sorted(STORAGE_PROFILES))
+        raise ValueError(f"Unknown storage profile '{name}'. Allowed: {allowed}.") from None
+
+
+def _create_engine(profile: StorageProfile, pool_size: int, max_overflow: int, query_only: bool) -> Engine:
+    """Create SQLite engine applying profile pragmas on every new connection."""
+
+    new_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def _apply_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={profile.journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={profile.synchronous}")
+            # Negative cache_size is measured in KiB rather than pages.
+            cursor.execute(f"PRAGMA cache_size=-{profile.cache_size_kib}")
+            cursor.execute(f"PRAGMA mmap_size={profile.mmap_size_bytes}")
+            cursor.execute(f"PRAGMA busy_timeout={profile.busy_timeout_ms}")
+            cursor.execute(f"PRAGMA temp_store={profile.temp_store}")
+            if query_only:
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
+    return new_engine
+
+
+storage_profile = get_storage_profile()
+
+# SQLAlchemy engine configuration (writer pool).
+engine = _create_engine(
+    storage_profile,
+    pool_size=storage_profile.pool_size,
+    max_overflow=storage_profile.max_overflow,
+    query_only=False,
+)
+
+# Engine for read-only service calls; the writer engine when the profile
+# does not use a separate read pool.
+read_engine = (
+    _create_engine(
+        storage_profile,
+        pool_size=storage_profile.read_pool_size,
+        max_overflow=storage_profile.read_max_overflow,
+        query_only=True,
+    )
+    if storage_profile.separate_read_pool
+    else engine
 )
 
 
@@ -30,16 +166,120 @@ SessionLocal = sessionmaker(
     bind=engine,
 )
 
+# Factory for read-only sessions.
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine,
+)
+
 
 # Base class for declarative SQLAlchemy models.
 Base = declarative_base()
 
 
+T = TypeVar("T")
+
+
+class UnitOfWork:
+    """Request-scoped session plus memo of objects loaded during the request."""
+
+    def __init__(self) -> None:
+        self.session = SessionLocal(expire_on_commit=False)
+        self.query_count = 0
+        self._memo: dict[Hashable, Any] = {}
+
+    def get(self, key: Hashable, loader: Callable[[], T]) -> T:
+        """Return value loaded once per unit of work for `key`."""
+
+        if key not in self._memo:
+            self._memo[key] = loader()
+        return self._memo[key]
+
+    def forget(self, key: Hashable) -> None:
+        self._memo.pop(key, None)
+
+
+_current_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("current_unit_of_work", default=None)
+
+
+def _count_query(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        uow.query_count += 1
+
+
+event.listen(engine, "before_cursor_execute", _count_query)
+if read_engine is not engine:
+    event.listen(read_engine, "before_cursor_execute", _count_query)
+
+
+def current_unit_of_work() -> UnitOfWork | None:
+    """Return unit of work active in this thread/context, if any."""
+
+    return _current_unit_of_work.get()
+
+
+@contextmanager
+def unit_of_work(commit_on: tuple[type[BaseException], ...] = ()) -> Iterator[UnitOfWork]:
+    """Open one session for a request; commit on success, roll back on error.
+
+    Exceptions in `commit_on` end the request normally rather than fail it
+    (e.g. Streamlit's rerun/stop control flow): the session is committed and
+    the exception re-raised.
+    """
+
+    uow = UnitOfWork()
+    token = _current_unit_of_work.set(uow)
+    try:
+        yield uow
+        uow.session.commit()
+    except commit_on:
+        uow.session.commit()
+        raise
+    except BaseException:
+        uow.session.rollback()
+        raise
+    finally:
+        _current_unit_of_work.reset(token)
+        uow.session.close()
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Yield the active unit-of-work session, or a short-lived session."""
+
+    uow = _current_unit_of_work.get()
+    if uow is not None:
+        yield uow.session
+        return
+    with SessionLocal() as db:
+        yield db
+
+
+@contextmanager
+def read_session_scope() -> Iterator[Session]:
+    """Yield a session for read-only queries.
+
+    Uses the query-only read pool when the storage profile has one, otherwise
+    behaves like `session_scope()`.
+    """
+
+    if read_engine is engine:
+        with session_scope() as db:
+            yield db
+        return
+    with ReadSessionLocal() as db:
+        yield db
+
+
 def init_db() -> None:
-    """Initialize database schema for all registered models.
+    """Bring the database schema up to date by applying pending migrations.
 
-    Note: Model definitions are not added yet. This function is prepared for
-    future use once models are implemented and imported before metadata create.
+    See `migrations/runner.py`; the same step is available as
+    `python -m migrations upgrade`.
     """
 
-    Base.metadata.create_all(bind=engine)
+    from migrations.runner import upgrade
+
+    upgrade(engine)
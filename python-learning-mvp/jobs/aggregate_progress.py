@@ -0,0 +1,35 @@
+"""Fold answer attempt events past each watermark into their aggregates.
+
+Usage:
+    python -m jobs.aggregate_progress [--batch-size 5000]
+
+Aggregates are user_progress (with module progress), review schedules and
+exercise statistics.
+The app folds new events after every attempt log flush; this job catches up
+after downtime or a failed fold.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from config import PROGRESS_AGGREGATE_BATCH_SIZE
+from database import init_db
+import services.adaptive_service  # noqa: F401 - registers the exercise_stats consumer
+import services.review_service  # noqa: F401 - registers the review consumer
+from services.progress_service import aggregate_attempts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=PROGRESS_AGGREGATE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    init_db()
+    for name, consumed in aggregate_attempts(batch_size=args.batch_size).items():
+        print(f"{name}: {consumed} events folded.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+"""Recompute `users.total_xp` from stored (level, xp) in batches.
+
+Migration 0002 backfills the column in one statement when it adds it; this
+job re-derives it in short id-range transactions whenever it needs repairing.
+
+Usage:
+    python -m jobs.backfill_total_xp [--batch-size 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from database import init_db
+from services.leaderboard_service import backfill_total_xp
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    init_db()
+    updated = backfill_total_xp(
+        batch_size=args.batch_size,
+        on_batch=lambda upper_id, total: print(f"users.id <= {upper_id}: {total} rows updated"),
+    )
+    print(f"Backfill complete: {updated} users.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
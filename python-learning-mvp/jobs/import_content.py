@@ -0,0 +1,40 @@
+"""Import a course pack (JSONL or YAML) into modules, lessons and exercises.
+
+Usage:
+    python -m jobs.import_content PATH [--chunk-size 5000]
+
+Re-running with the same pack is safe: rows are upserted by external_id.
+Exits with status 1 if any record was rejected.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from config import CONTENT_IMPORT_CHUNK_SIZE
+from database import init_db
+from services.content_import_service import ImportReport, import_course_pack
+
+
+def _print_progress(report: ImportReport) -> None:
+    print(f"chunk {report.chunks}: {report.summary()}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="course pack file (.jsonl, .yaml or .yml)")
+    parser.add_argument("--chunk-size", type=int, default=CONTENT_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    init_db()
+    report = import_course_pack(args.path, chunk_size=args.chunk_size, on_chunk=_print_progress)
+    print(f"Import complete: {report.summary()}")
+    for error in report.errors:
+        print(f"  rejected {error}")
+    if report.rejected > len(report.errors):
+        print(f"  ... and {report.rejected - len(report.errors)} more")
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
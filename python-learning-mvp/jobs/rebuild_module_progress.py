@@ -0,0 +1,33 @@
+"""Recompute per-user module progress from user_progress.
+
+Usage:
+    python -m jobs.rebuild_module_progress [--batch-size 5000]
+
+The progress aggregator keeps the table current as lessons are completed;
+run this after course pack imports that move or remove lessons.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from database import init_db
+from services.progress_service import rebuild_module_progress
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    init_db()
+    written = rebuild_module_progress(
+        batch_size=args.batch_size,
+        on_batch=lambda upper_id, total: print(f"users.id <= {upper_id}: {total} rows written"),
+    )
+    print(f"Rebuild complete: {written} module progress rows.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,32 @@
+"""Regenerate due hearts for all users with one set-based UPDATE.
+
+Usage:
+    python -m jobs.regenerate_hearts
+
+Meant to run periodically (e.g. from cron every few minutes). Learners also
+get due hearts on their next request, so the schedule only affects how fresh
+the stored values are for users who are not active.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from database import init_db
+from services.hearts_service import regenerate_due_hearts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+
+    init_db()
+    started = time.perf_counter()
+    updated = regenerate_due_hearts()
+    print(f"Regenerated hearts for {updated} users in {time.perf_counter() - started:.3f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
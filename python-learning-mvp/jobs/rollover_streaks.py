@@ -0,0 +1,39 @@
+"""Zero streaks broken by a missed day, in keyset-paginated chunks.
+
+Usage:
+    python -m jobs.rollover_streaks [--chunk-size 5000] [--date YYYY-MM-DD]
+
+Meant to run once a day shortly after midnight. `--date` replays the rollover
+as of another day.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date
+
+from config import STREAK_ROLLOVER_CHUNK_SIZE
+from database import init_db
+from services.streak_service import rollover_streaks
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=STREAK_ROLLOVER_CHUNK_SIZE)
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="day to roll over to (default: today)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    started = time.perf_counter()
+    reset = rollover_streaks(
+        today=args.date,
+        chunk_size=args.chunk_size,
+        on_chunk=lambda rows, total: print(f"{rows} streaks reset ({total} total)"),
+    )
+    print(f"Rollover complete: {reset} streaks reset in {time.perf_counter() - started:.3f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,32 @@
+"""Spread overdue review backlogs over the following days.
+
+Usage:
+    python -m jobs.spread_reviews [--per-day 50] [--user-id ID]
+
+Keeps at most `--per-day` reviews due today for each user (earliest first)
+and moves the rest to later days, in one set-based UPDATE.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from config import REVIEW_MAX_PER_DAY
+from database import init_db
+from services.review_service import spread_overdue_reviews
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-day", type=int, default=REVIEW_MAX_PER_DAY)
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    init_db()
+    moved = spread_overdue_reviews(per_day=args.per_day, user_id=args.user_id)
+    print(f"Moved {moved} overdue reviews to later days.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
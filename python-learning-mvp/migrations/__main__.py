@@ -0,0 +1,74 @@
+"""Schema migration CLI.
+
+Usage:
+    python -m migrations upgrade [--to VERSION]
+    python -m migrations status
+    python -m migrations check-plans [--current]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from database import engine
+from migrations.plan_check import check_query_plans
+from migrations.runner import applied_versions, discover_migrations, upgrade
+
+
+def _upgrade(args: argparse.Namespace) -> int:
+    applied = upgrade(
+        engine,
+        target=args.to,
+        on_applied=lambda migration: print(f"Applied {migration.version:04d}_{migration.name}"),
+    )
+    if not applied:
+        print("Database is up to date.")
+    return 0
+
+
+def _status(args: argparse.Namespace) -> int:
+    applied = applied_versions(engine)
+    for migration in discover_migrations():
+        marker = "x" if migration.version in applied else " "
+        print(f"[{marker}] {migration.version:04d}_{migration.name}: {migration.description}")
+    return 0
+
+
+def _check_plans(args: argparse.Namespace) -> int:
+    reports = check_query_plans(engine if args.current else None)
+    for report in reports:
+        print(f"{'ok  ' if report.ok else 'FAIL'} {report.name}")
+        for line in report.plan:
+            print(f"       {line}")
+        for problem in report.problems:
+            print(f"     ! {problem}")
+    failed = sum(not report.ok for report in reports)
+    print(f"{len(reports) - failed}/{len(reports)} query plans use indexes.")
+    return 1 if failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m migrations", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, default=None, help="stop after this version")
+    upgrade_parser.set_defaults(handler=_upgrade)
+
+    status_parser = commands.add_parser("status", help="list migrations and whether they are applied")
+    status_parser.set_defaults(handler=_status)
+
+    check_parser = commands.add_parser("check-plans", help="fail if a hot service query scans a table")
+    check_parser.add_argument(
+        "--current",
+        action="store_true",
+        help="explain against app.db as it is instead of a fresh migrated database",
+    )
+    check_parser.set_defaults(handler=_check_plans)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
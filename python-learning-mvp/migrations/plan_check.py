@@ -0,0 +1,119 @@
+"""`EXPLAIN QUERY PLAN` check for the hot queries issued by `services/*`.
+
+Each registered statement is compiled for SQLite and explained against a
+database migrated to head. A plan fails when it scans a table without an
+index or sorts through a temporary B-tree. Queries that read a whole ordered
+set by design may walk an index end to end (`allow_index_scan=True`).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from sqlalchemy import Engine, Executable, create_engine
+
+from migrations.runner import upgrade
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """Service query whose plan must stay index-backed."""
+
+    name: str
+    build: Callable[[], Executable]
+    allow_index_scan: bool = False
+
+
+@dataclass
+class PlanReport:
+    """Plan lines and problems found for one query."""
+
+    name: str
+    plan: list[str] = field(default_factory=list)
+    problems: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def hot_queries() -> list[HotQuery]:
+    """Return statements to check; imported lazily to keep the CLI light."""
+
+    from services.adaptive_service import exercise_stats_statement
+    from services.ai_cache_service import cached_exercise_statement
+    from services.content_cache_service import content_version_statement
+    from services.exercise_stock_service import available_count_statement, next_available_statement
+    from services.hearts_service import regenerate_statement
+    from services.leaderboard_service import leaderboard_statement
+    from services.lesson_service import (
+        exercises_statement,
+        lessons_statement,
+        module_lesson_counts_statement,
+        modules_statement,
+    )
+    from services.progress_service import lesson_progress_statement, module_progress_statement
+    from services.review_service import due_reviews_statement
+    from services.streak_service import rollover_statement
+
+    stock_key = ("python basics", "easy")
+    return [
+        HotQuery("lesson_service.modules", modules_statement, allow_index_scan=True),
+        HotQuery("lesson_service.lessons", lambda: lessons_statement(1)),
+        HotQuery("lesson_service.exercises", lambda: exercises_statement(1)),
+        HotQuery("lesson_service.module_lesson_counts", module_lesson_counts_statement, allow_index_scan=True),
+        HotQuery("leaderboard_service.top", lambda: leaderboard_statement().limit(20), allow_index_scan=True),
+        HotQuery("content_cache_service.version", content_version_statement),
+        HotQuery("ai_cache_service.lookup", lambda: cached_exercise_statement("0" * 64)),
+        HotQuery("exercise_stock_service.count", lambda: available_count_statement(stock_key)),
+        HotQuery("exercise_stock_service.next", lambda: next_available_statement(stock_key)),
+        HotQuery("hearts_service.regenerate", lambda: regenerate_statement(datetime(2024, 1, 1))),
+        HotQuery("progress_service.lessons", lambda: lesson_progress_statement(1, [1, 2, 3])),
+        HotQuery("progress_service.modules", lambda: module_progress_statement(1)),
+        HotQuery("adaptive_service.stats", lambda: exercise_stats_statement([1, 2, 3])),
+        HotQuery("review_service.due", lambda: due_reviews_statement(1, datetime(2024, 1, 1), 20)),
+        HotQuery("streak_service.rollover", lambda: rollover_statement(date(2024, 1, 1), (date(2023, 6, 1), 1))),
+    ]
+
+
+def explain(engine: Engine, statement: Executable) -> list[str]:
+    """Return `EXPLAIN QUERY PLAN` detail lines for a statement."""
+
+    # Expand IN lists so the statement can be sent as plain SQL.
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def _plan_problems(plan: list[str], allow_index_scan: bool) -> list[str]:
+    problems = []
+    for line in plan:
+        if line.startswith("SCAN") and "INDEX" not in line:
+            problems.append(f"full table scan: {line}")
+        elif line.startswith("SCAN") and not allow_index_scan:
+            problems.append(f"full index scan: {line}")
+        elif "USE TEMP B-TREE" in line:
+            problems.append(f"sort without index: {line}")
+    return problems
+
+
+def check_query_plans(engine: Engine | None = None) -> list[PlanReport]:
+    """Explain every hot query against `engine` as it is.
+
+    Without an engine, a fresh in-memory database is migrated to head first,
+    which checks the index set the migrations would roll out.
+    """
+
+    if engine is None:
+        engine = create_engine("sqlite://")
+        upgrade(engine)
+
+    reports = []
+    for query in hot_queries():
+        plan = explain(engine, query.build())
+        reports.append(PlanReport(query.name, plan, _plan_problems(plan, query.allow_index_scan)))
+    return reports
@@ -0,0 +1,155 @@
+"""Ordered schema migrations tracked in the `schema_version` table.
+
+Migration scripts live in `migrations/versions/` as `NNNN_short_name.py`. Each
+module's docstring is its description and it defines `upgrade(connection)`.
+Scripts run in version order, each in its own `BEGIN IMMEDIATE` transaction
+together with its `schema_version` row, so a failed script leaves no trace and
+concurrently starting processes apply every migration exactly once.
+
+`0001` creates any table missing from the current models, so on a fresh
+database later scripts find their columns and indexes already in place. Every
+script after it must therefore be idempotent (`IF NOT EXISTS`, column checks).
+"""
+
+from __future__ import annotations
+
+import importlib
+import pkgutil
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import Column, Connection, DateTime, Engine, Integer, MetaData, String, Table, select, text
+
+
+VERSIONS_DIR = Path(__file__).resolve().parent / "versions"
+VERSIONS_PACKAGE = "migrations.versions"
+_SCRIPT_NAME = re.compile(r"^(\d{4})_(\w+)$")
+
+_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One migration script."""
+
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def discover_migrations() -> list[Migration]:
+    """Return migration scripts sorted by version."""
+
+    migrations: list[Migration] = []
+    for module_info in pkgutil.iter_modules([str(VERSIONS_DIR)]):
+        match = _SCRIPT_NAME.match(module_info.name)
+        if match is None:
+            continue
+        module = importlib.import_module(f"{VERSIONS_PACKAGE}.{module_info.name}")
+        description = (module.__doc__ or "").strip().splitlines()
+        migrations.append(
+            Migration(
+                version=int(match.group(1)),
+                name=match.group(2),
+                description=description[0] if description else match.group(2),
+                upgrade=module.upgrade,
+            )
+        )
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def applied_versions(bind: Engine | Connection) -> set[int]:
+    """Return versions recorded in `schema_version` (empty for new databases)."""
+
+    if isinstance(bind, Engine):
+        with bind.connect() as connection:
+            return applied_versions(connection)
+    if not bind.dialect.has_table(bind, schema_version.name):
+        return set()
+    return set(bind.execute(select(schema_version.c.version)).scalars())
+
+
+def current_version(bind: Engine | Connection) -> int:
+    """Return highest applied migration version, 0 for an empty database."""
+
+    return max(applied_versions(bind), default=0)
+
+
+def pending_migrations(bind: Engine | Connection) -> list[Migration]:
+    """Return migrations not yet applied, in version order."""
+
+    applied = applied_versions(bind)
+    return [migration for migration in discover_migrations() if migration.version not in applied]
+
+
+def _apply(engine: Engine, migration: Migration) -> bool:
+    """Apply one migration; returns False if another process already did."""
+
+    # Driver-level autocommit so that the explicit BEGIN/COMMIT below also
+    # covers DDL, which pysqlite would otherwise run outside the transaction.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            schema_version.create(bind=connection, checkfirst=True)
+            already_applied = connection.execute(
+                select(schema_version.c.version).where(schema_version.c.version == migration.version)
+            ).first()
+            if already_applied is None:
+                migration.upgrade(connection)
+                connection.execute(
+                    schema_version.insert().values(
+                        version=migration.version,
+                        name=migration.name,
+                        applied_at=datetime.utcnow(),
+                    )
+                )
+        except BaseException:
+            connection.exec_driver_sql("ROLLBACK")
+            raise
+        connection.exec_driver_sql("COMMIT")
+    return already_applied is None
+
+
+def upgrade(
+    engine: Engine,
+    target: int | None = None,
+    on_applied: Callable[[Migration], None] | None = None,
+) -> list[Migration]:
+    """Apply pending migrations up to `target` (all by default).
+
+    Returns the migrations applied by this call.
+    """
+
+    applied: list[Migration] = []
+    for migration in pending_migrations(engine):
+        if target is not None and migration.version > target:
+            break
+        if _apply(engine, migration):
+            applied.append(migration)
+            if on_applied is not None:
+                on_applied(migration)
+    return applied
+
+
+def column_names(connection: Connection, table_name: str) -> set[str]:
+    """Return column names of an existing table."""
+
+    rows = connection.execute(text(f'PRAGMA table_info("{table_name}")'))
+    return {row.name for row in rows}
@@ -0,0 +1,12 @@
+"""Create all tables defined in models.py that do not exist yet."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection
+
+import models  # noqa: F401 - registers tables on Base.metadata
+from database import Base
+
+
+def upgrade(connection: Connection) -> None:
+    Base.metadata.create_all(bind=connection)
@@ -0,0 +1,21 @@
+"""Add users.total_xp, backfill it and index the leaderboard ordering."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+from migrations.runner import column_names
+
+
+def upgrade(connection: Connection) -> None:
+    if "total_xp" not in column_names(connection, "users"):
+        connection.execute(text("ALTER TABLE users ADD COLUMN total_xp INTEGER NOT NULL DEFAULT 0"))
+        # Same formula as core.xp_engine.get_total_xp with XP_PER_LEVEL = 100.
+        connection.execute(text("UPDATE users SET total_xp = 50 * level * (level - 1) + xp"))
+
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_users_leaderboard "
+            "ON users (total_xp DESC, created_at ASC, id ASC, email, level, streak)"
+        )
+    )
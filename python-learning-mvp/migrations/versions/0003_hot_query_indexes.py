@@ -0,0 +1,28 @@
+"""Index module/lesson ordering and make user_progress unique per lesson."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+
+def upgrade(connection: Connection) -> None:
+    # get_modules(): ORDER BY "order", id without a sort step.
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_modules_order ON modules ("order", id)'))
+    # get_lessons(module_id): seek by module, rows already in lesson order.
+    connection.execute(
+        text('CREATE INDEX IF NOT EXISTS ix_lessons_module_order ON lessons (module_id, "order", id)')
+    )
+
+    # One progress row per (user, lesson); keep the newest duplicate.
+    connection.execute(
+        text(
+            "DELETE FROM user_progress WHERE id NOT IN "
+            "(SELECT MAX(id) FROM user_progress GROUP BY user_id, lesson_id)"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_progress_user_lesson "
+            "ON user_progress (user_id, lesson_id)"
+        )
+    )
@@ -0,0 +1,17 @@
+"""Add unique external_id to modules, lessons and exercises for imports."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+from migrations.runner import column_names
+
+
+def upgrade(connection: Connection) -> None:
+    for table in ("modules", "lessons", "exercises"):
+        if "external_id" not in column_names(connection, table):
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN external_id VARCHAR(255)"))
+        # NULLs are distinct in SQLite unique indexes, so in-app rows are unaffected.
+        connection.execute(
+            text(f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_external_id ON {table} (external_id)")
+        )
@@ -0,0 +1,32 @@
+"""Persist the hearts regeneration anchor as users.next_heart_at."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Connection, DateTime, bindparam, text
+
+from core.hearts_engine import MAX_HEARTS, REGEN_INTERVAL
+from migrations.runner import column_names
+
+
+def upgrade(connection: Connection) -> None:
+    if "next_heart_at" not in column_names(connection, "users"):
+        connection.execute(text("ALTER TABLE users ADD COLUMN next_heart_at DATETIME"))
+
+    # The old anchor was never stored: restart the countdown for users who
+    # are missing hearts.
+    connection.execute(
+        text(
+            "UPDATE users SET next_heart_at = :next_heart_at "
+            "WHERE next_heart_at IS NULL AND premium = 0 AND hearts < :max_hearts"
+        ).bindparams(bindparam("next_heart_at", type_=DateTime)),
+        {"next_heart_at": datetime.utcnow() + REGEN_INTERVAL, "max_hearts": MAX_HEARTS},
+    )
+
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_users_next_heart_at "
+            "ON users (next_heart_at) WHERE next_heart_at IS NOT NULL"
+        )
+    )
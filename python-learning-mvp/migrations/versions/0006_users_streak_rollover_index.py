@@ -0,0 +1,14 @@
+"""Index users with a running streak by last_activity_date for the rollover job."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+
+def upgrade(connection: Connection) -> None:
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_users_streak_rollover "
+            "ON users (last_activity_date, id) WHERE streak > 0"
+        )
+    )
@@ -0,0 +1,12 @@
+"""Add the answer_attempts event log and aggregation watermarks."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection
+
+from models import AggregationWatermark, AnswerAttempt
+
+
+def upgrade(connection: Connection) -> None:
+    AnswerAttempt.__table__.create(bind=connection, checkfirst=True)
+    AggregationWatermark.__table__.create(bind=connection, checkfirst=True)
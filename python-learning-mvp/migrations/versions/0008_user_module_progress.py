@@ -0,0 +1,21 @@
+"""Add user_module_progress and fill it from user_progress."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+from models import UserModuleProgress
+
+
+def upgrade(connection: Connection) -> None:
+    UserModuleProgress.__table__.create(bind=connection, checkfirst=True)
+    connection.execute(
+        text(
+            "INSERT INTO user_module_progress (user_id, module_id, completed_lessons, updated_at) "
+            "SELECT up.user_id, l.module_id, COUNT(*), CURRENT_TIMESTAMP "
+            "FROM user_progress AS up JOIN lessons AS l ON l.id = up.lesson_id "
+            "WHERE up.completed = 1 "
+            "GROUP BY up.user_id, l.module_id "
+            "ON CONFLICT (user_id, module_id) DO UPDATE SET completed_lessons = excluded.completed_lessons"
+        )
+    )
@@ -0,0 +1,14 @@
+"""Add review_items with a (user_id, due_at) index for spaced repetition."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+from models import ReviewItem
+
+
+def upgrade(connection: Connection) -> None:
+    ReviewItem.__table__.create(bind=connection, checkfirst=True)
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_review_items_user_due ON review_items (user_id, due_at)")
+    )
@@ -0,0 +1,16 @@
+"""Add answer_attempts.duration_ms and the exercise_stats aggregate."""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, text
+
+from migrations.runner import column_names
+from models import ExerciseStat
+
+
+def upgrade(connection: Connection) -> None:
+    if "duration_ms" not in column_names(connection, "answer_attempts"):
+        connection.execute(text("ALTER TABLE answer_attempts ADD COLUMN duration_ms INTEGER"))
+    # The exercise_stats consumer starts at watermark 0, so its first fold
+    # replays the existing log.
+    ExerciseStat.__table__.create(bind=connection, checkfirst=True)
@@ -1,12 +1,17 @@
 """SQLAlchemy ORM models for the MVP database schema.
 
 Models are based on PRODUCT MASTER DOCUMENT entities:
-User, Module, Lesson, Exercise, and UserProgress.
+User, Module, Lesson, Exercise, and UserProgress (rolled up per module in
+UserModuleProgress), plus ContentVersion used for content cache invalidation,
+AIGenerationCache and GeneratedExerciseStock for AI-generated exercises,
+ReviewItem for spaced repetition, ExerciseStat running answer statistics,
+and the AnswerAttempt event log with the AggregationWatermark its consumers
+advance.
 """
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -21,10 +26,13 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     xp: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_xp: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     level: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     streak: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     last_activity_date: Mapped[Date | None] = mapped_column(Date, nullable=True)
     hearts: Mapped[int] = mapped_column(Integer, default=5, nullable=False)
+    # When the next heart regenerates; NULL while hearts are full.
+    next_heart_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     premium: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -34,12 +42,45 @@ class User(Base):
     )
 
 
+# Covering index for the leaderboard top-N scan: ordering columns first, then
+# every column the leaderboard reads, so SQLite never touches the table rows.
+Index(
+    "ix_users_leaderboard",
+    User.total_xp.desc(),
+    User.created_at.asc(),
+    User.id.asc(),
+    User.email,
+    User.level,
+    User.streak,
+)
+
+
+# Only users waiting for a heart are indexed, so the regeneration job's
+# "next_heart_at <= now" range scan never touches full-hearts users.
+Index(
+    "ix_users_next_heart_at",
+    User.next_heart_at,
+    sqlite_where=User.next_heart_at.is_not(None),
+)
+
+# Only users with a running streak are indexed, so the nightly rollover walks
+# candidates in (last_activity_date, id) order and zeroed rows drop out.
+Index(
+    "ix_users_streak_rollover",
+    User.last_activity_date,
+    User.id,
+    sqlite_where=User.streak > 0,
+)
+
+
 class Module(Base):
     """Top-level learning module that groups lessons."""
 
     __tablename__ = "modules"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # Stable id from imported course packs; NULL for content created in-app.
+    external_id: Mapped[str | None] = mapped_column(String(255), nullable=True, unique=True, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     order: Mapped[int] = mapped_column(Integer, nullable=False)
 
@@ -49,12 +90,17 @@ class Module(Base):
     )
 
 
+Index("ix_modules_order", Module.order, Module.id)
+
+
 class Lesson(Base):
     """Lesson entity inside a module."""
 
     __tablename__ = "lessons"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # Stable id from imported course packs; NULL for content created in-app.
+    external_id: Mapped[str | None] = mapped_column(String(255), nullable=True, unique=True, index=True)
     module_id: Mapped[int] = mapped_column(ForeignKey("modules.id"), nullable=False, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     order: Mapped[int] = mapped_column(Integer, nullable=False)
@@ -71,12 +117,18 @@ class Lesson(Base):
     )
 
 
+# Lessons of a module come straight off the index in display order.
+Index("ix_lessons_module_order", Lesson.module_id, Lesson.order, Lesson.id)
+
+
 class Exercise(Base):
     """Exercise item associated with a lesson."""
 
     __tablename__ = "exercises"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # Stable id from imported course packs; NULL for content created in-app.
+    external_id: Mapped[str | None] = mapped_column(String(255), nullable=True, unique=True, index=True)
     lesson_id: Mapped[int] = mapped_column(ForeignKey("lessons.id"), nullable=False, index=True)
     type: Mapped[str] = mapped_column(String(50), nullable=False)
     question: Mapped[str] = mapped_column(Text, nullable=False)
@@ -102,3 +154,138 @@ class UserProgress(Base):
 
     user: Mapped["User"] = relationship(back_populates="progress_entries")
     lesson: Mapped["Lesson"] = relationship(back_populates="progress_entries")
+
+
+Index("uq_user_progress_user_lesson", UserProgress.user_id, UserProgress.lesson_id, unique=True)
+
+
+class UserModuleProgress(Base):
+    """Completed lesson count per user and module, derived from user_progress.
+
+    Kept current by the progress aggregator and rebuilt by
+    `python -m jobs.rebuild_module_progress`.
+    """
+
+    __tablename__ = "user_module_progress"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    module_id: Mapped[int] = mapped_column(ForeignKey("modules.id"), primary_key=True)
+    completed_lessons: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ContentVersion(Base):
+    """Single-row counter bumped whenever learning content changes."""
+
+    __tablename__ = "content_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AIGenerationCache(Base):
+    """Cached AI-generated exercise payload keyed by request fingerprint."""
+
+    __tablename__ = "ai_generation_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    topic: Mapped[str] = mapped_column(String(255), nullable=False)
+    difficulty: Mapped[str] = mapped_column(String(50), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload_json: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class GeneratedExerciseStock(Base):
+    """Validated AI-generated exercise waiting to be handed out."""
+
+    __tablename__ = "generated_exercise_stock"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(255), nullable=False)
+    difficulty: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload_json: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    consumed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+# Partial index over unused stock only: the consumer's "oldest unused item for
+# (topic, difficulty)" lookup is a single index seek.
+Index(
+    "ix_generated_exercise_stock_available",
+    GeneratedExerciseStock.topic,
+    GeneratedExerciseStock.difficulty,
+    GeneratedExerciseStock.id,
+    sqlite_where=GeneratedExerciseStock.consumed_at.is_(None),
+)
+
+
+class ReviewItem(Base):
+    """Spaced-repetition schedule of one exercise for one user."""
+
+    __tablename__ = "review_items"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    exercise_id: Mapped[int] = mapped_column(ForeignKey("exercises.id"), primary_key=True)
+    # Denormalized so a review session can read exercises from the lesson cache.
+    lesson_id: Mapped[int] = mapped_column(ForeignKey("lessons.id"), nullable=False)
+    repetitions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    interval_days: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    ease: Mapped[float] = mapped_column(Float, default=2.5, nullable=False)
+    lapses: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    due_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_reviewed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+# "Next N due reviews" for a user is one range seek, already in due order.
+Index("ix_review_items_user_due", ReviewItem.user_id, ReviewItem.due_at)
+
+
+class AnswerAttempt(Base):
+    """Append-only learning event: one answer, or one finished lesson run.
+
+    Rows are never updated. Aggregates such as `UserProgress` are folded from
+    rows past a consumer's `AggregationWatermark`; AUTOINCREMENT keeps ids
+    from being reused below a watermark.
+    """
+
+    __tablename__ = "answer_attempts"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    lesson_id: Mapped[int] = mapped_column(ForeignKey("lessons.id"), nullable=False)
+    # NULL for lesson_complete events.
+    exercise_id: Mapped[int | None] = mapped_column(ForeignKey("exercises.id"), nullable=True)
+    # Groups the events of one pass through a lesson.
+    run_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    is_correct: Mapped[bool | None] = mapped_column(Boolean, nullable=True)
+    score: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Time from showing the exercise to submitting; NULL when not measured.
+    duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ExerciseStat(Base):
+    """Running answer statistics of one exercise, folded from the attempt log."""
+
+    __tablename__ = "exercise_stats"
+
+    exercise_id: Mapped[int] = mapped_column(ForeignKey("exercises.id"), primary_key=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    correct: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Streaming median estimate (see core.adaptive_engine).
+    median_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AggregationWatermark(Base):
+    """Last `answer_attempts.id` folded by a named aggregate consumer."""
+
+    __tablename__ = "aggregation_watermarks"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
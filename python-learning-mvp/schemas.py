@@ -1,9 +1,167 @@
 """Data schemas for validation and transfer.
 
-This module will contain request/response schemas used between UI and service
-layers.
+This module contains request/response schemas used between UI and service
+layers. Content snapshots are immutable and detached from any DB session, so
+they can be shared safely across Streamlit reruns and threads.
 """
 
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class ModuleSnapshot:
+    """Read-only copy of a `models.Module` row."""
+
+    id: int
+    title: str
+    order: int
+
+    @classmethod
+    def from_model(cls, module: Any) -> "ModuleSnapshot":
+        return cls(id=module.id, title=module.title, order=module.order)
+
+
+@dataclass(frozen=True)
+class LessonSnapshot:
+    """Read-only copy of a `models.Lesson` row."""
+
+    id: int
+    module_id: int
+    title: str
+    order: int
+    difficulty: str
+
+    @classmethod
+    def from_model(cls, lesson: Any) -> "LessonSnapshot":
+        return cls(
+            id=lesson.id,
+            module_id=lesson.module_id,
+            title=lesson.title,
+            order=lesson.order,
+            difficulty=lesson.difficulty,
+        )
+
+
+@dataclass(frozen=True)
+class ExerciseSnapshot:
+    """Read-only copy of a `models.Exercise` row with options pre-parsed."""
+
+    id: int
+    lesson_id: int
+    type: str
+    question: str
+    options_json: str | None
+    correct_answer: str
+    explanation: str | None
+    difficulty: str
+    options: tuple[str, ...] = ()
+
+    @classmethod
+    def from_model(cls, exercise: Any) -> "ExerciseSnapshot":
+        return cls(
+            id=exercise.id,
+            lesson_id=exercise.lesson_id,
+            type=exercise.type,
+            question=exercise.question,
+            options_json=exercise.options_json,
+            correct_answer=exercise.correct_answer,
+            explanation=exercise.explanation,
+            difficulty=exercise.difficulty,
+            options=tuple(json.loads(exercise.options_json or "[]")),
+        )
+
+
+@dataclass(frozen=True)
+class LessonBundle:
+    """Everything the exercise page needs for one lesson session."""
+
+    lesson: LessonSnapshot
+    exercises: tuple[ExerciseSnapshot, ...]
+    next_lesson_id: int | None
+
+
+# RUN_CODE exercises store test assertions in `correct_answer`.
+EXERCISE_TYPES = frozenset({"MULTIPLE_CHOICE", "FILL_CODE", "WRITE_LINE", "RUN_CODE"})
+
+REQUIRED_EXERCISE_FIELDS = frozenset(
+    {
+        "type",
+        "question",
+        "options_json",
+        "correct_answer",
+        "explanation",
+        "difficulty",
+    }
+)
+REQUIRED_MODULE_FIELDS = frozenset({"external_id", "title", "order"})
+REQUIRED_LESSON_FIELDS = frozenset({"external_id", "module", "title", "order", "difficulty"})
+
+
+def _require_fields(kind: str, payload: Any, required: frozenset[str]) -> None:
+    if not isinstance(payload, dict):
+        raise ValueError(f"{kind} payload must be an object, got {type(payload).__name__}")
+    missing = required - payload.keys()
+    if missing:
+        raise ValueError(f"{kind} payload missing required fields: {sorted(missing)}")
+
+
+def validate_exercise_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    """Validate and normalize payload in place to `models.Exercise` shape.
+
+    Shared by AI generation and content import. `options_json` may be given
+    as a list (serialized here), a JSON string or None.
+    """
+
+    _require_fields("Exercise", payload, REQUIRED_EXERCISE_FIELDS)
+
+    payload["type"] = str(payload["type"]).strip().upper()
+    payload["question"] = str(payload["question"]).strip()
+    payload["correct_answer"] = str(payload["correct_answer"]).strip()
+    payload["explanation"] = str(payload["explanation"]).strip()
+    payload["difficulty"] = str(payload["difficulty"]).strip().lower()
+
+    if payload["type"] not in EXERCISE_TYPES:
+        raise ValueError(f"Unsupported exercise type: {payload['type']}")
+
+    options = payload.get("options_json")
+    if options is None:
+        payload["options_json"] = None
+    elif isinstance(options, str):
+        payload["options_json"] = options
+    else:
+        payload["options_json"] = json.dumps(options, ensure_ascii=False)
+
+    return payload
+
+
+def validate_module_record(record: dict[str, Any]) -> dict[str, Any]:
+    """Validate and normalize an imported module record in place."""
+
+    _require_fields("Module", record, REQUIRED_MODULE_FIELDS)
+    record["external_id"] = str(record["external_id"]).strip()
+    record["title"] = str(record["title"]).strip()
+    record["order"] = int(record["order"])
+    return record
+
+
+def validate_lesson_record(record: dict[str, Any]) -> dict[str, Any]:
+    """Validate and normalize an imported lesson record in place.
+
+    `module` is the external id of the parent module.
+    """
+
+    _require_fields("Lesson", record, REQUIRED_LESSON_FIELDS)
+    record["external_id"] = str(record["external_id"]).strip()
+    record["module"] = str(record["module"]).strip()
+    record["title"] = str(record["title"]).strip()
+    record["order"] = int(record["order"])
+    record["difficulty"] = str(record["difficulty"]).strip().lower()
+    return record
+
+
 # TODO: Add auth-related schemas.
-# TODO: Add lesson and exercise schemas.
 # TODO: Add gamification result schemas.
@@ -0,0 +1,143 @@
+"""Adaptive exercise selection backed by per-exercise running statistics.
+
+Every graded answer in the attempt log updates its exercise's row in
+`exercise_stats` (attempts, correct answers, streaming median time) through a
+consumer registered on the progress service's attempt log, so statistics are
+maintained per batch in O(1) per event instead of being recomputed from
+history.
+
+Choosing the next exercise never touches the database on the hot path: each
+lesson's `CandidateIndex` (exercise ids grouped by band and ordered for
+serving) is built once from the content cache and one primary-key read of
+`exercise_stats`, then kept in memory for `ADAPTIVE_INDEX_TTL_SECONDS` or
+until the content version changes.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Collection, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Connection, Select, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import ADAPTIVE_INDEX_TTL_SECONDS
+from core.adaptive_engine import CandidateIndex, ExerciseStats, build_candidate_index, record_attempt, target_band
+from database import read_session_scope
+from models import ExerciseStat
+from services.content_cache_service import get_content_cache
+from services.lesson_service import get_exercises
+from services.progress_service import ANSWER, register_attempt_consumer
+
+
+STATS_CONSUMER = "exercise_stats"
+
+
+def _row_to_stats(row: Any) -> ExerciseStats:
+    return ExerciseStats(row.exercise_id, row.attempts, row.correct, row.median_ms)
+
+
+def exercise_stats_statement(exercise_ids: Collection[int]) -> Select:
+    """Select stored statistics of the given exercises (primary-key seeks)."""
+
+    return select(ExerciseStat.__table__).where(ExerciseStat.exercise_id.in_(exercise_ids))
+
+
+def _fold_exercise_stats(connection: Connection, rows: list[Any]) -> None:
+    """Add every answer in `rows` to its exercise's running statistics."""
+
+    answers = [row for row in rows if row.kind == ANSWER and row.exercise_id is not None]
+    if not answers:
+        return
+
+    exercise_ids = {row.exercise_id for row in answers}
+    stats = {
+        row.exercise_id: _row_to_stats(row)
+        for row in connection.execute(exercise_stats_statement(exercise_ids))
+    }
+    for row in answers:
+        current = stats.get(row.exercise_id) or ExerciseStats(row.exercise_id)
+        stats[row.exercise_id] = record_attempt(current, bool(row.is_correct), row.duration_ms)
+
+    now = datetime.utcnow()
+    statement = sqlite_insert(ExerciseStat)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ExerciseStat.exercise_id],
+        set_={name: statement.excluded[name] for name in ("attempts", "correct", "median_ms", "updated_at")},
+    )
+    connection.execute(
+        statement,
+        [
+            {
+                "exercise_id": exercise_id,
+                "attempts": stats[exercise_id].attempts,
+                "correct": stats[exercise_id].correct,
+                "median_ms": stats[exercise_id].median_ms,
+                "updated_at": now,
+            }
+            for exercise_id in exercise_ids
+        ],
+    )
+
+
+register_attempt_consumer(STATS_CONSUMER, _fold_exercise_stats)
+
+
+def get_exercise_stats(exercise_ids: Collection[int]) -> dict[int, ExerciseStats]:
+    """Return stored statistics per exercise id (exercises never answered are absent)."""
+
+    if not exercise_ids:
+        return {}
+    with read_session_scope() as db:
+        rows = db.execute(exercise_stats_statement(exercise_ids)).all()
+    return {row.exercise_id: _row_to_stats(row) for row in rows}
+
+
+def _build_lesson_index(lesson_id: int) -> CandidateIndex:
+    exercises = get_exercises(lesson_id)
+    stats = get_exercise_stats([exercise.id for exercise in exercises])
+    return build_candidate_index(((exercise.id, exercise.difficulty) for exercise in exercises), stats)
+
+
+class CandidateIndexCache:
+    """Per-lesson candidate indexes, rebuilt after a TTL or a content change."""
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._entries: dict[int, tuple[int, float, CandidateIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, lesson_id: int) -> CandidateIndex:
+        version = get_content_cache().version
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(lesson_id)
+        if entry is not None and entry[0] == version and entry[1] > now:
+            return entry[2]
+
+        index = _build_lesson_index(lesson_id)
+        with self._lock:
+            self._entries[lesson_id] = (version, now + self._ttl_seconds, index)
+        return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_index_cache = CandidateIndexCache(ADAPTIVE_INDEX_TTL_SECONDS)
+
+
+def get_candidate_index(lesson_id: int) -> CandidateIndex:
+    """Return the lesson's exercises grouped by band, in serving order."""
+
+    return _index_cache.get(lesson_id)
+
+
+def select_next_exercise(lesson_id: int, recent_results: Sequence[bool], seen: Collection[int] = ()) -> int | None:
+    """Return the id of the next unseen exercise for the learner's recent accuracy."""
+
+    return get_candidate_index(lesson_id).select(target_band(recent_results), seen)
@@ -0,0 +1,149 @@
+"""Persistent, deduplicating cache for AI-generated exercises.
+
+Entries live in the `ai_generation_cache` table keyed by a fingerprint of the
+normalized topic, difficulty, model name and prompt text, so changing a prompt
+naturally misses the old entries. Entries expire after `AI_CACHE_TTL_SECONDS`
+and the oldest ones are evicted beyond `AI_CACHE_MAX_ENTRIES`.
+
+Concurrent misses for the same key inside one process are collapsed by
+`SingleFlight`: the first caller runs the generation, the others wait for and
+share its result.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import Select, delete, func, select
+
+from config import AI_CACHE_MAX_ENTRIES, AI_CACHE_TTL_SECONDS
+from database import SessionLocal, read_session_scope
+from models import AIGenerationCache
+
+
+def normalize_request_text(value: str) -> str:
+    """Lowercase and collapse whitespace so equivalent requests share a key."""
+
+    return " ".join(str(value).split()).lower()
+
+
+def make_cache_key(topic: str, difficulty: str, model: str, system_prompt: str, user_prompt: str) -> str:
+    """Return stable fingerprint for a generation request."""
+
+    prompt_hash = hashlib.sha256(f"{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+    raw = "\x00".join([normalize_request_text(topic), normalize_request_text(difficulty), model, prompt_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _expiry_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=AI_CACHE_TTL_SECONDS)
+
+
+def cached_exercise_statement(cache_key: str) -> Select:
+    """Select unexpired cached payload for a key."""
+
+    return select(AIGenerationCache.payload_json).where(
+        AIGenerationCache.cache_key == cache_key,
+        AIGenerationCache.created_at >= _expiry_cutoff(),
+    )
+
+
+def get_cached_exercise(cache_key: str) -> dict[str, Any] | None:
+    """Return cached payload for key if present and not expired."""
+
+    with read_session_scope() as db:
+        payload_json = db.scalar(cached_exercise_statement(cache_key))
+    return json.loads(payload_json) if payload_json is not None else None
+
+
+def store_cached_exercise(cache_key: str, topic: str, difficulty: str, model: str, payload: dict[str, Any]) -> None:
+    """Store payload under key and apply TTL and size-based eviction."""
+
+    with SessionLocal() as db:
+        db.merge(
+            AIGenerationCache(
+                cache_key=cache_key,
+                topic=normalize_request_text(topic),
+                difficulty=normalize_request_text(difficulty),
+                model=model,
+                payload_json=json.dumps(payload, ensure_ascii=False),
+                created_at=datetime.utcnow(),
+            )
+        )
+        db.flush()
+        db.execute(delete(AIGenerationCache).where(AIGenerationCache.created_at < _expiry_cutoff()))
+
+        overflow = (db.scalar(select(func.count()).select_from(AIGenerationCache)) or 0) - AI_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            oldest_keys = (
+                select(AIGenerationCache.cache_key)
+                .order_by(AIGenerationCache.created_at.asc())
+                .limit(overflow)
+                .scalar_subquery()
+            )
+            db.execute(delete(AIGenerationCache).where(AIGenerationCache.cache_key.in_(oldest_keys)))
+        db.commit()
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one in-flight call."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+
+    def do(self, key: str, operation: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = operation()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+_single_flight = SingleFlight()
+
+
+def get_or_generate(
+    topic: str,
+    difficulty: str,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    generate: Callable[[], dict[str, Any]],
+) -> dict[str, Any]:
+    """Return cached exercise or run `generate` once for all concurrent callers."""
+
+    cache_key = make_cache_key(topic, difficulty, model, system_prompt, user_prompt)
+
+    def _load_or_generate() -> dict[str, Any]:
+        cached = get_cached_exercise(cache_key)
+        if cached is not None:
+            return cached
+        payload = generate()
+        store_cached_exercise(cache_key, topic, difficulty, model, payload)
+        return payload
+
+    # Each caller gets its own copy; payload dicts are mutable.
+    return dict(_single_flight.do(cache_key, _load_or_generate))
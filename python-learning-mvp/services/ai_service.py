@@ -4,62 +4,135 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Any
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
 
-from openai import OpenAI
+from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
 
+from config import (
+    AI_BATCH_MAX_WORKERS,
+    AI_CACHE_ENABLED,
+    AI_MAX_RETRIES,
+    AI_REQUEST_TIMEOUT_SECONDS,
+    AI_RETRY_BACKOFF_SECONDS,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+)
+from schemas import validate_exercise_payload
+from services.ai_cache_service import get_or_generate, normalize_request_text
 
-REQUIRED_EXERCISE_FIELDS = {
-    "type",
-    "question",
-    "options_json",
-    "correct_answer",
-    "explanation",
-    "difficulty",
-}
 
+T = TypeVar("T")
 
-def _get_openai_client() -> OpenAI:
-    """Create OpenAI client from environment configuration."""
+# Transient failures worth another attempt. ValueError covers malformed JSON and
+# payloads rejected by `schemas.validate_exercise_payload`.
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError, ValueError)
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY is not set.")
-    return OpenAI(api_key=api_key)
+_client: OpenAI | None = None
+_client_lock = threading.Lock()
 
 
-def _validate_exercise_payload(payload: dict[str, Any]) -> dict[str, Any]:
-    """Validate and normalize payload to Exercise-schema compatible shape."""
+@dataclass(frozen=True)
+class ExerciseSpec:
+    """Input for one generated exercise."""
 
-    missing = REQUIRED_EXERCISE_FIELDS - payload.keys()
-    if missing:
-        raise ValueError(f"AI response missing required fields: {sorted(missing)}")
+    topic: str
+    difficulty: str
 
-    payload["type"] = str(payload["type"]).strip().upper()
-    payload["question"] = str(payload["question"]).strip()
-    payload["correct_answer"] = str(payload["correct_answer"]).strip()
-    payload["explanation"] = str(payload["explanation"]).strip()
-    payload["difficulty"] = str(payload["difficulty"]).strip().lower()
 
-    options = payload.get("options_json")
-    if options is None:
-        payload["options_json"] = None
-    elif isinstance(options, str):
-        payload["options_json"] = options
-    else:
-        payload["options_json"] = json.dumps(options, ensure_ascii=False)
+@dataclass
+class GenerationStats:
+    """Token usage and latency accumulated over chat completion requests."""
 
-    return payload
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    exercises: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
 
+    def record_request(self, usage: Any, latency_seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latency_seconds += latency_seconds
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.completion_tokens += usage.completion_tokens or 0
 
-def generate_exercise(topic: str, difficulty: str) -> dict[str, Any]:
-    """Generate a single exercise using OpenAI API.
+    def per_exercise(self) -> dict[str, float]:
+        """Return averages per generated exercise for comparing modes."""
 
-    Returns structure compatible with Exercise schema fields:
-    type, question, options_json, correct_answer, explanation, difficulty.
+        count = max(self.exercises, 1)
+        return {
+            "prompt_tokens": self.prompt_tokens / count,
+            "completion_tokens": self.completion_tokens / count,
+            "latency_seconds": self.latency_seconds / count,
+            "wall_seconds": self.wall_seconds / count,
+        }
+
+
+@dataclass
+class BatchGenerationResult:
+    """Outcome of `generate_exercises`, aligned with the input specs."""
+
+    exercises: list[dict[str, Any] | None]
+    errors: dict[int, str] = field(default_factory=dict)
+    stats: GenerationStats = field(default_factory=GenerationStats)
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for exercise in self.exercises if exercise is not None)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+@dataclass
+class ExerciseSetResult:
+    """Outcome of `generate_exercise_set` (array mode)."""
+
+    exercises: list[dict[str, Any]]
+    requested: int
+    invalid_items: int = 0
+    stats: GenerationStats = field(default_factory=GenerationStats)
+
+
+def _get_openai_client() -> OpenAI:
+    """Return shared OpenAI client created from environment configuration.
+
+    The client keeps a pooled HTTP connection and is safe to use from
+    multiple threads. Retries are handled by `_call_with_retries`.
     """
 
-    client = _get_openai_client()
+    global _client
+
+    if _client is not None:
+        return _client
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is not set.")
+
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=api_key,
+                base_url=OPENAI_BASE_URL,
+                timeout=AI_REQUEST_TIMEOUT_SECONDS,
+                max_retries=0,
+            )
+    return _client
+
+
+def _build_prompts(topic: str, difficulty: str) -> tuple[str, str]:
+    """Return (system_prompt, user_prompt) for a single exercise request."""
 
     system_prompt = (
         "You generate Python learning exercises for beginners. "
@@ -74,18 +147,364 @@ def generate_exercise(topic: str, difficulty: str) -> dict[str, Any]:
         "If type is MULTIPLE_CHOICE, provide options_json as a JSON array with 4 options. "
         "For other types set options_json to null."
     )
+    return system_prompt, user_prompt
 
+
+def _build_set_prompts(topic: str, difficulty: str, count: int) -> tuple[str, str]:
+    """Return (system_prompt, user_prompt) asking for `count` exercises at once."""
+
+    system_prompt = (
+        "You generate Python learning exercises for beginners. "
+        "Return only valid JSON object with a single field exercises: "
+        "an array of objects with fields "
+        "type, question, options_json, correct_answer, explanation, difficulty. "
+        "Allowed type values: MULTIPLE_CHOICE, FILL_CODE, WRITE_LINE."
+    )
+    user_prompt = (
+        f"Topic: {topic}\n"
+        f"Difficulty: {difficulty}\n"
+        f"Create exactly {count} different short exercises in Ukrainian. "
+        "If type is MULTIPLE_CHOICE, provide options_json as a JSON array with 4 options. "
+        "For other types set options_json to null."
+    )
+    return system_prompt, user_prompt
+
+
+def _request_completion(
+    client: OpenAI,
+    system_prompt: str,
+    user_prompt: str,
+    timeout: float,
+    stats: GenerationStats | None = None,
+) -> str:
+    """Run one JSON-mode chat completion and return its raw content."""
+
+    started = time.perf_counter()
     response = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        model=OPENAI_MODEL,
         temperature=0.4,
         response_format={"type": "json_object"},
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ],
+        timeout=timeout,
     )
+    if stats is not None:
+        stats.record_request(getattr(response, "usage", None), time.perf_counter() - started)
+
+    return response.choices[0].message.content or "{}"
+
 
-    content = response.choices[0].message.content or "{}"
+def _request_exercise(
+    client: OpenAI,
+    topic: str,
+    difficulty: str,
+    timeout: float,
+    stats: GenerationStats | None = None,
+) -> dict[str, Any]:
+    """Run one chat completion and return the validated exercise payload."""
+
+    system_prompt, user_prompt = _build_prompts(topic, difficulty)
+    content = _request_completion(client, system_prompt, user_prompt, timeout, stats)
     payload = json.loads(content)
 
-    return _validate_exercise_payload(payload)
+    return validate_exercise_payload(payload)
+
+
+def _call_with_retries(
+    operation: Callable[[], T],
+    max_retries: int = AI_MAX_RETRIES,
+    backoff_seconds: float = AI_RETRY_BACKOFF_SECONDS,
+) -> T:
+    """Run operation, retrying transient errors with full-jitter exponential backoff."""
+
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except RETRYABLE_ERRORS:
+            if attempt >= max_retries:
+                raise
+            time.sleep(random.uniform(0, backoff_seconds * (2**attempt)))
+            attempt += 1
+
+
+def _generate_one(
+    client: OpenAI,
+    spec: ExerciseSpec,
+    timeout: float,
+    max_retries: int,
+    use_cache: bool,
+    stats: GenerationStats | None = None,
+) -> dict[str, Any]:
+    def _generate() -> dict[str, Any]:
+        return _call_with_retries(
+            lambda: _request_exercise(client, spec.topic, spec.difficulty, timeout, stats),
+            max_retries=max_retries,
+        )
+
+    if not use_cache:
+        return _generate()
+
+    # Key on prompts built from the normalized request, so "Loops " and "loops"
+    # share an entry while prompt template changes still miss.
+    system_prompt, user_prompt = _build_prompts(
+        normalize_request_text(spec.topic),
+        normalize_request_text(spec.difficulty),
+    )
+    return get_or_generate(spec.topic, spec.difficulty, OPENAI_MODEL, system_prompt, user_prompt, _generate)
+
+
+def generate_exercise(topic: str, difficulty: str, use_cache: bool = AI_CACHE_ENABLED) -> dict[str, Any]:
+    """Generate a single exercise using OpenAI API.
+
+    Returns structure compatible with Exercise schema fields:
+    type, question, options_json, correct_answer, explanation, difficulty.
+
+    With `use_cache` the result is served from (and stored in) the persistent
+    generation cache, and concurrent identical requests share one API call.
+    """
+
+    client = _get_openai_client()
+    return _generate_one(client, ExerciseSpec(topic, difficulty), AI_REQUEST_TIMEOUT_SECONDS, AI_MAX_RETRIES, use_cache)
+
+
+def generate_exercises(
+    specs: Sequence[ExerciseSpec],
+    max_workers: int = AI_BATCH_MAX_WORKERS,
+    timeout: float = AI_REQUEST_TIMEOUT_SECONDS,
+    max_retries: int = AI_MAX_RETRIES,
+    use_cache: bool = False,
+) -> BatchGenerationResult:
+    """Generate many exercises concurrently over a bounded thread pool.
+
+    Every request uses the shared client, its own timeout and retry budget.
+    Failures do not abort the batch: the slot in `exercises` stays None and
+    the error message is reported in `errors` under the spec's index.
+
+    The generation cache is off by default here, because a batch usually
+    wants distinct exercises for repeated specs.
+    """
+
+    if max_workers < 1:
+        raise ValueError("max_workers must be >= 1")
+
+    client = _get_openai_client()
+    result = BatchGenerationResult(exercises=[None] * len(specs))
+    if not specs:
+        return result
+    started = time.perf_counter()
+
+    def _generate(spec: ExerciseSpec) -> dict[str, Any]:
+        return _generate_one(client, spec, timeout, max_retries, use_cache, result.stats)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(specs)), thread_name_prefix="ai-batch") as pool:
+        futures = [pool.submit(_generate, spec) for spec in specs]
+        for index, future in enumerate(futures):
+            try:
+                result.exercises[index] = future.result()
+            except Exception as exc:  # noqa: BLE001 - reported per item
+                result.errors[index] = f"{type(exc).__name__}: {exc}"
+
+    result.stats.exercises = result.succeeded
+    result.stats.wall_seconds = time.perf_counter() - started
+    return result
+
+
+def _parse_exercise_set(content: str) -> tuple[list[dict[str, Any]], int]:
+    """Split array-mode response into valid payloads and count invalid items."""
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return [], 0
+    items = data.get("exercises") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return [], 0
+
+    valid: list[dict[str, Any]] = []
+    invalid = 0
+    for item in items:
+        if not isinstance(item, dict):
+            invalid += 1
+            continue
+        try:
+            valid.append(validate_exercise_payload(item))
+        except ValueError:
+            invalid += 1
+    return valid, invalid
+
+
+def generate_exercise_set(
+    topic: str,
+    difficulty: str,
+    count: int,
+    max_repair_rounds: int = AI_MAX_RETRIES,
+    timeout: float = AI_REQUEST_TIMEOUT_SECONDS,
+) -> ExerciseSetResult:
+    """Generate `count` exercises in one completion returning a JSON array.
+
+    Each array element is validated on its own; only the missing or invalid
+    items are requested again, for up to `max_repair_rounds` extra
+    completions. Result stats report tokens and latency per exercise for
+    comparison with single mode (`generate_exercises`).
+    """
+
+    if count < 1:
+        raise ValueError("count must be >= 1")
+
+    client = _get_openai_client()
+    result = ExerciseSetResult(exercises=[], requested=count)
+    started = time.perf_counter()
+
+    for _ in range(max_repair_rounds + 1):
+        missing = count - len(result.exercises)
+        if missing <= 0:
+            break
+        system_prompt, user_prompt = _build_set_prompts(topic, difficulty, missing)
+        content = _call_with_retries(
+            lambda: _request_completion(client, system_prompt, user_prompt, timeout, result.stats)
+        )
+        valid, invalid = _parse_exercise_set(content)
+        result.exercises.extend(valid[:missing])
+        result.invalid_items += invalid
+
+    result.stats.exercises = len(result.exercises)
+    result.stats.wall_seconds = time.perf_counter() - started
+    return result
+
+
+class _IncrementalObjectParser:
+    """Parse a streamed top-level JSON object one member at a time.
+
+    `feed` returns (key, value) pairs for members that are complete in the
+    buffered text so far. Strings, arrays and objects are complete once their
+    closing character arrives; numbers and literals only once whitespace, `,`
+    or `}` follows them, so a partially streamed `12` (of `12.5`) or `1e` is
+    never reported as final.
+    """
+
+    _SELF_DELIMITING = {'"', "[", "{"}
+    _VALUE_DELIMITERS = {",", "}"}
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self.done = False
+
+    def _skip_whitespace(self, pos: int) -> int:
+        while pos < len(self._buffer) and self._buffer[pos].isspace():
+            pos += 1
+        return pos
+
+    def _next_member(self) -> tuple[str, Any] | None:
+        buffer = self._buffer
+        pos = self._skip_whitespace(self._pos)
+        if pos >= len(buffer):
+            return None
+
+        if not self._started:
+            if buffer[pos] != "{":
+                raise ValueError("Streamed response is not a JSON object.")
+            self._started = True
+            self._pos = pos = self._skip_whitespace(pos + 1)
+            if pos >= len(buffer):
+                return None
+
+        if buffer[pos] == "}":
+            self.done = True
+            self._pos = pos + 1
+            return None
+        if buffer[pos] == ",":
+            pos = self._skip_whitespace(pos + 1)
+
+        try:
+            key, pos = self._decoder.raw_decode(buffer, pos)
+            pos = self._skip_whitespace(pos)
+            if pos >= len(buffer):
+                return None
+            if buffer[pos] != ":":
+                raise ValueError("Malformed JSON object in streamed response.")
+            value_start = self._skip_whitespace(pos + 1)
+            value, end = self._decoder.raw_decode(buffer, value_start)
+        except json.JSONDecodeError:
+            # Member is not fully streamed yet.
+            return None
+
+        if buffer[value_start] not in self._SELF_DELIMITING and (
+            end >= len(buffer) or not (buffer[end].isspace() or buffer[end] in self._VALUE_DELIMITERS)
+        ):
+            return None
+
+        self._pos = end
+        return str(key), value
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        """Append streamed text and return newly completed members."""
+
+        self._buffer += chunk
+        members: list[tuple[str, Any]] = []
+        while not self.done:
+            member = self._next_member()
+            if member is None:
+                break
+            members.append(member)
+        return members
+
+    def close(self) -> list[tuple[str, Any]]:
+        """Flush trailing member at end of stream and check object is complete."""
+
+        members = self.feed(" ")
+        if not self.done:
+            raise ValueError("Streamed JSON object ended before it was complete.")
+        return members
+
+
+def stream_exercise(
+    topic: str,
+    difficulty: str,
+    timeout: float = AI_REQUEST_TIMEOUT_SECONDS,
+) -> Iterator[tuple[str, Any]]:
+    """Stream one generated exercise, yielding fields as soon as they complete.
+
+    Yields `(field_name, raw_value)` for every top-level field in the order
+    the model emits it (e.g. `("question", "...")` before the options arrive),
+    then a final `("exercise", payload)` with the full payload after it passed
+    `validate_exercise_payload`. Raises ValueError if the streamed payload is
+    incomplete or invalid. Streaming responses are not cached or retried.
+    """
+
+    client = _get_openai_client()
+    system_prompt, user_prompt = _build_prompts(topic, difficulty)
+    stream = client.chat.completions.create(
+        model=OPENAI_MODEL,
+        temperature=0.4,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        timeout=timeout,
+        stream=True,
+    )
+
+    parser = _IncrementalObjectParser()
+    payload: dict[str, Any] = {}
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content
+        if not text:
+            continue
+        for key, value in parser.feed(text):
+            payload[key] = value
+            yield key, value
+
+    for key, value in parser.close():
+        payload[key] = value
+        yield key, value
+
+    yield "exercise", validate_exercise_payload(payload)
@@ -0,0 +1,747 @@
+"""Sandboxed execution of learner code for RUN_CODE exercises.
+
+A pool of warm worker processes is started once (via the multiprocessing
+forkserver, so no Streamlit threads are inherited). Each worker forks a fresh
+child per submission; the child drops privileges it does not need, runs the
+learner's snippet and then the exercise's test assertions in one namespace,
+and reports the outcome. Forking an already-initialized interpreter costs
+about a millisecond, so latency is dominated by the snippet itself, and every
+submission still starts from a clean process.
+
+Isolation applied in the child before any learner code runs (Linux):
+- CPU seconds, address space and open files (`resource.setrlimit`)
+- empty environment (no API keys or other secrets)
+- private network namespace: the pool refuses to start without one unless
+  `CODE_RUNNER_ALLOW_SHARED_NETWORK=1`
+- seccomp filter: exec, fork/clone, sockets, ptrace and signals to other
+  processes fail with EPERM in the kernel, whatever Python objects the
+  snippet reaches
+- no file writes, and reads only below the Python standard library
+  (Landlock where the kernel supports it; the audit hook in any case)
+- root workers drop to uid/gid 65534 (or to no capabilities when that user
+  cannot read the interpreter)
+- audit hook: imports of process, socket and ctypes modules are refused
+  (already-loaded ones are dropped from `sys.modules` first), as are
+  process, file-system and network calls
+- wall-clock timeout enforced by the worker, which kills the child
+
+The pool checks this isolation with an empty run when it starts; if it
+cannot be applied, RUN_CODE grading is refused (`SandboxUnavailable`).
+
+The pool admits at most `workers + queue_limit` submissions at once and
+`per_user_limit` per user; beyond that `CodeRunnerBusy` is raised instead of
+queueing unboundedly. The sandbox protects the server; it does not stop a
+learner from tricking their own tests.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import select
+import signal
+import stat
+import sys
+import sysconfig
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from multiprocessing import context, forkserver, popen_forkserver, reduction, spawn, util
+from typing import Any
+
+from config import (
+    CODE_RUNNER_ALLOW_SHARED_NETWORK,
+    CODE_RUNNER_CPU_SECONDS,
+    CODE_RUNNER_MAX_OUTPUT_CHARS,
+    CODE_RUNNER_MEMORY_MB,
+    CODE_RUNNER_PER_USER_LIMIT,
+    CODE_RUNNER_QUEUE_LIMIT,
+    CODE_RUNNER_TIMEOUT_SECONDS,
+    CODE_RUNNER_WORKERS,
+)
+
+
+_BLOCKED_AUDIT_EVENTS = (
+    "socket.",
+    "subprocess.",
+    "os.system",
+    "os.exec",
+    "os.posix_spawn",
+    "os.spawn",
+    "os.fork",
+    "os.forkpty",
+    "os.kill",
+    "os.remove",
+    "os.rename",
+    "os.rmdir",
+    "os.truncate",
+    "os.chmod",
+    "os.chown",
+    "shutil.",
+    "ctypes.",
+    "sqlite3.",
+    "urllib.",
+    "ftplib.",
+    "smtplib.",
+    "http.",
+)
+logger = logging.getLogger(__name__)
+
+# Refused by the import audit hook and dropped from `sys.modules` first.
+_BLOCKED_MODULES = frozenset(
+    {
+        "_ctypes",
+        "_multiprocessing",
+        "_posixsubprocess",
+        "_socket",
+        "_sqlite3",
+        "_ssl",
+        "ctypes",
+        "mmap",
+        "multiprocessing",
+        "posix",
+        "pty",
+        "socket",
+        "sqlite3",
+        "ssl",
+        "subprocess",
+    }
+)
+_PATH_EVENTS = ("os.listdir", "os.scandir")
+_READABLE_FILES = frozenset({"/dev/null", "/dev/urandom"})
+_WRITE_MODES = set("wax+")
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+_UNPRIVILEGED_ID = 65534
+_LINUX_CAPABILITY_VERSION_3 = 0x20080522
+
+_CLONE_NEWUSER = 0x10000000
+_CLONE_NEWNET = 0x40000000
+
+# seccomp: syscalls refused with EPERM, per audit architecture.
+_PR_SET_NO_NEW_PRIVS = 38
+_PR_SET_SECCOMP = 22
+_SECCOMP_MODE_FILTER = 2
+_SECCOMP_RET_KILL_PROCESS = 0x80000000
+_SECCOMP_RET_ERRNO = 0x00050000
+_SECCOMP_RET_ALLOW = 0x7FFF0000
+_X32_SYSCALL_BIT = 0x40000000
+_DENIED_SYSCALLS = {
+    # x86_64: socket, clone, fork, vfork, execve, kill, socketpair, ptrace,
+    # tkill, tgkill, unshare, setns, process_vm_readv/writev, execveat,
+    # pidfd_send_signal, clone3
+    "x86_64": (
+        0xC000003E,
+        (41, 56, 57, 58, 59, 62, 53, 101, 200, 234, 272, 308, 310, 311, 322, 424, 435),
+    ),
+    # aarch64: unshare, socket, socketpair, ptrace, kill, tkill, tgkill,
+    # clone, execve, setns, process_vm_readv/writev, execveat,
+    # pidfd_send_signal, clone3
+    "aarch64": (
+        0xC00000B7,
+        (97, 198, 199, 117, 129, 130, 131, 220, 221, 268, 270, 271, 281, 424, 435),
+    ),
+}
+
+# Landlock (same syscall numbers on every architecture).
+_SYS_LANDLOCK_CREATE_RULESET = 444
+_SYS_LANDLOCK_ADD_RULE = 445
+_SYS_LANDLOCK_RESTRICT_SELF = 446
+_LANDLOCK_CREATE_RULESET_VERSION = 1
+_LANDLOCK_RULE_PATH_BENEATH = 1
+_LANDLOCK_ACCESS_FS_READ_FILE = 1 << 2
+_LANDLOCK_ACCESS_FS_READ_DIR = 1 << 3
+_LANDLOCK_ACCESS_FS_ABI_1 = (1 << 13) - 1
+_LANDLOCK_ACCESS_FS_REFER = 1 << 13
+_LANDLOCK_ACCESS_FS_TRUNCATE = 1 << 14
+
+
+class CodeRunnerBusy(RuntimeError):
+    """Raised when the pool or the user's concurrency cap is exhausted."""
+
+
+class SandboxUnavailable(CodeRunnerBusy):
+    """Raised when the child's isolation cannot be applied on this host."""
+
+
+@dataclass(frozen=True)
+class SandboxLimits:
+    """Per-submission resource limits."""
+
+    wall_seconds: float
+    cpu_seconds: int
+    memory_mb: int
+    max_output_chars: int
+    max_open_files: int = 32
+    allow_shared_network: bool = False
+
+
+@dataclass(frozen=True)
+class RunResult:
+    """Outcome of one sandboxed run.
+
+    `status` is one of: passed, failed (assertion), error (exception),
+    timeout, crashed (killed by a limit or the worker died).
+    """
+
+    status: str
+    message: str = ""
+    output: str = ""
+    duration_ms: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.status == "passed"
+
+
+# Directories the child may read below; set in the child before the hook.
+_read_roots: tuple[str, ...] = ()
+
+
+def _path_allowed(path: Any) -> bool:
+    if isinstance(path, int):
+        return True  # already-open descriptor (stdio or the result pipe)
+    try:
+        resolved = os.path.realpath(os.fsdecode(path if path is not None else "."))
+    except (TypeError, ValueError):
+        return False
+    if resolved in _READABLE_FILES:
+        return True
+    return any(resolved == root or resolved.startswith(root + os.sep) for root in _read_roots)
+
+
+def _audit_hook(event: str, args: tuple[Any, ...]) -> None:
+    if event == "import":
+        if str(args[0]).partition(".")[0] in _BLOCKED_MODULES:
+            raise ImportError(f"Module '{args[0]}' is not allowed.")
+        return
+    if event == "open":
+        # args: (path, mode or None, flags)
+        mode = args[1] if len(args) > 1 else None
+        flags = args[2] if len(args) > 2 else 0
+        if (isinstance(mode, str) and _WRITE_MODES & set(mode)) or (isinstance(flags, int) and flags & _WRITE_FLAGS):
+            raise PermissionError("Writing files is not allowed.")
+        if not _path_allowed(args[0]):
+            raise PermissionError("Reading files outside the Python standard library is not allowed.")
+        return
+    if event in _PATH_EVENTS:
+        if not _path_allowed(args[0] if args else None):
+            raise PermissionError("Listing directories outside the Python standard library is not allowed.")
+        return
+    if event.startswith(_BLOCKED_AUDIT_EVENTS):
+        raise PermissionError(f"'{event}' is not allowed.")
+
+
+def _address_space_bytes() -> int:
+    """Current virtual memory size of this process (0 if unknown)."""
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            return int(handle.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_limits(limits: SandboxLimits) -> None:
+    import resource
+
+    # The child inherits the worker's mappings, so the budget is on top of them.
+    memory_bytes = _address_space_bytes() + limits.memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limits.max_open_files, limits.max_open_files))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+    os.environ.clear()
+    os.chdir("/")
+    libc = ctypes.CDLL(None, use_errno=True)
+    _isolate_network(libc, limits.allow_shared_network)
+    if libc.prctl(_PR_SET_NO_NEW_PRIVS, ctypes.c_ulong(1), ctypes.c_ulong(0), ctypes.c_ulong(0), ctypes.c_ulong(0)):
+        raise SandboxUnavailable(f"prctl(NO_NEW_PRIVS) failed: {os.strerror(ctypes.get_errno())}")
+    read_roots = _library_roots()
+    _restrict_filesystem(libc, read_roots)
+    _drop_privileges(libc, read_roots)
+    _install_seccomp(libc)
+
+    global _read_roots
+    _read_roots = tuple(read_roots)
+    for name in list(sys.modules):
+        if name.partition(".")[0] in _BLOCKED_MODULES:
+            del sys.modules[name]
+    sys.addaudithook(_audit_hook)
+
+
+def _isolate_network(libc: Any, allow_shared_network: bool) -> None:
+    """Move the child into an empty network namespace (user namespace if unprivileged)."""
+
+    for flags in (_CLONE_NEWNET, _CLONE_NEWUSER | _CLONE_NEWNET):
+        if libc.unshare(flags) == 0:
+            return
+    if not allow_shared_network:
+        raise SandboxUnavailable(
+            f"no private network namespace ({os.strerror(ctypes.get_errno())}); "
+            "set CODE_RUNNER_ALLOW_SHARED_NETWORK=1 to grade without one"
+        )
+
+
+def _library_roots() -> list[str]:
+    paths = sysconfig.get_paths()
+    return sorted({os.path.realpath(paths[key]) for key in ("stdlib", "platstdlib") if paths.get(key)})
+
+
+class _LandlockRulesetAttr(ctypes.Structure):
+    _fields_ = [("handled_access_fs", ctypes.c_uint64)]
+
+
+class _LandlockPathBeneathAttr(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [("allowed_access", ctypes.c_uint64), ("parent_fd", ctypes.c_int32)]
+
+
+def _restrict_filesystem(libc: Any, read_roots: list[str]) -> None:
+    """Allow only reads below `read_roots` with Landlock, when the kernel has it."""
+
+    abi = libc.syscall(_SYS_LANDLOCK_CREATE_RULESET, None, ctypes.c_size_t(0), _LANDLOCK_CREATE_RULESET_VERSION)
+    if abi < 1:
+        return  # Not built in or disabled; the audit hook still limits reads.
+    handled = _LANDLOCK_ACCESS_FS_ABI_1
+    if abi >= 2:
+        handled |= _LANDLOCK_ACCESS_FS_REFER
+    if abi >= 3:
+        handled |= _LANDLOCK_ACCESS_FS_TRUNCATE
+    attr = _LandlockRulesetAttr(handled)
+    ruleset_fd = libc.syscall(_SYS_LANDLOCK_CREATE_RULESET, ctypes.byref(attr), ctypes.c_size_t(ctypes.sizeof(attr)), 0)
+    if ruleset_fd < 0:
+        raise SandboxUnavailable(f"landlock_create_ruleset failed: {os.strerror(ctypes.get_errno())}")
+    try:
+        for path in [*read_roots, *_READABLE_FILES]:
+            try:
+                parent_fd = os.open(path, os.O_PATH | os.O_CLOEXEC)
+            except OSError:
+                continue
+            try:
+                access = _LANDLOCK_ACCESS_FS_READ_FILE
+                if os.path.isdir(path):
+                    access |= _LANDLOCK_ACCESS_FS_READ_DIR
+                rule = _LandlockPathBeneathAttr(access, parent_fd)
+                if libc.syscall(_SYS_LANDLOCK_ADD_RULE, ruleset_fd, _LANDLOCK_RULE_PATH_BENEATH, ctypes.byref(rule), 0):
+                    raise SandboxUnavailable(f"landlock_add_rule failed: {os.strerror(ctypes.get_errno())}")
+            finally:
+                os.close(parent_fd)
+        if libc.syscall(_SYS_LANDLOCK_RESTRICT_SELF, ruleset_fd, 0):
+            raise SandboxUnavailable(f"landlock_restrict_self failed: {os.strerror(ctypes.get_errno())}")
+    finally:
+        os.close(ruleset_fd)
+
+
+def _readable_by_others(path: str) -> bool:
+    if not os.stat(path).st_mode & stat.S_IROTH:
+        return False
+    while True:
+        if not os.stat(path).st_mode & stat.S_IXOTH:
+            return False
+        parent = os.path.dirname(path)
+        if parent == path:
+            return True
+        path = parent
+
+
+class _CapHeader(ctypes.Structure):
+    _fields_ = [("version", ctypes.c_uint32), ("pid", ctypes.c_int)]
+
+
+class _CapData(ctypes.Structure):
+    _fields_ = [("effective", ctypes.c_uint32), ("permitted", ctypes.c_uint32), ("inheritable", ctypes.c_uint32)]
+
+
+def _drop_privileges(libc: Any, read_roots: list[str]) -> None:
+    """Give up root: switch to `nobody`, or keep uid 0 without any capabilities.
+
+    The second form covers interpreters installed where `nobody` cannot read
+    them (e.g. under a 0700 home directory); it still loses every override
+    of file permissions and process ownership.
+    """
+
+    if os.getuid() != 0:
+        return
+    if all(_readable_by_others(root) for root in read_roots):
+        os.setgroups([])
+        os.setgid(_UNPRIVILEGED_ID)
+        os.setuid(_UNPRIVILEGED_ID)
+        return
+    header = _CapHeader(_LINUX_CAPABILITY_VERSION_3, 0)
+    data = (_CapData * 2)()
+    if libc.capset(ctypes.byref(header), data):
+        raise SandboxUnavailable(f"capset failed: {os.strerror(ctypes.get_errno())}")
+
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [("code", ctypes.c_uint16), ("jt", ctypes.c_uint8), ("jf", ctypes.c_uint8), ("k", ctypes.c_uint32)]
+
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_uint16), ("filter", ctypes.POINTER(_SockFilter))]
+
+
+def _seccomp_program(audit_arch: int, denied: tuple[int, ...]) -> list[tuple[int, int, int, int]]:
+    """BPF: kill foreign-ABI calls, refuse `denied` with EPERM, allow the rest."""
+
+    load_word, jump_eq, jump_ge, ret = 0x20, 0x15, 0x35, 0x06
+    program = [
+        (load_word, 0, 0, 4),  # seccomp_data.arch
+        (jump_eq, 1, 0, audit_arch),
+        (ret, 0, 0, _SECCOMP_RET_KILL_PROCESS),
+        (load_word, 0, 0, 0),  # seccomp_data.nr
+        (jump_ge, len(denied) + 1, 0, _X32_SYSCALL_BIT),
+    ]
+    for position, number in enumerate(denied):
+        program.append((jump_eq, len(denied) - position, 0, number))
+    program.append((ret, 0, 0, _SECCOMP_RET_ALLOW))
+    program.append((ret, 0, 0, _SECCOMP_RET_ERRNO | 1))  # EPERM
+    return program
+
+
+def _install_seccomp(libc: Any) -> None:
+    machine = os.uname().machine
+    if machine not in _DENIED_SYSCALLS:
+        raise SandboxUnavailable(f"no seccomp syscall table for {machine}")
+    audit_arch, denied = _DENIED_SYSCALLS[machine]
+    program = _seccomp_program(audit_arch, denied)
+    filters = (_SockFilter * len(program))(*(_SockFilter(*instruction) for instruction in program))
+    fprog = _SockFprog(len(program), filters)
+    if libc.prctl(_PR_SET_SECCOMP, ctypes.c_ulong(_SECCOMP_MODE_FILTER), ctypes.byref(fprog), ctypes.c_ulong(0), ctypes.c_ulong(0)):
+        raise SandboxUnavailable(f"seccomp filter rejected: {os.strerror(ctypes.get_errno())}")
+
+
+def _execute(code: str, tests: str, limits: SandboxLimits) -> dict[str, Any]:
+    """Run snippet then tests; executed in the forked child only."""
+
+    output = io.StringIO()
+    namespace: dict[str, Any] = {"__name__": "__sandbox__"}
+    try:
+        compiled_code = compile(code, "<answer>", "exec")
+        compiled_tests = compile(tests, "<tests>", "exec")
+        _apply_limits(limits)
+        with redirect_stdout(output), redirect_stderr(output):
+            exec(compiled_code, namespace)
+            exec(compiled_tests, namespace)
+        result = {"status": "passed", "message": ""}
+    except SandboxUnavailable as exc:
+        result = {"status": "error", "message": f"Sandbox unavailable: {exc}"}
+    except AssertionError as exc:
+        result = {"status": "failed", "message": str(exc) or "Assertion failed."}
+    except MemoryError:
+        result = {"status": "crashed", "message": "Memory limit exceeded."}
+    except BaseException as exc:  # noqa: BLE001 - report every learner error
+        result = {"status": "error", "message": f"{type(exc).__name__}: {exc}"}
+    result["output"] = output.getvalue()[: limits.max_output_chars]
+    return result
+
+
+def _run_in_child(code: str, tests: str, limits: SandboxLimits) -> RunResult:
+    """Fork a child for one submission and collect its result (worker side)."""
+
+    started = time.perf_counter()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child
+        try:
+            os.close(read_fd)
+            # Only stdio and the result pipe stay open.
+            os.closerange(3, write_fd)
+            os.closerange(write_fd + 1, 1024)
+            payload = json.dumps(_execute(code, tests, limits)).encode("utf-8")
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(write_fd, view):]
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    deadline = started + limits.wall_seconds
+    chunks: list[bytes] = []
+    timed_out = False
+    try:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                timed_out = True
+                os.kill(pid, signal.SIGKILL)
+                break
+            ready, _, _ = select.select([read_fd], [], [], remaining)
+            if ready:
+                chunk = os.read(read_fd, 65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    finally:
+        os.close(read_fd)
+        _, wait_status = os.waitpid(pid, 0)
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    if timed_out:
+        return RunResult("timeout", f"Time limit of {limits.wall_seconds:g}s exceeded.", "", duration_ms)
+    try:
+        data = json.loads(b"".join(chunks))
+    except ValueError:
+        if os.WIFSIGNALED(wait_status) and os.WTERMSIG(wait_status) == signal.SIGXCPU:
+            message = "CPU time limit exceeded."
+        else:
+            message = "Process terminated without a result."
+        return RunResult("crashed", message, "", duration_ms)
+    return RunResult(data["status"], data["message"], data["output"], duration_ms)
+
+
+def _worker_main(connection: Any, limits: SandboxLimits) -> None:
+    """Warm worker loop: receive (code, tests), reply with RunResult."""
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        code, tests = job
+        connection.send(_run_in_child(code, tests, limits))
+
+
+class _SandboxPopen(popen_forkserver.Popen):
+    """Forkserver launch that never re-runs the app script in the child.
+
+    Streamlit registers the running script as `__main__`, and the default
+    preparation data makes every forkserver child re-import `__main__` by
+    path before running the target, which would execute the whole app there.
+    Workers only need this module, so the main-module entries are dropped
+    from the child's preparation data (nothing process-wide is touched).
+    """
+
+    def _launch(self, process_obj: Any) -> None:
+        prep_data = spawn.get_preparation_data(process_obj._name)
+        prep_data.pop("init_main_from_path", None)
+        prep_data.pop("init_main_from_name", None)
+        buf = io.BytesIO()
+        context.set_spawning_popen(self)
+        try:
+            reduction.dump(prep_data, buf)
+            reduction.dump(process_obj, buf)
+        finally:
+            context.set_spawning_popen(None)
+
+        self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+        # Same as the stock launcher: a duplicate of the data pipe's write end
+        # tells the child when the parent goes away.
+        parent_w = os.dup(w)
+        self.finalizer = util.Finalize(self, util.close_fds, (parent_w, self.sentinel))
+        with open(w, "wb", closefd=True) as f:
+            f.write(buf.getbuffer())
+        self.pid = forkserver.read_signed(self.sentinel)
+
+
+class _SandboxProcess(context.ForkServerProcess):
+    @staticmethod
+    def _Popen(process_obj: Any) -> _SandboxPopen:
+        return _SandboxPopen(process_obj)
+
+
+class _Worker:
+    def __init__(self, mp_context: Any, limits: SandboxLimits) -> None:
+        self.connection, child_connection = mp_context.Pipe()
+        self.process = _SandboxProcess(target=_worker_main, args=(child_connection, limits), daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def stop(self) -> None:
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
+
+
+class CodeRunnerPool:
+    """Bounded pool of warm sandbox workers with a per-user cap."""
+
+    def __init__(self, workers: int, queue_limit: int, per_user_limit: int, limits: SandboxLimits) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.per_user_limit = per_user_limit
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._all: list[_Worker] = []
+        self._context: Any = None
+        self._failure: str | None = None
+        self._admitted = 0
+        self._per_user: dict[int, int] = {}
+        self._stats = {"runs": 0, "rejected": 0, "timeouts": 0, "restarts": 0, "total_ms": 0.0}
+
+    def start(self) -> None:
+        """Start workers and check the sandbox ahead of the first submission (idempotent).
+
+        Raises `SandboxUnavailable` (now and on every later call) when a
+        child cannot be isolated on this host.
+        """
+
+        with self._lock:
+            if self._failure is not None:
+                raise SandboxUnavailable(self._failure)
+            if self._context is not None:
+                return
+            if not hasattr(os, "fork"):
+                raise RuntimeError("RUN_CODE grading requires a POSIX system (os.fork).")
+            context = multiprocessing.get_context("forkserver")
+            # Preload only this module in the fork server (not the app script).
+            context.set_forkserver_preload([__name__])
+            workers = [_Worker(context, self.limits) for _ in range(self.workers)]
+            # An empty run applies every limit, so it fails exactly when real
+            # submissions would run without isolation.
+            probe = workers[0].connection
+            probe.send(("", ""))
+            if probe.poll(self.limits.wall_seconds + 2.0):
+                result = probe.recv()
+            else:
+                result = RunResult("timeout", "Worker did not respond.")
+            if result.status != "passed":
+                for worker in workers:
+                    worker.stop()
+                self._failure = f"RUN_CODE grading is disabled: {result.message}"
+                raise SandboxUnavailable(self._failure)
+            self._context = context
+            for worker in workers:
+                self._all.append(worker)
+                self._idle.put(worker)
+
+    def stop(self) -> None:
+        with self._lock:
+            workers, self._all = self._all, []
+            self._context = None
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for worker in workers:
+            worker.stop()
+
+    def _admit(self, user_id: int | None) -> None:
+        with self._lock:
+            if self._admitted >= self.workers + self.queue_limit:
+                self._stats["rejected"] += 1
+                raise CodeRunnerBusy("Code runner is at capacity; try again in a moment.")
+            if user_id is not None and self._per_user.get(user_id, 0) >= self.per_user_limit:
+                self._stats["rejected"] += 1
+                raise CodeRunnerBusy("Previous submission is still running.")
+            self._admitted += 1
+            if user_id is not None:
+                self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+
+    def _release(self, user_id: int | None) -> None:
+        with self._lock:
+            self._admitted -= 1
+            if user_id is not None:
+                remaining = self._per_user.get(user_id, 1) - 1
+                if remaining > 0:
+                    self._per_user[user_id] = remaining
+                else:
+                    self._per_user.pop(user_id, None)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        worker.process.kill()
+        worker.connection.close()
+        replacement = _Worker(self._context, self.limits)
+        with self._lock:
+            self._all = [replacement if item is worker else item for item in self._all]
+            self._stats["restarts"] += 1
+        return replacement
+
+    def run(self, code: str, tests: str, user_id: int | None = None) -> RunResult:
+        """Run snippet against tests; raises CodeRunnerBusy under overload."""
+
+        self.start()
+        self._admit(user_id)
+        try:
+            # Admission bounds the number of waiters, so this wait is bounded
+            # by roughly (queue_limit / workers + 1) wall timeouts.
+            worker = self._idle.get()
+            try:
+                worker.connection.send((code, tests))
+                # The worker enforces the wall timeout itself; the grace period
+                # only catches a worker that died or hung.
+                if worker.connection.poll(self.limits.wall_seconds + 2.0):
+                    result = worker.connection.recv()
+                else:
+                    worker = self._replace(worker)
+                    result = RunResult("timeout", "Worker did not respond.")
+            except (EOFError, OSError):
+                worker = self._replace(worker)
+                result = RunResult("crashed", "Worker process died.")
+            finally:
+                self._idle.put(worker)
+        finally:
+            self._release(user_id)
+
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["total_ms"] += result.duration_ms
+            if result.status == "timeout":
+                self._stats["timeouts"] += 1
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            runs = self._stats["runs"]
+            return {
+                **self._stats,
+                "avg_ms": self._stats["total_ms"] / runs if runs else 0.0,
+                "in_flight": self._admitted,
+                "workers": len(self._all),
+            }
+
+
+_pool = CodeRunnerPool(
+    workers=CODE_RUNNER_WORKERS,
+    queue_limit=CODE_RUNNER_QUEUE_LIMIT,
+    per_user_limit=CODE_RUNNER_PER_USER_LIMIT,
+    limits=SandboxLimits(
+        wall_seconds=CODE_RUNNER_TIMEOUT_SECONDS,
+        cpu_seconds=CODE_RUNNER_CPU_SECONDS,
+        memory_mb=CODE_RUNNER_MEMORY_MB,
+        max_output_chars=CODE_RUNNER_MAX_OUTPUT_CHARS,
+        allow_shared_network=CODE_RUNNER_ALLOW_SHARED_NETWORK,
+    ),
+)
+
+
+def start_code_runner() -> None:
+    """Pre-fork the worker pool so the first submission does not pay for it.
+
+    A host that cannot isolate submissions is logged as an error instead of
+    stopping the app; RUN_CODE submissions are then refused.
+    """
+
+    try:
+        _pool.start()
+    except SandboxUnavailable:
+        logger.critical("Code runner sandbox unavailable; RUN_CODE exercises cannot be graded.", exc_info=True)
+
+
+def run_code(code: str, tests: str, user_id: int | None = None) -> RunResult:
+    """Run learner code against test assertions in the sandbox pool."""
+
+    return _pool.run(code, tests, user_id=user_id)
+
+
+def get_code_runner_stats() -> dict[str, Any]:
+    """Return run count, average latency, rejections, timeouts and restarts."""
+
+    return _pool.stats()
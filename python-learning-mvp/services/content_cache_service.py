@@ -0,0 +1,175 @@
+"""Versioned in-process cache for learning content.
+
+Modules, lessons and exercises are stored as immutable snapshots in a per-process
+LRU. Coherence across Streamlit server processes is driven by the
+`content_version` row: any writer that changes content calls
+`bump_content_version` in the same transaction, and every process drops its
+cache once it observes a newer version (checked at most every
+`CONTENT_VERSION_CHECK_SECONDS`; the writing process checks right after the
+commit).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, TypeVar
+
+from sqlalchemy import Select, event, select, update
+from sqlalchemy.orm import Session
+
+from config import CONTENT_CACHE_MAX_ENTRIES, CONTENT_VERSION_CHECK_SECONDS
+from database import read_session_scope
+from models import ContentVersion
+
+
+T = TypeVar("T")
+
+CONTENT_VERSION_ROW_ID = 1
+# Session.info flag: this transaction bumped the content version.
+_VERSION_BUMPED = "content_version_bumped"
+
+
+def content_version_statement() -> Select:
+    """Select the content version counter row."""
+
+    return select(ContentVersion.version).where(ContentVersion.id == CONTENT_VERSION_ROW_ID)
+
+
+def read_content_version(db: Session) -> int:
+    """Return current content version stored in the database."""
+
+    version = db.scalar(content_version_statement())
+    return version or 0
+
+
+def bump_content_version(db: Session) -> None:
+    """Increment content version inside the caller's transaction.
+
+    Call this from any code path that inserts, updates or deletes modules,
+    lessons or exercises, before committing. This process re-reads the
+    version once the transaction commits; marking the cache stale earlier
+    would let a concurrent read cache the old version for another
+    `CONTENT_VERSION_CHECK_SECONDS`.
+    """
+
+    result = db.execute(
+        update(ContentVersion)
+        .where(ContentVersion.id == CONTENT_VERSION_ROW_ID)
+        .values(version=ContentVersion.version + 1)
+    )
+    if not result.rowcount:
+        db.add(ContentVersion(id=CONTENT_VERSION_ROW_ID, version=1))
+    db.info[_VERSION_BUMPED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_stale_after_commit(db: Session) -> None:
+    if db.info.pop(_VERSION_BUMPED, False):
+        _cache.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_bump(db: Session) -> None:
+    db.info.pop(_VERSION_BUMPED, None)
+
+
+class ContentCache:
+    """Thread-safe LRU of immutable content snapshots tagged by content version."""
+
+    def __init__(self, max_entries: int, version_check_seconds: float) -> None:
+        self._max_entries = max_entries
+        self._version_check_seconds = version_check_seconds
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._next_version_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def version(self) -> int:
+        """Content version the cached entries belong to."""
+
+        self._sync_version()
+        return self._version or 0
+
+    def mark_stale(self) -> None:
+        """Force a version check on the next read."""
+
+        with self._lock:
+            self._next_version_check = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _sync_version(self) -> None:
+        now = time.monotonic()
+        if now < self._next_version_check:
+            return
+
+        with read_session_scope() as db:
+            db_version = read_content_version(db)
+
+        with self._lock:
+            if db_version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = db_version
+            self._next_version_check = now + self._version_check_seconds
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], T]) -> T:
+        """Return cached value for key or load, store and return it."""
+
+        self._sync_version()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            version = self._version
+
+        value = loader()
+
+        with self._lock:
+            # Skip storing if content changed while the loader was running.
+            if version == self._version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "version": self._version or 0,
+            }
+
+
+_cache = ContentCache(
+    max_entries=CONTENT_CACHE_MAX_ENTRIES,
+    version_check_seconds=CONTENT_VERSION_CHECK_SECONDS,
+)
+
+
+def get_content_cache() -> ContentCache:
+    """Return the process-wide content cache."""
+
+    return _cache
+
+
+def get_cache_stats() -> dict[str, int]:
+    """Return hit/miss/invalidation counters of the content cache."""
+
+    return _cache.stats()
@@ -0,0 +1,345 @@
+"""Bulk import of course packs (modules, lessons, exercises).
+
+A course pack is a JSONL or YAML stream of records keyed by `external_id`.
+Records may be flat, with `kind` set to `module`, `lesson` or `exercise` and
+the parent given by external id (`module` on lessons, `lesson` on exercises),
+or nested, with `lessons` inside a module and `exercises` inside a lesson.
+Parents must appear before their children in the stream or already exist in
+the database.
+
+Records are validated with the rules from `schemas` and written in chunks:
+each chunk is one transaction with one executemany upsert per table
+(`INSERT ... ON CONFLICT(external_id) DO UPDATE`, skipped when nothing
+changed), so re-importing a pack is idempotent and cheap. The content version
+is bumped once at the end if any row changed.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Connection, Engine, Table, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from config import CONTENT_IMPORT_CHUNK_SIZE
+from database import engine as default_engine
+from models import Exercise, Lesson, Module
+from schemas import validate_exercise_payload, validate_lesson_record, validate_module_record
+from services.content_cache_service import bump_content_version
+
+
+MAX_REPORTED_ERRORS = 50
+
+_KINDS = ("module", "lesson", "exercise")
+_CHILDREN = {"module": ("lessons", "lesson"), "lesson": ("exercises", "exercise")}
+_UPSERT_COLUMNS = {
+    "module": ("title", "order"),
+    "lesson": ("module_id", "title", "order", "difficulty"),
+    "exercise": ("lesson_id", "type", "question", "options_json", "correct_answer", "explanation", "difficulty"),
+}
+_TABLES: dict[str, Table] = {
+    "module": Module.__table__,
+    "lesson": Lesson.__table__,
+    "exercise": Exercise.__table__,
+}
+
+
+@dataclass
+class ImportReport:
+    """Counters and timing of one import run."""
+
+    modules: int = 0
+    lessons: int = 0
+    exercises: int = 0
+    changed: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    errors: list[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+
+    @property
+    def imported(self) -> int:
+        return self.modules + self.lessons + self.exercises
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def records_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.imported / elapsed if elapsed > 0 else 0.0
+
+    def reject(self, position: str, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{position}: {error}")
+
+    def summary(self) -> str:
+        return (
+            f"{self.modules} modules, {self.lessons} lessons, {self.exercises} exercises "
+            f"({self.changed} rows changed, {self.rejected} rejected) "
+            f"in {self.elapsed_seconds:.2f}s, {self.records_per_second:,.0f} records/s"
+        )
+
+
+def _read_jsonl(path: Path) -> Iterator[tuple[str, Any]]:
+    with path.open(encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield f"line {line_no}", json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield f"line {line_no}", ValueError(f"invalid JSON: {exc.msg}")
+
+
+def _read_yaml(path: Path) -> Iterator[tuple[str, Any]]:
+    try:
+        import yaml
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("YAML course packs require PyYAML: pip install pyyaml") from exc
+
+    with path.open(encoding="utf-8") as handle:
+        # One document at a time, so a pack split into per-module documents
+        # never has to be held in memory at once.
+        for doc_no, document in enumerate(yaml.safe_load_all(handle), start=1):
+            if document is None:
+                continue
+            if isinstance(document, dict) and "modules" in document:
+                document = document["modules"]
+            if isinstance(document, list):
+                for index, item in enumerate(document):
+                    if isinstance(item, dict):
+                        item.setdefault("kind", "module")
+                    yield f"document {doc_no}[{index}]", item
+            else:
+                yield f"document {doc_no}", document
+
+
+def read_course_pack(path: str | Path) -> Iterator[tuple[str, Any]]:
+    """Yield (position, record) pairs from a `.jsonl`, `.yaml` or `.yml` file.
+
+    Unparseable lines are yielded as ValueError instances so that the importer
+    can reject them and continue.
+    """
+
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".jsonl":
+        return _read_jsonl(path)
+    if suffix in {".yaml", ".yml"}:
+        return _read_yaml(path)
+    raise ValueError(f"Unsupported course pack format: {path.name} (expected .jsonl, .yaml or .yml)")
+
+
+def _flatten(position: str, record: dict[str, Any], kind: str) -> Iterator[tuple[str, str, dict[str, Any]]]:
+    """Yield (kind, position, record) for a record and its nested children."""
+
+    child_key, child_kind = _CHILDREN.get(kind, (None, None))
+    children = record.pop(child_key, None) if child_key else None
+    yield kind, position, record
+    if children is None:
+        return
+    if not isinstance(children, list):
+        raise ValueError(f"'{child_key}' must be a list")
+    for index, child in enumerate(children):
+        child_position = f"{position} > {child_key}[{index}]"
+        if isinstance(child, dict):
+            child.setdefault(kind, record.get("external_id"))
+        yield from _flatten(child_position, child, child_kind)
+
+
+def _upsert(connection: Connection, kind: str, rows: list[dict[str, Any]]) -> int:
+    """Insert or update rows by external_id; returns number of rows written."""
+
+    table = _TABLES[kind]
+    columns = _UPSERT_COLUMNS[kind]
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.external_id],
+        set_={name: statement.excluded[name] for name in columns},
+        # Unchanged rows are not rewritten, which keeps re-imports cheap.
+        where=or_(*(table.c[name].is_distinct_from(statement.excluded[name]) for name in columns)),
+    )
+    result = connection.execute(statement, rows)
+    return max(result.rowcount or 0, 0)
+
+
+def _load_ids(connection: Connection, kind: str, external_ids: Iterable[str]) -> dict[str, int]:
+    table = _TABLES[kind]
+    external_ids = list(external_ids)
+    if not external_ids:
+        return {}
+    rows = connection.execute(select(table.c.external_id, table.c.id).where(table.c.external_id.in_(external_ids)))
+    return {row.external_id: row.id for row in rows}
+
+
+class ContentImporter:
+    """Validates records and writes them in chunked bulk upserts."""
+
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        chunk_size: int = CONTENT_IMPORT_CHUNK_SIZE,
+        on_chunk: Callable[[ImportReport], None] | None = None,
+    ) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self.report = ImportReport()
+        self._pending: dict[str, list[tuple[str, dict[str, Any]]]] = {kind: [] for kind in _KINDS}
+        self._pending_count = 0
+        # external_id -> id of parents seen so far, shared across chunks.
+        self._ids: dict[str, dict[str, int]] = {"module": {}, "lesson": {}}
+
+    def add(self, position: str, record: Any) -> None:
+        """Validate one raw record (and nested children) and queue it."""
+
+        if isinstance(record, Exception):
+            self.report.reject(position, str(record))
+            return
+        if not isinstance(record, dict):
+            self.report.reject(position, f"expected an object, got {type(record).__name__}")
+            return
+        kind = str(record.pop("kind", "")).strip().lower()
+        if kind not in _KINDS:
+            self.report.reject(position, f"unknown kind '{kind}' (expected module, lesson or exercise)")
+            return
+
+        try:
+            for item_kind, item_position, item in _flatten(position, record, kind):
+                self._queue(item_kind, item_position, item)
+        except ValueError as exc:
+            self.report.reject(position, str(exc))
+
+    def _queue(self, kind: str, position: str, record: Any) -> None:
+        try:
+            if kind == "module":
+                validate_module_record(record)
+            elif kind == "lesson":
+                validate_lesson_record(record)
+            else:
+                if "external_id" not in record or "lesson" not in record:
+                    raise ValueError("Exercise payload missing required fields: ['external_id', 'lesson']")
+                record["external_id"] = str(record["external_id"]).strip()
+                record["lesson"] = str(record["lesson"]).strip()
+                validate_exercise_payload(record)
+        except (TypeError, ValueError) as exc:
+            self.report.reject(position, str(exc))
+            return
+
+        self._pending[kind].append((position, record))
+        self._pending_count += 1
+        if self._pending_count >= self.chunk_size:
+            self.flush()
+
+    def _resolve_parents(
+        self,
+        connection: Connection,
+        records: list[tuple[str, dict[str, Any]]],
+        kind: str,
+        parent_kind: str,
+    ) -> list[dict[str, Any]]:
+        """Return rows of `kind` with parent ids filled in; reject orphans."""
+
+        known = self._ids[parent_kind]
+        unknown = {record[parent_kind] for _, record in records} - known.keys()
+        known.update(_load_ids(connection, parent_kind, unknown))
+
+        rows = []
+        for position, record in records:
+            parent_id = known.get(record[parent_kind])
+            if parent_id is None:
+                self.report.reject(position, f"unknown {parent_kind} '{record[parent_kind]}'")
+                continue
+            row = {name: record[name] for name in _UPSERT_COLUMNS[kind] if name != f"{parent_kind}_id"}
+            row[f"{parent_kind}_id"] = parent_id
+            row["external_id"] = record["external_id"]
+            rows.append(row)
+        return rows
+
+    def flush(self) -> None:
+        """Write queued records in one transaction."""
+
+        if not self._pending_count:
+            return
+        pending = self._pending
+        # Reset first: a chunk that fails to write is not retried by finish().
+        self._pending = {kind: [] for kind in _KINDS}
+        self._pending_count = 0
+
+        with self.engine.begin() as connection:
+            modules = [
+                {"external_id": record["external_id"], "title": record["title"], "order": record["order"]}
+                for _, record in pending["module"]
+            ]
+            changed = 0
+            if modules:
+                changed += _upsert(connection, "module", modules)
+                self._ids["module"].update(_load_ids(connection, "module", (row["external_id"] for row in modules)))
+
+            lessons = self._resolve_parents(connection, pending["lesson"], "lesson", "module")
+            if lessons:
+                changed += _upsert(connection, "lesson", lessons)
+                self._ids["lesson"].update(_load_ids(connection, "lesson", (row["external_id"] for row in lessons)))
+
+            exercises = self._resolve_parents(connection, pending["exercise"], "exercise", "lesson")
+            if exercises:
+                changed += _upsert(connection, "exercise", exercises)
+
+        self.report.modules += len(modules)
+        self.report.lessons += len(lessons)
+        self.report.exercises += len(exercises)
+        self.report.changed += changed
+        self.report.chunks += 1
+        if self.on_chunk is not None:
+            self.on_chunk(self.report)
+
+    def finish(self) -> ImportReport:
+        """Flush remaining records, bump content version if needed, return report."""
+
+        try:
+            self.flush()
+        finally:
+            if self.report.changed:
+                with Session(bind=self.engine) as db:
+                    bump_content_version(db)
+                    db.commit()
+            self.report.finished_at = time.perf_counter()
+        return self.report
+
+
+def import_records(
+    records: Iterable[tuple[str, Any]],
+    chunk_size: int = CONTENT_IMPORT_CHUNK_SIZE,
+    on_chunk: Callable[[ImportReport], None] | None = None,
+) -> ImportReport:
+    """Import (position, record) pairs, e.g. from `read_course_pack`."""
+
+    importer = ContentImporter(chunk_size=chunk_size, on_chunk=on_chunk)
+    try:
+        for position, record in records:
+            importer.add(position, record)
+    finally:
+        report = importer.finish()
+    return report
+
+
+def import_course_pack(
+    path: str | Path,
+    chunk_size: int = CONTENT_IMPORT_CHUNK_SIZE,
+    on_chunk: Callable[[ImportReport], None] | None = None,
+) -> ImportReport:
+    """Import a JSONL/YAML course pack file and return the import report."""
+
+    return import_records(read_course_pack(path), chunk_size=chunk_size, on_chunk=on_chunk)
@@ -0,0 +1,198 @@
+"""Background stock of pre-generated AI exercises.
+
+Learners take exercises from the `generated_exercise_stock` table instead of
+waiting on an LLM round-trip. A producer keeps between `AI_STOCK_LOW_WATER`
+and `AI_STOCK_HIGH_WATER` unused, validated exercises per (topic, difficulty):
+whenever a take drops the known level below the low-water mark, a refill up to
+the high-water mark is scheduled on a bounded worker pool.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Select, func, insert, select, update
+
+from config import AI_STOCK_HIGH_WATER, AI_STOCK_LOW_WATER, AI_STOCK_REFILL_WORKERS
+from database import engine, read_session_scope
+from models import GeneratedExerciseStock
+from services.ai_cache_service import normalize_request_text
+from services.ai_service import ExerciseSpec, generate_exercises
+
+
+StockKey = tuple[str, str]
+
+
+def _stock_key(topic: str, difficulty: str) -> StockKey:
+    return normalize_request_text(topic), normalize_request_text(difficulty)
+
+
+def _available(key: StockKey) -> tuple[Any, ...]:
+    topic, difficulty = key
+    return (
+        GeneratedExerciseStock.topic == topic,
+        GeneratedExerciseStock.difficulty == difficulty,
+        GeneratedExerciseStock.consumed_at.is_(None),
+    )
+
+
+def available_count_statement(key: StockKey) -> Select:
+    """Count unused stock for a (topic, difficulty) key."""
+
+    return select(func.count()).select_from(GeneratedExerciseStock).where(*_available(key))
+
+
+def next_available_statement(key: StockKey) -> Select:
+    """Select id of the oldest unused stock item for a key."""
+
+    return (
+        select(GeneratedExerciseStock.id)
+        .where(*_available(key))
+        .order_by(GeneratedExerciseStock.id.asc())
+        .limit(1)
+    )
+
+
+def _count_available(key: StockKey) -> int:
+    with read_session_scope() as db:
+        return db.scalar(available_count_statement(key)) or 0
+
+
+class ExerciseStockProducer:
+    """Keeps per-key stock between low and high water marks."""
+
+    def __init__(self, low_water: int, high_water: int, max_workers: int) -> None:
+        if not 0 <= low_water <= high_water:
+            raise ValueError("Expected 0 <= low_water <= high_water.")
+        self.low_water = low_water
+        self.high_water = high_water
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="exercise-stock")
+        self._lock = threading.Lock()
+        self._levels: dict[StockKey, int] = {}
+        self._refilling: set[StockKey] = set()
+        self._metrics = {
+            "taken": 0,
+            "dry": 0,
+            "refills": 0,
+            "refill_failures": 0,
+            "generated": 0,
+            "last_refill_seconds": 0.0,
+            "total_refill_seconds": 0.0,
+        }
+
+    def take(self, topic: str, difficulty: str) -> dict[str, Any] | None:
+        """Hand out the oldest unused exercise, or None if the stock is dry."""
+
+        key = _stock_key(topic, difficulty)
+        next_id = next_available_statement(key).scalar_subquery()
+        with engine.begin() as connection:
+            payload_json = connection.execute(
+                update(GeneratedExerciseStock)
+                .where(GeneratedExerciseStock.id == next_id)
+                .values(consumed_at=datetime.utcnow())
+                .returning(GeneratedExerciseStock.payload_json)
+            ).scalar()
+
+        with self._lock:
+            if payload_json is None:
+                self._metrics["dry"] += 1
+                self._levels[key] = 0
+            else:
+                self._metrics["taken"] += 1
+                if key in self._levels:
+                    self._levels[key] = max(self._levels[key] - 1, 0)
+            level = self._levels.get(key)
+
+        if level is None or level < self.low_water:
+            self.request_refill(topic, difficulty)
+
+        return json.loads(payload_json) if payload_json is not None else None
+
+    def request_refill(self, topic: str, difficulty: str) -> bool:
+        """Schedule asynchronous refill; returns False if one is already running."""
+
+        key = _stock_key(topic, difficulty)
+        with self._lock:
+            if key in self._refilling:
+                return False
+            self._refilling.add(key)
+        self._executor.submit(self._refill, key, topic, difficulty)
+        return True
+
+    def _refill(self, key: StockKey, topic: str, difficulty: str) -> None:
+        started = time.perf_counter()
+        try:
+            available = _count_available(key)
+            missing = self.high_water - available
+            generated = 0
+            if missing > 0:
+                result = generate_exercises([ExerciseSpec(topic, difficulty)] * missing)
+                rows = [
+                    {
+                        "topic": key[0],
+                        "difficulty": key[1],
+                        "payload_json": json.dumps(payload, ensure_ascii=False),
+                        "created_at": datetime.utcnow(),
+                    }
+                    for payload in result.exercises
+                    if payload is not None
+                ]
+                if rows:
+                    with engine.begin() as connection:
+                        connection.execute(insert(GeneratedExerciseStock), rows)
+                generated = len(rows)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._levels[key] = available + generated
+                self._metrics["refills"] += 1
+                self._metrics["generated"] += generated
+                self._metrics["last_refill_seconds"] = elapsed
+                self._metrics["total_refill_seconds"] += elapsed
+        except Exception:  # noqa: BLE001 - background worker must not die
+            with self._lock:
+                self._metrics["refill_failures"] += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+    def metrics(self) -> dict[str, Any]:
+        """Return stock levels, refill latency and dry-stock counters."""
+
+        with self._lock:
+            refills = self._metrics["refills"]
+            return {
+                **self._metrics,
+                "avg_refill_seconds": self._metrics["total_refill_seconds"] / refills if refills else 0.0,
+                "levels": {f"{topic}/{difficulty}": level for (topic, difficulty), level in self._levels.items()},
+                "refilling": len(self._refilling),
+            }
+
+
+_producer = ExerciseStockProducer(
+    low_water=AI_STOCK_LOW_WATER,
+    high_water=AI_STOCK_HIGH_WATER,
+    max_workers=AI_STOCK_REFILL_WORKERS,
+)
+
+
+def take_exercise(topic: str, difficulty: str) -> dict[str, Any] | None:
+    """Return a pre-generated exercise payload, or None when stock is dry."""
+
+    return _producer.take(topic, difficulty)
+
+
+def warm_stock(topic: str, difficulty: str) -> bool:
+    """Schedule a refill for a (topic, difficulty) pair ahead of demand."""
+
+    return _producer.request_refill(topic, difficulty)
+
+
+def get_stock_metrics() -> dict[str, Any]:
+    """Return producer metrics (stock levels, refill latency, dry count)."""
+
+    return _producer.metrics()
@@ -1,15 +1,62 @@
 """Service layer that orchestrates gamification engines.
 
 This module combines XP, hearts, and streak logic for common user actions.
+Each action mutates the given user in memory and submits the resulting change
+to the write-behind queue, which persists it with atomic SQL increments. When
+write-behind is disabled the change is written immediately and the user is
+refreshed from the returned row. Due hearts are regenerated in SQL first (see
+`hearts_service`), so the in-memory engines never grant them a second time.
 """
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any
 
 from core.hearts_engine import can_start_lesson, remove_heart
 from core.streak_engine import check_streak_milestones, update_streak
 from core.xp_engine import PERFECT_LESSON_BONUS, calculate_xp, check_level_up
+from services.hearts_service import refresh_user_hearts
+from services.leaderboard_service import record_user
+from services.write_behind_service import UserDelta, submit_user_delta
+
+
+def _state_snapshot(user: Any) -> tuple[Any, ...]:
+    return (
+        getattr(user, "total_xp", 0) or 0,
+        user.hearts,
+        user.streak,
+        user.last_activity_date,
+    )
+
+
+def _submit_changes(user: Any, before: tuple[Any, ...]) -> None:
+    """Queue the difference between `before` and the user's current state."""
+
+    user_id = getattr(user, "id", None)
+    if user_id is None:
+        return
+
+    total_xp, hearts, streak, last_activity_date = before
+    stored = submit_user_delta(
+        UserDelta(
+            user_id=user_id,
+            xp=(getattr(user, "total_xp", 0) or 0) - total_xp,
+            hearts=user.hearts - hearts,
+            streak=user.streak if user.streak != streak else None,
+            last_activity_date=user.last_activity_date if user.last_activity_date != last_activity_date else None,
+            next_heart_at=user.next_heart_at if user.hearts != hearts else None,
+        )
+    )
+    if stored is not None:
+        user.xp = stored.xp
+        user.total_xp = stored.total_xp
+        user.level = stored.level
+        user.hearts = stored.hearts
+        user.next_heart_at = stored.next_heart_at
+        user.streak = stored.streak
+        user.last_activity_date = stored.last_activity_date
+        record_user(user)
 
 
 def _apply_xp(user: Any, xp_delta: int) -> dict[str, Any]:
@@ -21,6 +68,8 @@ def _apply_xp(user: Any, xp_delta: int) -> dict[str, Any]:
     new_level, remaining_xp, leveled_up = check_level_up(user.xp + xp_delta, user.level)
     user.level = new_level
     user.xp = remaining_xp
+    user.total_xp = (getattr(user, "total_xp", 0) or 0) + xp_delta
+    record_user(user)
 
     return {
         "xp_gained": xp_delta,
@@ -33,29 +82,41 @@ def _apply_xp(user: Any, xp_delta: int) -> dict[str, Any]:
 def process_correct_answer(user: Any, difficulty: str) -> dict[str, Any]:
     """Handle reward flow for a correct answer."""
 
+    now = datetime.utcnow()
+    refresh_user_hearts(user, now)
+    before = _state_snapshot(user)
     earned_xp = calculate_xp(difficulty)
     xp_result = _apply_xp(user, earned_xp)
+    can_continue = can_start_lesson(user, now)
+    _submit_changes(user, before)
 
     return {
         **xp_result,
         "hearts": user.hearts,
-        "can_continue": can_start_lesson(user),
+        "can_continue": can_continue,
     }
 
 
 def process_wrong_answer(user: Any) -> dict[str, Any]:
     """Handle penalty flow for a wrong answer."""
 
-    hearts_left = remove_heart(user)
+    now = datetime.utcnow()
+    refresh_user_hearts(user, now)
+    before = _state_snapshot(user)
+    hearts_left = remove_heart(user, now)
+    can_continue = can_start_lesson(user, now)
+    _submit_changes(user, before)
+
     return {
         "hearts": hearts_left,
-        "can_continue": can_start_lesson(user),
+        "can_continue": can_continue,
     }
 
 
 def complete_lesson(user: Any, lesson_score: int) -> dict[str, Any]:
     """Handle lesson completion rewards (perfect bonus + streak milestones)."""
 
+    before = _state_snapshot(user)
     bonus_xp = PERFECT_LESSON_BONUS if lesson_score >= 100 else 0
 
     update_streak(user)
@@ -73,6 +134,8 @@ def complete_lesson(user: Any, lesson_score: int) -> dict[str, Any]:
                 merged.append(badge)
         setattr(user, "badges", merged)
 
+    _submit_changes(user, before)
+
     return {
         **xp_result,
         "streak": user.streak,
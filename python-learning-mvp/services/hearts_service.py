@@ -0,0 +1,84 @@
+"""Hearts regeneration persisted with set-based SQL.
+
+The periodic job (`python -m jobs.regenerate_hearts`) and the per-request
+refresh run the same `UPDATE`: it grants every heart due since `next_heart_at`
+and advances (or clears) `next_heart_at` in the same statement, so a heart is
+never granted twice no matter which path gets there first. The job's
+`next_heart_at <= now` range is served by the partial `ix_users_next_heart_at`
+index, which holds only users who are waiting for a heart.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, Integer, Update, case, cast, func, literal, update
+
+from core.hearts_engine import MAX_HEARTS, REGEN_INTERVAL, is_heart_due, regenerate_hearts
+from database import engine
+from models import User
+
+
+REGEN_INTERVAL_SECONDS = int(REGEN_INTERVAL.total_seconds())
+_MS_PER_DAY = 86_400_000
+
+
+def regenerate_statement(now: datetime, user_id: int | None = None) -> Update:
+    """UPDATE granting all hearts due at `now` (for one user or everyone)."""
+
+    now_value = literal(now, DateTime)
+    # Millisecond resolution matches the engine's timedelta arithmetic on the
+    # boundary; rounding absorbs julianday's floating-point error.
+    elapsed_ms = cast(
+        func.round((func.julianday(now_value) - func.julianday(User.next_heart_at)) * _MS_PER_DAY), Integer
+    )
+    hearts_due = elapsed_ms // (REGEN_INTERVAL_SECONDS * 1000) + 1
+    advanced_next_heart_at = func.strftime(
+        "%Y-%m-%d %H:%M:%f",
+        User.next_heart_at,
+        func.printf("+%d seconds", hearts_due * REGEN_INTERVAL_SECONDS),
+    )
+
+    statement = (
+        update(User)
+        .where(
+            User.premium.is_(False),
+            User.hearts < MAX_HEARTS,
+            User.next_heart_at <= now_value,
+        )
+        .values(
+            hearts=func.min(MAX_HEARTS, User.hearts + hearts_due),
+            next_heart_at=case((User.hearts + hearts_due >= MAX_HEARTS, None), else_=advanced_next_heart_at),
+        )
+    )
+    if user_id is not None:
+        statement = statement.where(User.id == user_id)
+    return statement
+
+
+def regenerate_due_hearts(now: datetime | None = None) -> int:
+    """Regenerate hearts for all eligible users; returns number of users updated."""
+
+    with engine.begin() as connection:
+        result = connection.execute(regenerate_statement(now or datetime.utcnow()))
+    return max(result.rowcount or 0, 0)
+
+
+def refresh_user_hearts(user: Any, now: datetime | None = None) -> bool:
+    """Persist and apply due hearts for one user; returns True if any were due.
+
+    The common case is a single timestamp comparison with no SQL. The user's
+    in-memory state is advanced with the engine's identical rules rather than
+    replaced from the row, so unflushed write-behind changes stay applied.
+    """
+
+    now = now or datetime.utcnow()
+    if not is_heart_due(user, now):
+        return False
+
+    if getattr(user, "id", None) is not None:
+        with engine.begin() as connection:
+            connection.execute(regenerate_statement(now, user_id=user.id))
+    regenerate_hearts(user, now)
+    return True
@@ -1,18 +1,134 @@
-"""Leaderboard service for ranking users by XP."""
+"""Leaderboard service for ranking users by XP.
+
+Reads are served from an in-memory `LeaderboardIndex` that is rebuilt from the
+database once per process and then kept current by the gamification service.
+Ranking uses lifetime XP (`User.total_xp`) backed by the covering
+`ix_users_leaderboard` index.
+"""
 
 from __future__ import annotations
 
-from database import SessionLocal
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import Select, func, select, update
+from sqlalchemy.orm import Session
+
+from core.leaderboard_engine import LeaderboardEntry, LeaderboardIndex, entry_from_user
+from core.xp_engine import XP_PER_LEVEL
+from database import SessionLocal, engine, read_session_scope
 from models import User
 
 
-def get_top_users(limit: int = 20) -> list[User]:
-    """Return top users sorted by XP descending (top-N leaderboard)."""
+_index = LeaderboardIndex()
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def leaderboard_statement() -> Select:
+    """Select leaderboard columns in ranking order (index-only scan)."""
+
+    return select(
+        User.id,
+        User.email,
+        User.total_xp,
+        User.level,
+        User.streak,
+        User.created_at,
+    ).order_by(User.total_xp.desc(), User.created_at.asc(), User.id.asc())
+
+
+def _row_to_entry(row: Any) -> LeaderboardEntry:
+    return LeaderboardEntry(
+        user_id=row.id,
+        email=row.email,
+        total_xp=row.total_xp,
+        level=row.level,
+        streak=row.streak,
+        created_at=row.created_at,
+    )
+
+
+def query_top_users(db: Session, limit: int = 20) -> list[LeaderboardEntry]:
+    """Run top-N leaderboard query directly against the database."""
+
+    return [_row_to_entry(row) for row in db.execute(leaderboard_statement().limit(limit))]
+
+
+def rebuild_leaderboard() -> int:
+    """Reload leaderboard index from the users table and return its size."""
+
+    global _index_loaded
+
+    with _index_lock:
+        with read_session_scope() as db:
+            rows = db.execute(leaderboard_statement()).all()
+        size = _index.rebuild(_row_to_entry(row) for row in rows)
+        _index_loaded = True
+    return size
+
+
+def _get_index() -> LeaderboardIndex:
+    """Return leaderboard index, building it on first use."""
+
+    if not _index_loaded:
+        rebuild_leaderboard()
+    return _index
+
+
+def record_user(user: Any) -> None:
+    """Refresh a user's leaderboard entry after XP/level/streak changes."""
+
+    if getattr(user, "id", None) is None:
+        return
+    _get_index().upsert(entry_from_user(user))
+
+
+def get_top_users(limit: int = 20) -> list[LeaderboardEntry]:
+    """Return top users sorted by lifetime XP descending (top-N leaderboard)."""
+
+    return _get_index().top(limit)
+
+
+def get_user_rank(user_id: int) -> int | None:
+    """Return 1-based leaderboard rank for a user."""
+
+    return _get_index().rank_of(user_id)
+
+
+def backfill_total_xp(
+    batch_size: int = 5000,
+    on_batch: Callable[[int, int], None] | None = None,
+) -> int:
+    """Recompute `total_xp` from (level, xp) for all users in id-range batches.
+
+    Each batch is a single set-based UPDATE committed in its own transaction,
+    so the writer lock is held only briefly. Returns number of updated rows.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
 
     with SessionLocal() as db:
-        return (
-            db.query(User)
-            .order_by(User.xp.desc(), User.level.desc(), User.created_at.asc())
-            .limit(limit)
-            .all()
-        )
+        max_id = db.scalar(select(func.max(User.id))) or 0
+
+    # Same formula as core.xp_engine.get_total_xp, evaluated by SQLite.
+    lifetime_xp = (XP_PER_LEVEL // 2) * User.level * (User.level - 1) + User.xp
+
+    updated = 0
+    lower_id = 0
+    while lower_id < max_id:
+        upper_id = lower_id + batch_size
+        with engine.begin() as connection:
+            result = connection.execute(
+                update(User)
+                .where(User.id > lower_id, User.id <= upper_id)
+                .values(total_xp=lifetime_xp)
+            )
+        updated += result.rowcount or 0
+        if on_batch is not None:
+            on_batch(upper_id, updated)
+        lower_id = upper_id
+
+    return updated
@@ -2,65 +2,177 @@
 
 from __future__ import annotations
 
-import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-from database import SessionLocal
+from sqlalchemy import Select, func, select
+
+from core.answer_engine import AnswerValidator, ExecutionValidator, compile_validator
+from database import read_session_scope
 from models import Exercise, Lesson, Module
+from schemas import ExerciseSnapshot, LessonBundle, LessonSnapshot, ModuleSnapshot
+from services.code_runner_service import run_code
+from services.content_cache_service import get_content_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+def modules_statement() -> Select:
+    """Select all modules in display order."""
+
+    return select(Module).order_by(Module.order.asc(), Module.id.asc())
+
+
+def lessons_statement(module_id: int) -> Select:
+    """Select lessons of one module in display order."""
+
+    return select(Lesson).where(Lesson.module_id == module_id).order_by(Lesson.order.asc(), Lesson.id.asc())
+
+
+def exercises_statement(lesson_id: int) -> Select:
+    """Select exercises of one lesson ordered by id."""
+
+    return select(Exercise).where(Exercise.lesson_id == lesson_id).order_by(Exercise.id.asc())
+
+
+def module_lesson_counts_statement() -> Select:
+    """Select number of lessons per module (index-only scan)."""
+
+    return select(Lesson.module_id, func.count()).group_by(Lesson.module_id)
+
+
+def _load_modules() -> tuple[ModuleSnapshot, ...]:
+    with read_session_scope() as db:
+        rows = db.scalars(modules_statement())
+        return tuple(ModuleSnapshot.from_model(row) for row in rows)
+
+
+def _load_lessons(module_id: int) -> tuple[LessonSnapshot, ...]:
+    with read_session_scope() as db:
+        rows = db.scalars(lessons_statement(module_id))
+        return tuple(LessonSnapshot.from_model(row) for row in rows)
+
+
+def _load_exercises(lesson_id: int) -> tuple[ExerciseSnapshot, ...]:
+    with read_session_scope() as db:
+        rows = db.scalars(exercises_statement(lesson_id))
+        return tuple(ExerciseSnapshot.from_model(row) for row in rows)
 
 
-def get_modules() -> list[Module]:
+def get_modules() -> tuple[ModuleSnapshot, ...]:
     """Return all modules ordered by their configured order."""
 
-    with SessionLocal() as db:
-        return db.query(Module).order_by(Module.order.asc(), Module.id.asc()).all()
+    return get_content_cache().get_or_load(("modules",), _load_modules)
 
 
-def get_lessons(module_id: int) -> list[Lesson]:
+def _load_module_lesson_counts() -> dict[int, int]:
+    with read_session_scope() as db:
+        return {module_id: count for module_id, count in db.execute(module_lesson_counts_statement())}
+
+
+def get_module_lesson_counts() -> dict[int, int]:
+    """Return number of lessons per module id."""
+
+    return get_content_cache().get_or_load(("module_lesson_counts",), _load_module_lesson_counts)
+
+
+def get_lessons(module_id: int) -> tuple[LessonSnapshot, ...]:
     """Return lessons for a module ordered by lesson order."""
 
-    with SessionLocal() as db:
-        return (
-            db.query(Lesson)
-            .filter(Lesson.module_id == module_id)
-            .order_by(Lesson.order.asc(), Lesson.id.asc())
-            .all()
-        )
+    return get_content_cache().get_or_load(("lessons", module_id), lambda: _load_lessons(module_id))
 
 
-def get_exercises(lesson_id: int) -> list[Exercise]:
+def get_exercises(lesson_id: int) -> tuple[ExerciseSnapshot, ...]:
     """Return exercises for a lesson ordered by id."""
 
-    with SessionLocal() as db:
-        return db.query(Exercise).filter(Exercise.lesson_id == lesson_id).order_by(Exercise.id.asc()).all()
+    return get_content_cache().get_or_load(("exercises", lesson_id), lambda: _load_exercises(lesson_id))
 
 
-def _normalize_text(value: Any) -> str:
-    """Normalize free-text/code-line answer for tolerant comparison."""
+def get_lesson_bundle(lesson: LessonSnapshot) -> LessonBundle:
+    """Return lesson exercises (options parsed) plus the id of the next lesson."""
 
-    text = str(value or "").strip().lower()
-    return re.sub(r"\s+", " ", text)
+    lessons = get_lessons(lesson.module_id)
+    lesson_ids = [item.id for item in lessons]
+    position = lesson_ids.index(lesson.id) if lesson.id in lesson_ids else -1
+    next_lesson_id = lesson_ids[position + 1] if 0 <= position < len(lesson_ids) - 1 else None
 
+    return LessonBundle(
+        lesson=lesson,
+        exercises=get_exercises(lesson.id),
+        next_lesson_id=next_lesson_id,
+    )
 
-def validate_answer(exercise: Exercise, user_answer: Any) -> bool:
-    """Validate user answer according to exercise type rules.
 
-    MVP rules:
-    - MULTIPLE_CHOICE -> exact match to correct_answer
-    - FILL_CODE -> exact string match
-    - WRITE_LINE -> normalized text match
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lesson-prefetch")
+_prefetch_in_flight: set[int] = set()
+_prefetch_lock = threading.Lock()
+
+
+def _prefetch_exercises(lesson_id: int) -> None:
+    try:
+        get_exercises(lesson_id)
+    finally:
+        with _prefetch_lock:
+            _prefetch_in_flight.discard(lesson_id)
+
+
+def prefetch_lesson(lesson_id: int | None) -> None:
+    """Warm content cache for a lesson's exercises in a background thread."""
+
+    if lesson_id is None:
+        return
+    with _prefetch_lock:
+        if lesson_id in _prefetch_in_flight:
+            return
+        _prefetch_in_flight.add(lesson_id)
+    _prefetch_executor.submit(_prefetch_exercises, lesson_id)
+
+
+def _compile_lesson_validators(lesson_id: int) -> dict[int, AnswerValidator]:
+    validators = {}
+    for exercise in get_exercises(lesson_id):
+        try:
+            validators[exercise.id] = compile_validator(exercise)
+        except ValueError:
+            # Leave it out: only this exercise fails (when compiled ad hoc in
+            # get_validator), the rest of the lesson still grades.
+            logger.exception("Cannot compile validator for exercise %s", exercise.id)
+    return validators
+
+
+def get_validator(exercise: Exercise | ExerciseSnapshot) -> AnswerValidator:
+    """Return compiled validator for an exercise.
+
+    Validators are compiled for a whole lesson at once and kept in the content
+    cache, so they are keyed by (exercise id, content version) and rebuilt when
+    content changes. Exercises not stored in the database, or left out of the
+    lesson's validators because they failed to compile, are compiled ad hoc
+    (and raise for the bad exercise only).
     """
 
-    exercise_type = (exercise.type or "").strip().upper()
-    correct_answer = exercise.correct_answer or ""
+    if exercise.id is not None and exercise.lesson_id is not None:
+        validators = get_content_cache().get_or_load(
+            ("validators", exercise.lesson_id),
+            lambda: _compile_lesson_validators(exercise.lesson_id),
+        )
+        validator = validators.get(exercise.id)
+        if validator is not None:
+            return validator
+    return compile_validator(exercise)
 
-    if exercise_type == "MULTIPLE_CHOICE":
-        return str(user_answer) == str(correct_answer)
 
-    if exercise_type == "FILL_CODE":
-        return str(user_answer) == str(correct_answer)
+def validate_answer(exercise: Exercise | ExerciseSnapshot, user_answer: Any, user_id: int | None = None) -> bool:
+    """Validate user answer according to exercise type rules.
 
-    if exercise_type == "WRITE_LINE":
-        return _normalize_text(user_answer) == _normalize_text(correct_answer)
+    See `core.answer_engine` for the per-type rules. RUN_CODE answers are run
+    in the sandbox pool; `user_id` applies the per-user concurrency cap and
+    `CodeRunnerBusy` is raised when the pool is saturated.
+    """
 
-    raise ValueError(f"Unsupported exercise type: {exercise.type}")
+    validator = get_validator(exercise)
+    if isinstance(validator, ExecutionValidator):
+        return run_code(str(user_answer or ""), validator.tests, user_id=user_id).passed
+    return validator.check(user_answer)
@@ -0,0 +1,478 @@
+"""Learner progress from an append-only answer attempt log.
+
+The exercise page appends an `AnswerAttempt` event for every answer and one
+`lesson_complete` event per finished lesson run. Events are buffered in memory
+and inserted in batches by a background thread (the same `BufferedFlusher`
+as user write-behind), so a click never waits on a write.
+
+After each flush, events past the `user_progress` watermark are folded into
+`UserProgress` (completed, best score, first completion time) and the
+watermark is advanced in the same transaction. Folding is a max/min merge, so
+replaying events can never lower a score. `python -m jobs.aggregate_progress`
+runs the same fold when the app is not running.
+
+The same fold recounts completed lessons for the affected (user, module)
+pairs in `UserModuleProgress`, so Home reads a user's progress on every
+module with one primary-key range read; lesson totals come from the content
+cache and unlocking is derived by `core.progress_engine`.
+
+Other aggregates (review schedules, exercise statistics) register their own fold with
+`register_attempt_consumer` and advance their own watermark.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import uuid
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Connection, Insert, Select, delete, func, literal, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import (
+    ATTEMPT_LOG_FLUSH_SECONDS,
+    ATTEMPT_LOG_MAX_BATCH,
+    PROGRESS_AGGREGATE_BATCH_SIZE,
+    WRITE_BEHIND_ENABLED,
+)
+from core.progress_engine import ModuleProgress, build_module_progress
+from database import engine, read_session_scope
+from models import AggregationWatermark, AnswerAttempt, Lesson, User, UserModuleProgress, UserProgress
+from services.lesson_service import get_module_lesson_counts, get_modules
+from services.write_behind_service import BufferedFlusher
+
+
+logger = logging.getLogger(__name__)
+
+ANSWER = "answer"
+LESSON_COMPLETE = "lesson_complete"
+PROGRESS_CONSUMER = "user_progress"
+
+# Folds a batch of `answer_attempts` rows into an aggregate, inside the
+# transaction that advances the consumer's watermark.
+AttemptFold = Callable[[Connection, list[Any]], None]
+
+
+@dataclass(frozen=True)
+class AttemptEvent:
+    """One `answer_attempts` row waiting to be written."""
+
+    user_id: int
+    lesson_id: int
+    run_id: str
+    kind: str
+    exercise_id: int | None = None
+    is_correct: bool | None = None
+    score: int | None = None
+    duration_ms: int | None = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+@dataclass(frozen=True)
+class LessonProgress:
+    """Stored progress of one user on one lesson."""
+
+    lesson_id: int
+    completed: bool
+    score: int
+    completed_at: datetime | None
+
+
+def new_run_id() -> str:
+    """Return an id grouping the events of one pass through a lesson."""
+
+    return uuid.uuid4().hex
+
+
+def write_attempts(events: Sequence[AttemptEvent]) -> int:
+    """Insert events with one executemany; returns number of rows written."""
+
+    if not events:
+        return 0
+    with engine.begin() as connection:
+        connection.execute(
+            AnswerAttempt.__table__.insert(),
+            [
+                {
+                    "user_id": event.user_id,
+                    "lesson_id": event.lesson_id,
+                    "exercise_id": event.exercise_id,
+                    "run_id": event.run_id,
+                    "kind": event.kind,
+                    "is_correct": event.is_correct,
+                    "score": event.score,
+                    "duration_ms": event.duration_ms,
+                    "created_at": event.created_at,
+                }
+                for event in events
+            ],
+        )
+    return len(events)
+
+
+def _claim_watermark(connection: Connection, name: str) -> int:
+    """Return the consumer's watermark with the database write lock held.
+
+    The upsert is a write, so it opens the write transaction before the
+    watermark is read: two consumers can never fold the same events.
+    """
+
+    statement = sqlite_insert(AggregationWatermark).values(name=name, last_id=0, updated_at=datetime.utcnow())
+    statement = statement.on_conflict_do_update(
+        index_elements=[AggregationWatermark.name],
+        set_={"updated_at": statement.excluded.updated_at},
+    ).returning(AggregationWatermark.last_id)
+    return connection.execute(statement).scalar_one()
+
+
+def consume_attempts(
+    name: str,
+    fold: AttemptFold,
+    batch_size: int = PROGRESS_AGGREGATE_BATCH_SIZE,
+    on_batch: Callable[[int, int], None] | None = None,
+) -> int:
+    """Feed events past watermark `name` to `fold` in id order.
+
+    Each batch is folded and the watermark advanced in one transaction.
+    `on_batch(last_id, total)` is called after each commit. Returns the
+    number of events consumed.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+
+    total = 0
+    while True:
+        with engine.begin() as connection:
+            last_id = _claim_watermark(connection, name)
+            rows = connection.execute(
+                select(AnswerAttempt.__table__)
+                .where(AnswerAttempt.id > last_id)
+                .order_by(AnswerAttempt.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            fold(connection, rows)
+            connection.execute(
+                update(AggregationWatermark)
+                .where(AggregationWatermark.name == name)
+                .values(last_id=rows[-1].id)
+            )
+        total += len(rows)
+        if on_batch is not None:
+            on_batch(rows[-1].id, total)
+
+
+def _fold_lesson_completions(connection: Connection, rows: list[Any]) -> None:
+    """Merge `lesson_complete` events into `user_progress` (best score, first completion)."""
+
+    merged: dict[tuple[int, int], dict[str, Any]] = {}
+    for row in rows:
+        if row.kind != LESSON_COMPLETE:
+            continue
+        key = (row.user_id, row.lesson_id)
+        current = merged.get(key)
+        if current is None:
+            merged[key] = {
+                "user_id": row.user_id,
+                "lesson_id": row.lesson_id,
+                "completed": True,
+                "score": row.score or 0,
+                "completed_at": row.created_at,
+            }
+        else:
+            current["score"] = max(current["score"], row.score or 0)
+            current["completed_at"] = min(current["completed_at"], row.created_at)
+    if not merged:
+        return
+
+    statement = sqlite_insert(UserProgress)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserProgress.user_id, UserProgress.lesson_id],
+        set_={
+            "completed": True,
+            "score": func.max(UserProgress.score, statement.excluded.score),
+            "completed_at": func.coalesce(UserProgress.completed_at, statement.excluded.completed_at),
+        },
+    )
+    connection.execute(statement, list(merged.values()))
+
+    user_ids = {user_id for user_id, _ in merged}
+    affected_modules = select(Lesson.module_id).where(Lesson.id.in_({lesson_id for _, lesson_id in merged}))
+    connection.execute(
+        module_progress_upsert(UserProgress.user_id.in_(user_ids), Lesson.module_id.in_(affected_modules))
+    )
+
+
+def module_progress_upsert(*conditions: Any) -> Insert:
+    """INSERT ... SELECT recounting completed lessons per (user, module).
+
+    Only pairs matching `conditions` (on `UserProgress`/`Lesson`) are
+    recounted; an exact recount makes repeated refreshes harmless.
+    """
+
+    counts = (
+        select(UserProgress.user_id, Lesson.module_id, func.count(), literal(datetime.utcnow()))
+        .join(Lesson, Lesson.id == UserProgress.lesson_id)
+        .where(UserProgress.completed.is_(True), *conditions)
+        .group_by(UserProgress.user_id, Lesson.module_id)
+    )
+    statement = sqlite_insert(UserModuleProgress).from_select(
+        ["user_id", "module_id", "completed_lessons", "updated_at"], counts
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[UserModuleProgress.user_id, UserModuleProgress.module_id],
+        set_={
+            "completed_lessons": statement.excluded.completed_lessons,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+
+
+def rebuild_module_progress(
+    batch_size: int = 5000,
+    on_batch: Callable[[int, int], None] | None = None,
+) -> int:
+    """Recompute `user_module_progress` from `user_progress` in user id ranges.
+
+    Needed after content moves lessons between modules or removes them. Each
+    range is replaced in its own short transaction. Returns rows written.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+
+    with engine.connect() as connection:
+        max_id = connection.scalar(select(func.max(User.id))) or 0
+
+    written = 0
+    lower_id = 0
+    while lower_id < max_id:
+        upper_id = lower_id + batch_size
+        with engine.begin() as connection:
+            connection.execute(
+                delete(UserModuleProgress).where(
+                    UserModuleProgress.user_id > lower_id, UserModuleProgress.user_id <= upper_id
+                )
+            )
+            result = connection.execute(
+                module_progress_upsert(UserProgress.user_id > lower_id, UserProgress.user_id <= upper_id)
+            )
+        written += max(result.rowcount or 0, 0)
+        if on_batch is not None:
+            on_batch(upper_id, written)
+        lower_id = upper_id
+    return written
+
+
+def aggregate_progress(
+    batch_size: int = PROGRESS_AGGREGATE_BATCH_SIZE,
+    on_batch: Callable[[int, int], None] | None = None,
+) -> int:
+    """Fold new attempt events into `user_progress`; returns events consumed."""
+
+    return consume_attempts(PROGRESS_CONSUMER, _fold_lesson_completions, batch_size, on_batch)
+
+
+# Consumers folded after every flush, each behind its own watermark.
+_consumers: dict[str, AttemptFold] = {PROGRESS_CONSUMER: _fold_lesson_completions}
+
+
+def register_attempt_consumer(name: str, fold: AttemptFold) -> None:
+    """Fold attempt events into another aggregate after every flush."""
+
+    _consumers[name] = fold
+
+
+def aggregate_attempts(batch_size: int = PROGRESS_AGGREGATE_BATCH_SIZE) -> dict[str, int]:
+    """Run every registered consumer; returns events consumed per consumer."""
+
+    return {name: consume_attempts(name, fold, batch_size) for name, fold in list(_consumers.items())}
+
+
+class AttemptLog(BufferedFlusher):
+    """Buffers attempt events and writes them in batches, then aggregates."""
+
+    def __init__(self, max_batch: int, flush_interval: float) -> None:
+        super().__init__("attempt-log", max_batch, flush_interval)
+        self._pending: list[AttemptEvent] = []
+
+    def submit(self, event: AttemptEvent) -> None:
+        with self._lock:
+            self._pending.append(event)
+            self._after_enqueue_locked()
+            if event.kind == LESSON_COMPLETE:
+                # Flush now: the learner is about to look at their progress.
+                self._request_flush_locked()
+
+    def load_with_pending(self, loader: Callable[[list[AttemptEvent]], Any]) -> Any:
+        """Run `loader(pending_events)` without racing a flush."""
+
+        with self._flush_lock:
+            with self._lock:
+                pending = list(self._pending)
+            return loader(pending)
+
+    def _pending_size(self) -> int:
+        return len(self._pending)
+
+    def _take_batch(self) -> list[AttemptEvent]:
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _restore_batch(self, batch: list[AttemptEvent]) -> None:
+        self._pending = batch + self._pending
+
+    def _write_batch(self, batch: list[AttemptEvent]) -> int:
+        written = write_attempts(batch)
+        _aggregate_after_write()
+        return written
+
+
+def _aggregate_after_write() -> None:
+    # Events are already committed: a failed fold is retried after the next
+    # write (or by the job) instead of re-inserting the batch.
+    for name, fold in list(_consumers.items()):
+        try:
+            consume_attempts(name, fold)
+        except Exception:
+            logger.exception("%s aggregation failed; will retry", name)
+
+
+_log = AttemptLog(max_batch=ATTEMPT_LOG_MAX_BATCH, flush_interval=ATTEMPT_LOG_FLUSH_SECONDS)
+atexit.register(_log.stop)
+
+
+def _submit(event: AttemptEvent) -> None:
+    if not WRITE_BEHIND_ENABLED:
+        write_attempts([event])
+        _aggregate_after_write()
+        return
+    _log.submit(event)
+
+
+def record_answer(
+    user_id: int,
+    lesson_id: int,
+    exercise_id: int,
+    run_id: str,
+    is_correct: bool,
+    duration_ms: int | None = None,
+) -> None:
+    """Append an answer event (buffered)."""
+
+    _submit(
+        AttemptEvent(
+            user_id,
+            lesson_id,
+            run_id,
+            ANSWER,
+            exercise_id=exercise_id,
+            is_correct=is_correct,
+            duration_ms=duration_ms,
+        )
+    )
+
+
+def record_lesson_complete(user_id: int, lesson_id: int, run_id: str, score: int) -> None:
+    """Append the event closing a lesson run with its score (buffered)."""
+
+    _submit(AttemptEvent(user_id, lesson_id, run_id, LESSON_COMPLETE, score=score))
+
+
+def lesson_progress_statement(user_id: int, lesson_ids: Sequence[int]) -> Select:
+    """Select stored progress of one user for the given lessons."""
+
+    return select(
+        UserProgress.lesson_id,
+        UserProgress.completed,
+        UserProgress.score,
+        UserProgress.completed_at,
+    ).where(UserProgress.user_id == user_id, UserProgress.lesson_id.in_(lesson_ids))
+
+
+def get_lesson_progress(user_id: int, lesson_ids: Sequence[int]) -> dict[int, LessonProgress]:
+    """Return progress per lesson id, including completions not yet flushed."""
+
+    if not lesson_ids:
+        return {}
+
+    def _load(pending: list[AttemptEvent]) -> dict[int, LessonProgress]:
+        with read_session_scope() as db:
+            rows = db.execute(lesson_progress_statement(user_id, lesson_ids)).all()
+        progress = {
+            row.lesson_id: LessonProgress(row.lesson_id, row.completed, row.score, row.completed_at) for row in rows
+        }
+        wanted = set(lesson_ids)
+        for event in pending:
+            if event.kind != LESSON_COMPLETE or event.user_id != user_id or event.lesson_id not in wanted:
+                continue
+            stored = progress.get(event.lesson_id)
+            progress[event.lesson_id] = LessonProgress(
+                event.lesson_id,
+                True,
+                max(stored.score if stored else 0, event.score or 0),
+                stored.completed_at if stored and stored.completed_at else event.created_at,
+            )
+        return progress
+
+    return _log.load_with_pending(_load)
+
+
+def module_progress_statement(user_id: int) -> Select:
+    """Select completed lesson counts of one user for every module."""
+
+    return select(UserModuleProgress.module_id, UserModuleProgress.completed_lessons).where(
+        UserModuleProgress.user_id == user_id
+    )
+
+
+def get_module_progress(user_id: int, module_ids: Sequence[int] | None = None) -> list[ModuleProgress]:
+    """Return progress and unlock state of modules in display order.
+
+    Lesson completions not yet flushed are counted, as in `get_lesson_progress`.
+    `module_ids` defaults to all modules; pass the ids already on screen to
+    keep both lists aligned.
+    """
+
+    if module_ids is None:
+        module_ids = [module.id for module in get_modules()]
+
+    def _load(pending: list[AttemptEvent]) -> dict[int, int]:
+        pending_lessons = {
+            event.lesson_id for event in pending if event.kind == LESSON_COMPLETE and event.user_id == user_id
+        }
+        with read_session_scope() as db:
+            completed = {module_id: count for module_id, count in db.execute(module_progress_statement(user_id))}
+            if pending_lessons:
+                # Count completions still in the buffer unless already folded.
+                newly_completed = db.execute(
+                    select(Lesson.module_id)
+                    .outerjoin(
+                        UserProgress,
+                        (UserProgress.lesson_id == Lesson.id)
+                        & (UserProgress.user_id == user_id)
+                        & UserProgress.completed.is_(True),
+                    )
+                    .where(Lesson.id.in_(pending_lessons), UserProgress.id.is_(None))
+                ).scalars()
+                for module_id in newly_completed:
+                    completed[module_id] = completed.get(module_id, 0) + 1
+        return completed
+
+    return build_module_progress(module_ids, get_module_lesson_counts(), _log.load_with_pending(_load))
+
+
+def flush_attempts() -> int:
+    """Write pending attempt events (and fold them) synchronously."""
+
+    return _log.flush()
+
+
+def get_attempt_log_stats() -> dict[str, int]:
+    return _log.stats()
@@ -0,0 +1,182 @@
+"""Spaced-repetition review schedules persisted in `review_items`.
+
+Every graded answer in the attempt log reschedules its (user, exercise) pair
+with `core.review_engine`: this module registers a consumer on the progress
+service's attempt log. A batch of answers is folded with one read of the
+current schedules and one executemany upsert.
+
+"Next N due reviews" is a single seek on `ix_review_items_user_due`
+(user_id, due_at), already in due order. A review session keeps the loaded
+items in an in-memory `ReviewQueue` min-heap. Spreading an overdue backlog
+over the following days is one set-based UPDATE, however many items a user
+has.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Connection, DateTime, Select, Update, func, literal, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import REVIEW_SESSION_SIZE
+from core.review_engine import ReviewQueue, ReviewState, quality_for_answer, schedule_review
+from database import engine, read_session_scope
+from models import ReviewItem
+from services.progress_service import ANSWER, register_attempt_consumer
+
+
+REVIEW_CONSUMER = "review_items"
+_SECONDS_PER_DAY = 86_400
+
+
+@dataclass(frozen=True)
+class DueReview:
+    """Exercise due for review with its current schedule."""
+
+    exercise_id: int
+    lesson_id: int
+    state: ReviewState
+
+
+def _row_to_state(row: Any) -> ReviewState:
+    return ReviewState(
+        repetitions=row.repetitions,
+        interval_days=row.interval_days,
+        ease=row.ease,
+        due_at=row.due_at,
+        lapses=row.lapses,
+    )
+
+
+def _fold_review_answers(connection: Connection, rows: list[Any]) -> None:
+    """Reschedule every (user, exercise) pair answered in `rows`, in event order."""
+
+    answers = [row for row in rows if row.kind == ANSWER and row.exercise_id is not None]
+    if not answers:
+        return
+
+    pairs = {(row.user_id, row.exercise_id) for row in answers}
+    # Two IN lists seek the primary key (a row-value IN scans the table);
+    # the few extra cross-product rows are dropped below.
+    stored = connection.execute(
+        select(ReviewItem.__table__).where(
+            ReviewItem.user_id.in_({user_id for user_id, _ in pairs}),
+            ReviewItem.exercise_id.in_({exercise_id for _, exercise_id in pairs}),
+        )
+    ).all()
+    states = {
+        (row.user_id, row.exercise_id): _row_to_state(row)
+        for row in stored
+        if (row.user_id, row.exercise_id) in pairs
+    }
+    reviewed: dict[tuple[int, int], tuple[int, datetime]] = {}
+    for row in answers:
+        key = (row.user_id, row.exercise_id)
+        states[key] = schedule_review(states.get(key), quality_for_answer(bool(row.is_correct)), row.created_at)
+        reviewed[key] = (row.lesson_id, row.created_at)
+
+    statement = sqlite_insert(ReviewItem)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ReviewItem.user_id, ReviewItem.exercise_id],
+        set_={
+            name: statement.excluded[name]
+            for name in ("lesson_id", "repetitions", "interval_days", "ease", "lapses", "due_at", "last_reviewed_at")
+        },
+    )
+    connection.execute(
+        statement,
+        [
+            {
+                "user_id": user_id,
+                "exercise_id": exercise_id,
+                "lesson_id": lesson_id,
+                "repetitions": states[(user_id, exercise_id)].repetitions,
+                "interval_days": states[(user_id, exercise_id)].interval_days,
+                "ease": states[(user_id, exercise_id)].ease,
+                "lapses": states[(user_id, exercise_id)].lapses,
+                "due_at": states[(user_id, exercise_id)].due_at,
+                "last_reviewed_at": reviewed_at,
+            }
+            for (user_id, exercise_id), (lesson_id, reviewed_at) in reviewed.items()
+        ],
+    )
+
+
+register_attempt_consumer(REVIEW_CONSUMER, _fold_review_answers)
+
+
+def due_reviews_statement(user_id: int, now: datetime, limit: int) -> Select:
+    """Select a user's earliest due reviews (index range seek, no sort)."""
+
+    return (
+        select(ReviewItem.__table__)
+        .where(ReviewItem.user_id == user_id, ReviewItem.due_at <= now)
+        .order_by(ReviewItem.due_at)
+        .limit(limit)
+    )
+
+
+def get_due_reviews(user_id: int, limit: int = REVIEW_SESSION_SIZE, now: datetime | None = None) -> list[DueReview]:
+    """Return up to `limit` reviews due at `now`, earliest first."""
+
+    with read_session_scope() as db:
+        rows = db.execute(due_reviews_statement(user_id, now or datetime.utcnow(), limit)).all()
+    return [DueReview(row.exercise_id, row.lesson_id, _row_to_state(row)) for row in rows]
+
+
+def build_review_queue(reviews: list[DueReview]) -> ReviewQueue:
+    """Load due reviews into the in-memory min-heap used by a review session."""
+
+    return ReviewQueue((review.exercise_id, review.state.due_at) for review in reviews)
+
+
+def spread_statement(now: datetime, per_day: int, user_id: int | None = None) -> Update:
+    """UPDATE keeping `per_day` overdue reviews due now and moving the rest to later days.
+
+    Overdue items are ranked per user by due time with a window function;
+    item `n` (0-based) becomes due `n // per_day` days after `now`.
+    """
+
+    now_value = literal(now, DateTime)
+    overdue = select(
+        ReviewItem.user_id,
+        ReviewItem.exercise_id,
+        (
+            func.row_number().over(
+                partition_by=ReviewItem.user_id, order_by=(ReviewItem.due_at, ReviewItem.exercise_id)
+            )
+            - 1
+        ).label("position"),
+    ).where(ReviewItem.due_at <= now_value)
+    if user_id is not None:
+        overdue = overdue.where(ReviewItem.user_id == user_id)
+    ranked = overdue.subquery("ranked")
+
+    return (
+        update(ReviewItem)
+        .where(
+            ReviewItem.user_id == ranked.c.user_id,
+            ReviewItem.exercise_id == ranked.c.exercise_id,
+            ranked.c.position >= per_day,
+        )
+        .values(
+            due_at=func.strftime(
+                "%Y-%m-%d %H:%M:%f",
+                now_value,
+                func.printf("+%d seconds", ranked.c.position // per_day * _SECONDS_PER_DAY),
+            )
+        )
+    )
+
+
+def spread_overdue_reviews(per_day: int, user_id: int | None = None, now: datetime | None = None) -> int:
+    """Cap each user's reviews due today at `per_day`; returns rows moved."""
+
+    if per_day < 1:
+        raise ValueError("per_day must be >= 1")
+    with engine.begin() as connection:
+        result = connection.execute(spread_statement(now or datetime.utcnow(), per_day, user_id))
+    return max(result.rowcount or 0, 0)
@@ -0,0 +1,77 @@
+"""Nightly streak rollover persisted with set-based SQL.
+
+`core.streak_engine.update_streak` only notices a broken streak when the user
+completes their next lesson. The rollover zeroes every streak whose last
+activity is older than yesterday, with the same rule as
+`core.streak_engine.rollover_streak`, so stored streaks are correct without
+loading users.
+
+Candidates are walked in `(last_activity_date, id)` keyset order over the
+partial `ix_users_streak_rollover` index. Each chunk is one UPDATE in its own
+short transaction, so the writer lock is never held for long.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import date
+from typing import Any
+
+from sqlalchemy import Update, literal_column, select, tuple_, update
+
+from config import STREAK_ROLLOVER_CHUNK_SIZE
+from core.streak_engine import streak_cutoff
+from database import engine
+from models import User
+
+
+RolloverKey = tuple[date, int]
+
+
+def rollover_statement(cutoff: date, after: RolloverKey | None = None, chunk_size: int = 5000) -> Update:
+    """UPDATE zeroing the next chunk of broken streaks, returning their keys.
+
+    `cutoff` is the oldest last activity date that keeps a streak alive;
+    `after` is the largest key of the previous chunk.
+    """
+
+    # Literal 0 so SQLite can prove the partial index condition.
+    has_streak = User.streak > literal_column("0")
+    candidates = select(User.id).where(has_streak, User.last_activity_date < cutoff)
+    if after is not None:
+        candidates = candidates.where(tuple_(User.last_activity_date, User.id) > tuple_(*after))
+    candidates = candidates.order_by(User.last_activity_date, User.id).limit(chunk_size)
+
+    return (
+        update(User)
+        .where(User.id.in_(candidates.scalar_subquery()))
+        .values(streak=0)
+        .returning(User.last_activity_date, User.id)
+    )
+
+
+def rollover_streaks(
+    today: date | None = None,
+    chunk_size: int = STREAK_ROLLOVER_CHUNK_SIZE,
+    on_chunk: Callable[[int, int], None] | None = None,
+) -> int:
+    """Zero all streaks broken as of `today`; returns number of users reset.
+
+    `on_chunk(chunk_rows, total_rows)` is called after each committed chunk.
+    """
+
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+
+    cutoff = streak_cutoff(today or date.today())
+    after: RolloverKey | None = None
+    total = 0
+    while True:
+        with engine.begin() as connection:
+            rows: list[Any] = connection.execute(rollover_statement(cutoff, after, chunk_size)).all()
+        if not rows:
+            return total
+        total += len(rows)
+        after = max((row.last_activity_date, row.id) for row in rows)
+        if on_chunk is not None:
+            on_chunk(len(rows), total)
@@ -0,0 +1,415 @@
+"""Write-behind queue for per-answer user state updates.
+
+The gamification service submits XP, hearts and streak changes as `UserDelta`
+objects. Deltas are coalesced per user in memory and flushed by a background
+thread in one transaction per batch, either when `WRITE_BEHIND_MAX_BATCH`
+users are pending or every `WRITE_BEHIND_FLUSH_SECONDS`. Each delta is written
+as one atomic `UPDATE ... RETURNING` (increments computed in SQL), so there
+is no read-modify-write and no lost update. Reads overlay any
+unflushed delta on top of the stored row, so a learner always sees their own
+latest state. Pending deltas are drained on interpreter shutdown.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy import Connection, case, func, select, update
+
+from config import WRITE_BEHIND_ENABLED, WRITE_BEHIND_FLUSH_SECONDS, WRITE_BEHIND_MAX_BATCH
+from core.hearts_engine import MAX_HEARTS, REGEN_INTERVAL
+from core.xp_engine import XP_PER_LEVEL, check_level_up, get_xp_required
+from database import engine
+from models import User
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserDelta:
+    """Pending change to one user's gamification state.
+
+    `xp` and `hearts` are relative changes; `streak` and `last_activity_date`
+    are absolute values that replace the stored ones when set. `next_heart_at`
+    is the regeneration countdown started by a heart change, used only when
+    no countdown is stored yet.
+    """
+
+    user_id: int
+    xp: int = 0
+    hearts: int = 0
+    streak: int | None = None
+    last_activity_date: date | None = None
+    next_heart_at: datetime | None = None
+
+    def merge(self, newer: "UserDelta") -> "UserDelta":
+        """Combine with a later delta for the same user."""
+
+        return replace(
+            self,
+            xp=self.xp + newer.xp,
+            hearts=self.hearts + newer.hearts,
+            streak=newer.streak if newer.streak is not None else self.streak,
+            last_activity_date=(
+                newer.last_activity_date if newer.last_activity_date is not None else self.last_activity_date
+            ),
+            next_heart_at=self.next_heart_at if self.next_heart_at is not None else newer.next_heart_at,
+        )
+
+    def is_empty(self) -> bool:
+        return not self.xp and not self.hearts and self.streak is None and self.last_activity_date is None
+
+
+def apply_delta(user: Any, delta: UserDelta) -> None:
+    """Apply delta to a user-like object in memory (same rules as a flush)."""
+
+    user.level, user.xp, _ = check_level_up(user.xp + delta.xp, user.level)
+    user.total_xp += delta.xp
+    user.hearts = min(MAX_HEARTS, max(0, user.hearts + delta.hearts))
+    if user.hearts >= MAX_HEARTS:
+        user.next_heart_at = None
+    elif delta.hearts and user.next_heart_at is None:
+        user.next_heart_at = delta.next_heart_at or datetime.utcnow() + REGEN_INTERVAL
+    if delta.streak is not None:
+        user.streak = delta.streak
+    if delta.last_activity_date is not None:
+        user.last_activity_date = delta.last_activity_date
+
+
+def _merge_into(target: dict[int, UserDelta], delta: UserDelta) -> None:
+    existing = target.get(delta.user_id)
+    target[delta.user_id] = delta if existing is None else existing.merge(delta)
+
+
+class BufferedFlusher(ABC):
+    """Base class: buffer items under a lock and flush them from a daemon thread.
+
+    Subclasses implement `_pending_size`, `_take_batch`, `_restore_batch` and
+    `_write_batch`.
+    """
+
+    def __init__(self, name: str, max_batch: int, flush_interval: float) -> None:
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._flush_requested = False
+        self.flushes = 0
+        self.flushed_items = 0
+        self.failed_flushes = 0
+
+    @abstractmethod
+    def _pending_size(self) -> int:
+        """Number of buffered items; called with `_lock` held."""
+
+    @abstractmethod
+    def _take_batch(self) -> Any:
+        """Detach and return everything buffered; called with `_lock` held."""
+
+    @abstractmethod
+    def _restore_batch(self, batch: Any) -> None:
+        """Put a batch that failed to write back in front; called with `_lock` held."""
+
+    @abstractmethod
+    def _write_batch(self, batch: Any) -> int:
+        """Persist a batch; returns number of items written."""
+
+    def _after_enqueue_locked(self) -> None:
+        """Call with `_lock` held after adding items."""
+
+        if self._thread is None and not self._stopping:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        if self._pending_size() >= self.max_batch:
+            self._wakeup.notify()
+
+    def _request_flush_locked(self) -> None:
+        """Call with `_lock` held: flush without waiting for the interval."""
+
+        self._flush_requested = True
+        self._wakeup.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._pending_size() < self.max_batch and not self._stopping and not self._flush_requested:
+                    self._wakeup.wait(self.flush_interval)
+                self._flush_requested = False
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def flush(self) -> int:
+        """Write everything pending now; returns number of flushed items."""
+
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take_batch()
+            if not batch:
+                return 0
+            try:
+                written = self._write_batch(batch)
+            except Exception:
+                logger.exception("%s flush failed; batch re-queued", self.name)
+                with self._lock:
+                    self._restore_batch(batch)
+                    self.failed_flushes += 1
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.flushed_items += written
+            return written
+
+    def stop(self) -> None:
+        """Stop background thread after draining pending items."""
+
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "pending": self._pending_size(),
+                "flushes": self.flushes,
+                "flushed_items": self.flushed_items,
+                "failed_flushes": self.failed_flushes,
+            }
+
+
+class UserDeltaQueue(BufferedFlusher):
+    """Coalesces `UserDelta`s per user and flushes them in batches."""
+
+    def __init__(self, max_batch: int, flush_interval: float) -> None:
+        super().__init__("user-write-behind", max_batch, flush_interval)
+        self._pending: dict[int, UserDelta] = {}
+
+    def submit(self, delta: UserDelta) -> None:
+        if delta.is_empty():
+            return
+        with self._lock:
+            _merge_into(self._pending, delta)
+            self._after_enqueue_locked()
+
+    def load_with_pending(self, loader: Callable[[], Any]) -> Any:
+        """Run `loader` and overlay pending deltas without racing a flush.
+
+        Holding the flush lock guarantees the loaded row and the overlaid
+        delta never both contain (or both miss) a batch being written.
+        """
+
+        with self._flush_lock:
+            user = loader()
+            if user is not None:
+                delta = self.pending_for(user.id)
+                if delta is not None:
+                    apply_delta(user, delta)
+            return user
+
+    def pending_for(self, user_id: int) -> UserDelta | None:
+        """Return unflushed delta for user."""
+
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def _pending_size(self) -> int:
+        return len(self._pending)
+
+    def _take_batch(self) -> dict[int, UserDelta]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    def _restore_batch(self, batch: dict[int, UserDelta]) -> None:
+        newer, self._pending = self._pending, dict(batch)
+        for delta in newer.values():
+            _merge_into(self._pending, delta)
+
+    def _write_batch(self, batch: dict[int, UserDelta]) -> int:
+        return len(write_user_deltas(list(batch.values())))
+
+
+@dataclass(frozen=True)
+class UserState:
+    """Gamification columns of a user as stored after an update."""
+
+    user_id: int
+    xp: int
+    total_xp: int
+    level: int
+    hearts: int
+    next_heart_at: datetime | None
+    streak: int
+    last_activity_date: date | None
+
+
+# Level-ups resolved inside the UPDATE itself. A single answer or lesson bonus
+# never crosses more than one level; larger coalesced grants fall back to a
+# compare-and-swap correction.
+SQL_LEVEL_UP_STEPS = 3
+
+_RETURNING_COLUMNS = (
+    User.id,
+    User.xp,
+    User.total_xp,
+    User.level,
+    User.hearts,
+    User.next_heart_at,
+    User.streak,
+    User.last_activity_date,
+)
+
+
+def _row_to_state(row: Any) -> UserState:
+    return UserState(
+        user_id=row.id,
+        xp=row.xp,
+        total_xp=row.total_xp,
+        level=row.level,
+        hearts=row.hearts,
+        next_heart_at=row.next_heart_at,
+        streak=row.streak,
+        last_activity_date=row.last_activity_date,
+    )
+
+
+def _level_up_values(xp_delta: int) -> dict[str, Any]:
+    """Build SET expressions resolving carry-over level-ups relative to the old row.
+
+    Step k is taken when xp + delta covers the XP required for the old level
+    and the k - 1 levels after it; each taken step subtracts that level's
+    requirement (100 * level) from the carry-over.
+    """
+
+    raw_xp = User.xp + xp_delta
+    steps = []
+    for step in range(SQL_LEVEL_UP_STEPS):
+        # XP required to pass levels L .. L + step is
+        # 100 * ((step + 1) * L + step * (step + 1) / 2).
+        required_total = XP_PER_LEVEL * ((step + 1) * User.level + step * (step + 1) // 2)
+        steps.append((case((raw_xp >= required_total, 1), else_=0), XP_PER_LEVEL * (User.level + step)))
+
+    return {
+        "level": User.level + sum(taken for taken, _ in steps),
+        "xp": raw_xp - sum(taken * required for taken, required in steps),
+    }
+
+
+def apply_user_delta(connection: Connection, delta: UserDelta) -> UserState | None:
+    """Apply delta with one atomic UPDATE ... RETURNING and return the new state.
+
+    XP, hearts and level are computed from the stored row inside SQLite, so
+    concurrent writers (e.g. two open tabs) never overwrite each other's XP.
+    Returns None when the user does not exist.
+    """
+
+    new_hearts = func.min(MAX_HEARTS, func.max(0, User.hearts + delta.hearts))
+    values: dict[str, Any] = {
+        "total_xp": User.total_xp + delta.xp,
+        "hearts": new_hearts,
+    }
+    if delta.hearts:
+        # Start the regeneration countdown when hearts drop below the maximum;
+        # clear it when they are full again.
+        values["next_heart_at"] = case(
+            (new_hearts >= MAX_HEARTS, None),
+            (User.next_heart_at.is_(None), delta.next_heart_at or datetime.utcnow() + REGEN_INTERVAL),
+            else_=User.next_heart_at,
+        )
+    if delta.xp:
+        values.update(_level_up_values(delta.xp))
+    if delta.streak is not None:
+        values["streak"] = delta.streak
+    if delta.last_activity_date is not None:
+        values["last_activity_date"] = delta.last_activity_date
+
+    row = connection.execute(
+        update(User).where(User.id == delta.user_id).values(**values).returning(*_RETURNING_COLUMNS)
+    ).first()
+    if row is None:
+        return None
+
+    state = _row_to_state(row)
+    while state.xp >= get_xp_required(state.level):
+        # Grant crossed more levels than the UPDATE resolves: finish with a
+        # compare-and-swap so a concurrent writer is never overwritten.
+        new_level, new_xp, _ = check_level_up(state.xp, state.level)
+        row = connection.execute(
+            update(User)
+            .where(User.id == delta.user_id, User.level == state.level, User.xp == state.xp)
+            .values(level=new_level, xp=new_xp)
+            .returning(*_RETURNING_COLUMNS)
+        ).first()
+        if row is None:
+            row = connection.execute(select(*_RETURNING_COLUMNS).where(User.id == delta.user_id)).first()
+        state = _row_to_state(row)
+    return state
+
+
+def write_user_deltas(deltas: list[UserDelta]) -> list[UserState]:
+    """Persist deltas in a single transaction and return the updated states."""
+
+    states = []
+    with engine.begin() as connection:
+        for delta in deltas:
+            state = apply_user_delta(connection, delta)
+            if state is not None:
+                states.append(state)
+    return states
+
+
+_queue = UserDeltaQueue(max_batch=WRITE_BEHIND_MAX_BATCH, flush_interval=WRITE_BEHIND_FLUSH_SECONDS)
+atexit.register(_queue.stop)
+
+
+def submit_user_delta(delta: UserDelta) -> UserState | None:
+    """Queue delta for write-behind, or write it immediately when disabled.
+
+    Returns the stored state after an immediate write, None when queued.
+    """
+
+    if not WRITE_BEHIND_ENABLED:
+        if delta.is_empty():
+            return None
+        states = write_user_deltas([delta])
+        return states[0] if states else None
+    _queue.submit(delta)
+    return None
+
+
+def load_user_with_pending(loader: Callable[[], Any]) -> Any:
+    """Load a user via `loader` and return it with unflushed deltas applied."""
+
+    return _queue.load_with_pending(loader)
+
+
+def flush_user_updates() -> int:
+    """Flush pending deltas synchronously."""
+
+    return _queue.flush()
+
+
+def drain_user_updates() -> None:
+    """Stop the background flusher after writing everything pending."""
+
+    _queue.stop()
+
+
+def get_write_behind_stats() -> dict[str, int]:
+    return _queue.stats()
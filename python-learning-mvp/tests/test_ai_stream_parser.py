@@ -0,0 +1,46 @@
+"""Regression tests for the streamed exercise object parser."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from services.ai_service import _IncrementalObjectParser
+
+
+PAYLOAD = (
+    '{"question": "Скільки буде 0.1 + 0.2?", "n": 12.5, "small": 1.5E-3, "big": -2e+10,'
+    ' "count": 7, "ok": true, "bad": false, "none": null,'
+    ' "options": [1, 2.5, "x"], "meta": {"k": 1}, "last": 3}'
+)
+
+
+def _parse(chunks: list[str]) -> list[tuple[str, object]]:
+    parser = _IncrementalObjectParser()
+    members = []
+    for chunk in chunks:
+        members.extend(parser.feed(chunk))
+    members.extend(parser.close())
+    return members
+
+
+@pytest.mark.parametrize("split", range(len(PAYLOAD) + 1))
+def test_every_split_point_yields_final_values(split: int) -> None:
+    assert _parse([PAYLOAD[:split], PAYLOAD[split:]]) == list(json.loads(PAYLOAD).items())
+
+
+def test_one_character_chunks_yield_final_values() -> None:
+    assert _parse(list(PAYLOAD)) == list(json.loads(PAYLOAD).items())
+
+
+@pytest.mark.parametrize("head", ['{"n": 12.', '{"n": 12', '{"n": 1e', '{"n": 1.5E-', '{"n": tru', '{"n": 1.5E-3'])
+def test_unterminated_number_or_literal_is_not_reported(head: str) -> None:
+    assert _IncrementalObjectParser().feed(head) == []
+
+
+def test_incomplete_object_raises_on_close() -> None:
+    parser = _IncrementalObjectParser()
+    parser.feed('{"n": 12.5, "q": "x"')
+    with pytest.raises(ValueError):
+        parser.close()
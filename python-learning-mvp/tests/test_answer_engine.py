@@ -0,0 +1,30 @@
+"""Regression tests for code answers the parser cannot handle."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from core.answer_engine import MAX_CODE_ANSWER_CHARS, canonical_code, compile_validator
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        "-" * 1000 + "1",
+        "x" + "+x" * 2000,
+        "-" * 10000 + "1",
+        "x = 1\n" * (MAX_CODE_ANSWER_CHARS // 6 + 1),
+    ],
+)
+def test_hostile_answers_are_rejected_not_raised(answer: str) -> None:
+    assert canonical_code(answer) is None
+    for exercise_type in ("FILL_CODE", "WRITE_LINE"):
+        validator = compile_validator(SimpleNamespace(type=exercise_type, correct_answer="x = 10"))
+        assert validator.check(answer) is False
+
+
+def test_equivalent_code_still_matches() -> None:
+    validator = compile_validator(SimpleNamespace(type="FILL_CODE", correct_answer="x = 10"))
+    assert validator.check("x=(10)")
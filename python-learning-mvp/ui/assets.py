@@ -0,0 +1,124 @@
+"""Build-once static asset pipeline for character SVGs and the theme CSS.
+
+Sources (`assets/characters/*.svg` and `ui/theme.css`) are minified and
+written to the app's `static/` directory under content-hashed names, which
+Streamlit serves at `app/static/...` (`server.enableStaticServing` in
+`.streamlit/config.toml`). A file's name changes whenever its content does,
+so browsers may cache it indefinitely and a rerun only sends a short
+reference instead of the markup itself.
+
+The registry is built once per process (or ahead of a deploy with
+`python -m jobs.build_assets`) and is read-only afterwards: rendering looks up
+URLs and contents in memory and never touches the disk.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import posixpath
+import re
+import threading
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+
+
+APP_DIR = Path(__file__).resolve().parent.parent
+CHARACTERS_DIR = APP_DIR / "assets" / "characters"
+THEME_CSS_PATH = Path(__file__).resolve().parent / "theme.css"
+# Streamlit serves `<main script dir>/static` at `app/static/`.
+STATIC_DIR = APP_DIR / "static"
+STATIC_URL_PREFIX = "app/static"
+DIGEST_LENGTH = 12
+
+THEME_CSS = "theme.css"
+
+
+@dataclass(frozen=True)
+class Asset:
+    """Minified asset and its content-hashed path under `static/`."""
+
+    name: str
+    path: str
+    content: str
+
+    @property
+    def url(self) -> str:
+        return f"{STATIC_URL_PREFIX}/{self.path}"
+
+
+def character_asset_name(state: str) -> str:
+    """Return the registry name of a character state's SVG."""
+
+    return f"characters/{state}.svg"
+
+
+def minify_svg(text: str) -> str:
+    """Drop comments and whitespace between tags."""
+
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+    text = re.sub(r">\s+<", "><", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def minify_css(text: str) -> str:
+    """Drop comments and whitespace that carries no meaning."""
+
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+
+def _hashed_path(name: str, content: str) -> str:
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:DIGEST_LENGTH]
+    stem, suffix = posixpath.splitext(name)
+    return f"{stem}.{digest}{suffix}"
+
+
+def _write_static(path: Path, content: str) -> None:
+    # Same name means same bytes, so an existing file is already correct; the
+    # rename keeps other processes from serving a half-written file.
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temp_path.write_text(content, encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def _sources() -> list[tuple[str, Path, Callable[[str], str]]]:
+    sources: list[tuple[str, Path, Callable[[str], str]]] = [(THEME_CSS, THEME_CSS_PATH, minify_css)]
+    for path in sorted(CHARACTERS_DIR.glob("*.svg")):
+        sources.append((character_asset_name(path.stem), path, minify_svg))
+    return sources
+
+
+def build_assets(static_dir: Path = STATIC_DIR) -> Mapping[str, Asset]:
+    """Minify every source, write hashed files to `static_dir` and return the registry."""
+
+    assets = {}
+    for name, source, minify in _sources():
+        content = minify(source.read_text(encoding="utf-8"))
+        asset = Asset(name, _hashed_path(name, content), content)
+        _write_static(static_dir / asset.path, content)
+        assets[name] = asset
+    return MappingProxyType(assets)
+
+
+_registry: Mapping[str, Asset] | None = None
+_registry_lock = threading.Lock()
+
+
+def get_asset_registry() -> Mapping[str, Asset]:
+    """Return the process-wide asset registry, building it on first use."""
+
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_assets()
+    return _registry
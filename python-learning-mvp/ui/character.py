@@ -2,10 +2,10 @@
 
 from __future__ import annotations
 
-from pathlib import Path
-
 import streamlit as st
 
+from ui.assets import character_asset_name, get_asset_registry
+
 
 _STATE_MESSAGES = {
     "idle": "Готовий до нової пригоди в Python!",
@@ -20,15 +20,14 @@ _STATE_MESSAGES = {
 def render_character(state: str, message: str | None = None) -> None:
     """Render Byte SVG and speech bubble text based on current state."""
 
-    assets_dir = Path(__file__).resolve().parent.parent / "assets" / "characters"
-    svg_path = assets_dir / f"{state}.svg"
-    svg_content = svg_path.read_text(encoding="utf-8") if svg_path.exists() else ""
+    asset = get_asset_registry().get(character_asset_name(state))
+    image = f'<img src="{asset.url}" alt="Byte: {state}">' if asset is not None else ""
     bubble = message or _STATE_MESSAGES.get(state, _STATE_MESSAGES["idle"])
 
     st.markdown(
         (
             '<div class="ui-character-wrap">'
-            f'<div class="ui-character-svg">{svg_content}</div>'
+            f'<div class="ui-character-svg">{image}</div>'
             f'<div class="ui-speech">{bubble}</div>'
             "</div>"
         ),
@@ -6,6 +6,8 @@ from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
 
+from ui.assets import Asset, character_asset_name, get_asset_registry
+
 
 class CharacterState(str, Enum):
     """Supported visual states for Byte character."""
@@ -54,7 +56,12 @@ class CharacterStateManager:
 
         return self.assets_dir / f"{self.current_state.value}.svg"
 
+    def get_svg_asset(self) -> Asset:
+        """Return the registered (minified, content-hashed) SVG for current state."""
+
+        return get_asset_registry()[character_asset_name(self.current_state.value)]
+
     def get_svg_content(self) -> str:
-        """Read current state SVG content for rendering in Streamlit."""
+        """Return current state SVG content for rendering in Streamlit."""
 
-        return self.get_svg_path().read_text(encoding="utf-8")
+        return self.get_svg_asset().content
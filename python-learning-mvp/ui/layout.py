@@ -10,17 +10,7 @@ import streamlit as st
 def render_layout(content_function: Callable[[], None]) -> None:
     """Render page content centered with max width of 720px."""
 
-    st.markdown(
-        """
-        <style>
-        .ui-layout-wrapper {
-            max-width: 720px;
-            margin: 0 auto;
-        }
-        </style>
-        <div class="ui-layout-wrapper">
-        """,
-        unsafe_allow_html=True,
-    )
+    # The wrapper's styles ship with the theme stylesheet.
+    st.markdown('<div class="ui-layout-wrapper">', unsafe_allow_html=True)
     content_function()
     st.markdown("</div>", unsafe_allow_html=True)